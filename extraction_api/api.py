@@ -0,0 +1,251 @@
+"""
+API de Extração de NFSe com Flask.
+
+Serviço local para que outros sistemas enviem PDFs de NFSe e recebam os
+campos extraídos em JSON, sem abrir a interface gráfica.
+
+O servidor mantém um pool de processos já iniciados ("aquecidos"): cada
+processo importa o pdfplumber e carrega todos os layouts uma única vez, na
+inicialização. Uma requisição só paga o custo da extração em si.
+
+Endpoints:
+    POST /extract?layout=<nome>   Um PDF ('file' no multipart ou o corpo
+                                  cru com Content-Type application/pdf) ->
+                                  JSON; vários PDFs ('files' no multipart)
+                                  -> resultados em NDJSON, um por linha, à
+                                  medida que ficam prontos.
+    GET  /layouts                 Layouts disponíveis.
+    GET  /stats                   Fila, contadores e latências.
+
+Cada nota gera um evento no log JSONL e atualiza as métricas no formato do
+Prometheus (config.EVENT_LOG_PATH e config.METRICS_PATH), reescritas
+periodicamente enquanto o serviço estiver no ar.
+
+Uso: python extraction_api/api.py [--port 5001] [--workers N] [--backend pdfminer]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import as_completed
+from pathlib import Path
+
+from flask import Flask, Response, jsonify, request
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import batch_processor, config, input_sources, monitoring  # noqa: E402
+
+# Layouts carregados em cada processo de trabalho (preenchido no initializer)
+_WORKER_LAYOUTS = {}
+# Motor de extração dos processos de trabalho (definido no initializer)
+_WORKER_BACKEND = {"name": None}
+# Barreira do aquecimento: segura cada tarefa de _warm_up até todos os processos terem uma
+_WORKER_READY = {"barrier": None}
+# Tempo máximo, em segundos, esperando todos os processos iniciarem
+WARM_UP_TIMEOUT = 120
+
+
+def load_all_layouts():
+    """Carrega todos os layouts da pasta de layouts em memória."""
+    layouts = {}
+    for layout_file in sorted(config.LAYOUTS_DIR.glob("*.json")):
+        try:
+            layouts[layout_file.stem] = config.load_layout(layout_file.stem)
+        except Exception:
+            pass  # load_layout já informou o erro
+    return layouts
+
+
+def _init_worker(layouts, backend, barrier):
+    """Inicializa um processo de trabalho: layouts em memória e imports feitos."""
+    _WORKER_LAYOUTS.update(layouts)
+    _WORKER_BACKEND["name"] = backend
+    _WORKER_READY["barrier"] = barrier
+    import pdfplumber  # noqa: F401  (importa uma vez, antes da primeira nota)
+
+
+def _warm_up(_):
+    # Enquanto espera na barreira, o processo não pega outra tarefa de
+    # aquecimento: cada uma termina num processo diferente
+    _WORKER_READY["barrier"].wait(timeout=WARM_UP_TIMEOUT)
+    return os.getpid()
+
+
+def _extract(layout_name, file_name, data):
+    """
+    Extrai uma nota em um processo de trabalho.
+
+    Retorna o resultado em JSON-compatível e o resultado completo da extração
+    (batch_processor.extract_source), usado pelo monitoramento.
+    """
+    source = input_sources.from_bytes(file_name, data)
+    outcome = batch_processor.extract_source(source, _WORKER_LAYOUTS[layout_name],
+                                             _WORKER_BACKEND["name"])
+    record = outcome["registro"]
+    result = {"arquivo": file_name, "dados": record,
+              "erro": None if record else "Não foi possível extrair dados do PDF.",
+              "duracao_ms": round(outcome["duracao"] * 1000, 1)}
+    return result, outcome
+
+
+class ServiceStats:
+    """Contadores e latências do serviço (acessados por várias threads do Flask)."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.processed = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)  # Em segundos, das últimas notas
+
+    def started(self, count=1):
+        with self._lock:
+            self.in_flight += count
+
+    def finished(self, latency, ok):
+        with self._lock:
+            self.in_flight -= 1
+            self.processed += 1
+            if not ok:
+                self.errors += 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            in_flight, processed, errors = self.in_flight, self.processed, self.errors
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "fila": in_flight,
+            "processadas": processed,
+            "erros": errors,
+            "latencia_ms": {
+                "media": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+            },
+        }
+
+
+app = Flask(__name__)
+LAYOUTS = {}
+POOL = None
+STATS = ServiceStats()
+MONITOR = None
+
+
+def start_pool(workers, backend=None):
+    """Cria o pool de processos e o aquece antes de aceitar requisições."""
+    global POOL, MONITOR
+    MONITOR = monitoring.Monitor()
+    LAYOUTS.update(load_all_layouts())
+    # Sem reciclagem: um processo reposto chegaria frio (sem imports nem
+    # layouts) no meio de uma requisição
+    POOL = batch_processor.worker_pool(workers, max_tasks=0, initializer=_init_worker,
+                                       initargs=(LAYOUTS, backend or config.EXTRACTION_BACKEND,
+                                                 multiprocessing.Barrier(workers)))
+    # Uma tarefa por processo, presa na barreira até todos terem a sua, força
+    # todos a iniciarem (e importarem) agora
+    list(POOL.map(_warm_up, range(workers)))
+
+
+def _submit(layout_name, file_name, data):
+    STATS.started()
+    submitted = time.perf_counter()
+    future = POOL.submit(_extract, layout_name, file_name, data)
+
+    def on_done(f):
+        ok = f.exception() is None and f.result()[0]["erro"] is None
+        STATS.finished(time.perf_counter() - submitted, ok)
+        if f.exception() is None:
+            outcome = f.result()[1]
+        else:  # O processo de trabalho falhou (ex: foi encerrado)
+            outcome = {"resultado": "erro", "erro": type(f.exception()).__name__,
+                       "mensagem": str(f.exception()), "paginas": None,
+                       "duracao": time.perf_counter() - submitted}
+        MONITOR.file_processed(file_name, outcome, layout=layout_name)
+    future.add_done_callback(on_done)
+    return future
+
+
+def _result_or_error(future, file_name):
+    try:
+        return future.result()[0]
+    except Exception as e:
+        return {"arquivo": file_name, "dados": None, "erro": f"{type(e).__name__}: {e}"}
+
+
+@app.route('/layouts', methods=['GET'])
+def list_layouts():
+    return jsonify(sorted(LAYOUTS))
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify(STATS.snapshot())
+
+
+@app.route('/extract', methods=['POST'])
+def extract():
+    """
+    Extrai os campos de um ou mais PDFs com o layout informado em ?layout=.
+    """
+    layout_name = request.args.get("layout")
+    if layout_name not in LAYOUTS:
+        return jsonify({"status": "error",
+                        "message": f"Layout '{layout_name}' não encontrado.",
+                        "layouts": sorted(LAYOUTS)}), 400
+
+    batch = request.files.getlist("files")
+    if batch:
+        # Lê os arquivos antes de responder: o gerador roda fora da requisição
+        uploads = [(f.filename or f"arquivo_{i}.pdf", f.read()) for i, f in enumerate(batch)]
+        futures = {_submit(layout_name, name, data): name for name, data in uploads}
+
+        def stream_results():
+            for future in as_completed(futures):
+                yield json.dumps(_result_or_error(future, futures[future]), ensure_ascii=False) + "\n"
+
+        return Response(stream_results(), mimetype="application/x-ndjson")
+
+    if "file" in request.files:
+        upload = request.files["file"]
+        file_name, data = upload.filename or "arquivo.pdf", upload.read()
+    elif request.mimetype == "application/pdf":
+        file_name, data = request.args.get("name", "arquivo.pdf"), request.get_data()
+    else:
+        return jsonify({"status": "error",
+                        "message": "Envie um PDF em 'file', vários em 'files' "
+                                   "ou o corpo com Content-Type application/pdf."}), 400
+
+    result = _result_or_error(_submit(layout_name, file_name, data), file_name)
+    return jsonify(result), (200 if result["erro"] is None else 422)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="API local de extração de NFSe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=batch_processor.default_workers())
+    parser.add_argument("--backend", default=config.EXTRACTION_BACKEND,
+                        help="Motor de extração: pdfplumber (referência) ou pdfminer (enxuto)")
+    args = parser.parse_args()
+
+    start_pool(args.workers, args.backend)
+    print(f"Pool com {args.workers} processo(s) pronto. Layouts: {', '.join(sorted(LAYOUTS))}")
+    # threaded=True: várias requisições aguardam o pool ao mesmo tempo
+    try:
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        MONITOR.close()
@@ -0,0 +1,82 @@
+"""
+Teste de Carga da API de Extração.
+
+Envia o mesmo PDF várias vezes, com várias requisições simultâneas, e mede
+vazão e latência do lado do cliente. Ao final, mostra as estatísticas do
+próprio servidor (/stats).
+
+Uso:
+    python extraction_api/load_test.py <pdf> --layout prefeitura_go
+        [--url http://127.0.0.1:5001] [--requests 200] [--concurrency 8]
+        [--batch-size 1]
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+
+def send(url, layout, pdf_name, pdf_bytes, batch_size):
+    """Envia uma requisição e retorna (latência em segundos, notas com sucesso, notas com erro)."""
+    started = time.perf_counter()
+    if batch_size == 1:
+        response = requests.post(f"{url}/extract", params={"layout": layout},
+                                 files={"file": (pdf_name, pdf_bytes, "application/pdf")},
+                                 timeout=120)
+        results = [response.json()]
+    else:
+        files = [("files", (f"{i}_{pdf_name}", pdf_bytes, "application/pdf"))
+                 for i in range(batch_size)]
+        response = requests.post(f"{url}/extract", params={"layout": layout},
+                                 files=files, timeout=600, stream=True)
+        results = [json.loads(line) for line in response.iter_lines() if line]
+    latency = time.perf_counter() - started
+    ok = sum(1 for r in results if r.get("erro") is None)
+    return latency, ok, len(results) - ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API de extração")
+    parser.add_argument("pdf", help="PDF enviado em todas as requisições")
+    parser.add_argument("--layout", required=True)
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="PDFs por requisição (acima de 1 usa o modo em lote)")
+    args = parser.parse_args()
+
+    pdf_path = Path(args.pdf)
+    pdf_bytes = pdf_path.read_bytes()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(send, args.url, args.layout, pdf_path.name,
+                                   pdf_bytes, args.batch_size)
+                   for _ in range(args.requests)]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    notes_ok = sum(r[1] for r in results)
+    notes_error = sum(r[2] for r in results)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    print(f"Requisições: {len(results)} (concorrência {args.concurrency}, "
+          f"{args.batch_size} PDF(s) por requisição)")
+    print(f"Notas: {notes_ok} ok, {notes_error} com erro")
+    print(f"Tempo total: {elapsed:.2f} s | Vazão: {(notes_ok + notes_error) / elapsed:.1f} notas/s")
+    print(f"Latência por requisição (ms): p50 {percentile(0.50):.1f} | "
+          f"p95 {percentile(0.95):.1f} | p99 {percentile(0.99):.1f} | máx {latencies[-1] * 1000:.1f}")
+
+    stats = requests.get(f"{args.url}/stats", timeout=10).json()
+    print(f"Estatísticas do servidor: {json.dumps(stats, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
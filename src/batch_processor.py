@@ -0,0 +1,205 @@
+"""
+Módulo de Processamento em Lote
+
+Distribui a extração de várias fontes de PDF (arquivos, membros de ZIP ou
+bytes em memória) entre processos de trabalho, mantendo um número limitado
+de tarefas em andamento para que o uso de memória não cresça com o lote.
+"""
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from src import data_parser, pdf_backends
+from src.input_sources import PdfSource
+
+# Tarefas em andamento por processo de trabalho. Cada tarefa mantém no máximo
+# um PDF em memória, então isso limita o consumo total do lote.
+IN_FLIGHT_PER_WORKER = 2
+# Arquivos processados por um processo de trabalho antes de ele ser substituído
+# por um novo. Os caches internos do pdfminer (fontes, CMaps) crescem ao longo
+# de uma execução longa; reciclar o processo devolve essa memória ao sistema.
+# Vale para run_batch (ver worker_pool); 0 desliga a reciclagem.
+MAX_TASKS_PER_WORKER = 200
+# Resultados prontos que podem esperar, por processo, enquanto um arquivo
+# demorado segura a saída na ordem de entrada. Cada um é só um registro.
+RESULTS_WAITING_PER_WORKER = 32
+
+
+def default_workers() -> int:
+    """Número padrão de processos: um por núcleo, deixando um livre para a GUI."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _recycling_context():
+    """
+    Modo de criação dos processos reciclados. Um processo com limite de tarefas
+    não pode ser criado por fork, então no Unix o pool usa o forkserver: um
+    processo servidor importa este módulo (e o pdfplumber) uma vez, e cada
+    processo novo é um fork dele, sem repetir as importações. Sem forkserver
+    (Windows), cada processo novo começa do zero (spawn), como já é o padrão lá.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["src.batch_processor"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def worker_pool(max_workers: int, max_tasks: int = 0,
+                **kwargs: Any) -> ProcessPoolExecutor:
+    """
+    Cria um pool de processos de extração.
+
+    Args:
+        max_workers (int): Número de processos.
+        max_tasks (int, optional): Arquivos por processo antes da reciclagem;
+                                   0 (padrão) desliga.
+        **kwargs: Repassados ao ProcessPoolExecutor (ex: initializer).
+
+    Sem reciclagem, o pool usa o modo padrão da plataforma (fork no Linux).
+    Com reciclagem (Python 3.11 ou superior; em versões anteriores, é
+    ignorada), os processos vêm de _recycling_context: eles não herdam o
+    estado do processo principal (ex: alterações em config feitas em tempo
+    de execução) e cada substituição custa o início de um processo novo.
+    Quem recicla deve manter poucas tarefas por processo na fila, como
+    run_batch (IN_FLIGHT_PER_WORKER): no Python 3.11, com muitas tarefas
+    enviadas de uma vez, o pool às vezes deixa de repor os processos
+    reciclados e para.
+    """
+    if max_tasks and sys.version_info >= (3, 11):
+        kwargs["max_tasks_per_child"] = max_tasks
+        kwargs.setdefault("mp_context", _recycling_context())
+    return ProcessPoolExecutor(max_workers=max_workers, **kwargs)
+
+
+def extract_source(source: PdfSource, layout_map: Dict[str, Any],
+                   backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extrai e limpa os dados de uma fonte, registrando o resultado da tentativa.
+
+    'backend' escolhe o motor de extração (ver pdf_backends); None usa o de config.
+
+    Returns:
+        Dict[str, Any]: O resultado, com as chaves:
+            'registro': o registro limpo (com 'arquivo_origem'), ou None;
+            'resultado': "ok", "sem_texto" (nenhum campo com texto, ex: PDF
+                         escaneado) ou "erro";
+            'erro' / 'mensagem': a classe e o texto da exceção, se houver;
+            'paginas': o número de páginas do PDF (None se não abriu);
+            'duracao': o tempo da extração, em segundos.
+    """
+    started = time.perf_counter()
+    outcome = {"registro": None, "resultado": "erro", "erro": None,
+               "mensagem": None, "paginas": None}
+    try:
+        with source.open() as stream:
+            engine = pdf_backends.backend_for(layout_map, backend)
+            raw_data, outcome["paginas"] = engine.extract(stream, layout_map)
+    except Exception as e:
+        outcome["erro"], outcome["mensagem"] = type(e).__name__, str(e)
+    else:
+        clean_data = {"arquivo_origem": source.name}
+        clean_data.update(data_parser.parse_raw_data(raw_data))
+        outcome["registro"] = clean_data
+        outcome["resultado"] = "ok" if any(raw_data.values()) else "sem_texto"
+    outcome["duracao"] = time.perf_counter() - started
+    return outcome
+
+
+def process_source(source: PdfSource, layout_map: Dict[str, Any],
+                   backend: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extrai e limpa os dados de uma única fonte de PDF.
+
+    Returns:
+        Optional[Dict[str, Any]]: O registro limpo, com 'arquivo_origem'
+                                  preenchido com o nome da fonte, ou None
+                                  se a extração falhar.
+    """
+    outcome = extract_source(source, layout_map, backend)
+    if outcome["erro"]:
+        print(f"Erro ao processar '{source.name}': {outcome['mensagem']}")
+    return outcome["registro"]
+
+
+def _without_data(source: PdfSource) -> PdfSource:
+    """Cópia da fonte sem o conteúdo em memória, para guardar enquanto o resultado espera."""
+    if source.data is None:
+        return source
+    return PdfSource(source.name, path=source.path, member=source.member, size=source.size)
+
+
+def run_batch(sources: Iterable[PdfSource], layout_map: Dict[str, Any],
+              max_workers: Optional[int] = None,
+              on_outcome: Optional[Callable[[PdfSource, Dict[str, Any]], None]] = None,
+              backend: Optional[str] = None) -> Iterator[Tuple[PdfSource, Optional[Dict[str, Any]]]]:
+    """
+    Processa as fontes em paralelo e gera os resultados na ordem de entrada.
+
+    Cada processo recebe uma nova fonte assim que termina a anterior, então
+    um arquivo demorado não segura os demais; só a saída dos resultados
+    espera por ele. Para aproveitar isso, envie os arquivos maiores primeiro
+    (ver scheduler.py).
+
+    Args:
+        sources (Iterable[PdfSource]): As fontes a processar. Podem vir de um
+                                       gerador; são consumidas aos poucos.
+        layout_map (Dict[str, Any]): O layout a aplicar em cada PDF.
+        max_workers (int, optional): Número de processos. Com 1, tudo roda
+                                     no processo atual.
+        on_outcome (Callable, optional): Chamada com a fonte e o resultado
+                                         completo de extract_source (duração,
+                                         páginas, erro), na ordem de entrada.
+        backend (str, optional): O motor de extração. Resolvido aqui, e não nos
+                                 processos de trabalho, que podem ter sido
+                                 iniciados do zero com a configuração padrão.
+
+    Yields:
+        Tuple[PdfSource, Optional[Dict[str, Any]]]: A fonte (sem o conteúdo
+                                                    em memória) e o registro extraído
+                                                    (None em caso de erro).
+    """
+    if max_workers is None:
+        max_workers = default_workers()
+    backend = pdf_backends.get_backend(backend).name
+
+    def finish(source, outcome):
+        if on_outcome is not None:
+            on_outcome(source, outcome)
+        elif outcome["erro"]:
+            print(f"Erro ao processar '{source.name}': {outcome['mensagem']}")
+        return source, outcome["registro"]
+
+    if max_workers <= 1:
+        for source in sources:
+            yield finish(source, extract_source(source, layout_map, backend))
+        return
+
+    max_in_flight = max_workers * IN_FLIGHT_PER_WORKER
+    max_waiting = max_workers * RESULTS_WAITING_PER_WORKER
+    pending = deque()  # (fonte, future), na ordem de entrada
+    running = set()
+    # Só o lote recicla os processos: é ele que passa por milhares de arquivos
+    with worker_pool(max_workers, max_tasks=MAX_TASKS_PER_WORKER) as executor:
+        for source in sources:
+            future = executor.submit(extract_source, source, layout_map, backend)
+            pending.append((_without_data(source), future))
+            running.add(future)
+            # Um processo que termina recebe a próxima fonte na hora, mesmo que
+            # a primeira da fila ainda esteja em andamento; os resultados prontos
+            # esperam a vez deles para sair na ordem de entrada.
+            while len(running) >= max_in_flight or len(pending) >= max_waiting:
+                _, running = wait(running, return_when=FIRST_COMPLETED)
+                while pending and pending[0][1].done():
+                    head_source, future = pending.popleft()
+                    yield finish(head_source, future.result())
+            while pending and pending[0][1].done():
+                head_source, future = pending.popleft()
+                yield finish(head_source, future.result())
+        while pending:
+            head_source, future = pending.popleft()
+            yield finish(head_source, future.result())
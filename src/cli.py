@@ -0,0 +1,190 @@
+"""
+Interface de Linha de Comando
+
+Permite usar as ferramentas do extrator sem a interface gráfica.
+
+Uso:
+    python -m src.cli extract <pdfs_ou_zips...> --layout <layout> --output <relatorio.xlsx>
+                              [--append] [--workers N] [--backend pdfplumber|pdfminer|cache]
+                              [--prefetch K] [--prefetch-mb MB] [--events <eventos.jsonl>]
+                              [--metrics <metricas.prom>] [--schedule maiores_primeiro|ordem]
+                              [--also <notas.csv> <notas.sqlite> <notas.jsonl> ...]
+    python -m src.cli test-layout <layout> <pasta_de_amostras> [--workers N]
+
+Execução em partes (ex: um lote muito grande dividido entre máquinas):
+    python -m src.cli shard-plan <pdfs_ou_zips...> --shards N --manifest <manifesto.json>
+    python -m src.cli shard-run <manifesto.json> --shard K --layout <layout> --output-dir <pasta>
+                                [--workers N] [--backend pdfplumber|pdfminer|cache]
+    python -m src.cli shard-merge <manifesto.json> <parciais...> --output <relatorio.xlsx>
+"""
+import argparse
+import sys
+
+from src import (config, label_matcher, layout_tester, monitoring, pdf_backends, pipeline,
+                 scheduler, sharding)
+
+
+def cmd_extract(args) -> int:
+    """Extrai os PDFs informados e grava (ou atualiza) o relatório Excel."""
+    layout_map = config.load_layout(args.layout)
+    monitor = monitoring.Monitor(events_path=args.events, metrics_path=args.metrics)
+    try:
+        summary = pipeline.run_pipeline(args.paths, layout_map, args.output,
+                                        append=args.append, max_workers=args.workers,
+                                        on_status=print, monitor=monitor,
+                                        backend=args.backend, prefetch_files=args.prefetch,
+                                        prefetch_bytes=args.prefetch_mb * 1024 * 1024,
+                                        schedule=args.schedule, outputs=args.also)
+    finally:
+        monitor.close()
+    print(f"Notas gravadas: {summary['notas']} | Já no relatório: {summary['ja_no_relatorio']} | "
+          f"Duplicatas: {summary['duplicatas']} | Falhas: {summary['falhas']}")
+    occupancy = f"{summary['ocupacao']:.0%}" if summary["ocupacao"] is not None else "-"
+    print(f"Tempo da extração: {summary['makespan_s']:.2f} s | Ocupação dos processos: {occupancy}")
+    if summary["saidas_com_erro"]:
+        print(f"Saídas adicionais com erro: {summary['saidas_com_erro']} (ver as mensagens acima)")
+    if not summary["notas"] and not (args.append and summary["ja_no_relatorio"]):
+        print("Nenhum dado pôde ser extraído dos arquivos informados.")
+        return 1
+    return 0
+
+
+def cmd_test_layout(args) -> int:
+    """Aplica um layout a uma pasta de amostras e imprime o relatório."""
+    layout_map = config.load_layout(args.layout)
+    if label_matcher.is_label_layout(layout_map):
+        print(f"O layout '{args.layout}' é de rótulos (sem caixas); não há o que testar aqui.")
+        return 1
+    tester = layout_tester.LayoutTester.from_folder(args.folder, max_workers=args.workers)
+    if not tester.sources:
+        print(f"Nenhum PDF encontrado em '{args.folder}'.")
+        return 1
+
+    print(f"Testando o layout '{args.layout}' em {len(tester.sources)} arquivo(s)...")
+    report = tester.run(layout_map)
+    print(layout_tester.format_report(report))
+    return 0
+
+
+def cmd_shard_plan(args) -> int:
+    """Grava o manifesto que divide os PDFs entre as partes."""
+    plan = sharding.plan_shards(args.paths, args.shards, args.manifest)
+    if not plan["arquivos"]:
+        print("Nenhum PDF encontrado nos caminhos informados.")
+        return 1
+    print(f"Manifesto gravado em '{args.manifest}': {plan['arquivos']} PDF(s) em "
+          f"{args.shards} parte(s) ({', '.join(map(str, plan['por_parte']))}).")
+    return 0
+
+
+def cmd_shard_run(args) -> int:
+    """Processa uma parte do manifesto e grava o arquivo parcial dela."""
+    layout_map = config.load_layout(args.layout)
+    try:
+        path = sharding.run_shard(args.manifest, args.shard - 1, layout_map, args.output_dir,
+                                  max_workers=args.workers, backend=args.backend)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Parcial gravado em '{path}'.")
+    return 0
+
+
+def cmd_shard_merge(args) -> int:
+    """Junta os parciais de todas as partes no relatório final."""
+    try:
+        summary = sharding.merge_partials(args.manifest, args.partials, args.output)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Notas gravadas: {summary['notas']} | Duplicatas: {summary['duplicatas']} | "
+          f"Falhas: {summary['falhas']}")
+    if not summary["notas"]:
+        print("Nenhum dado pôde ser extraído dos arquivos do manifesto.")
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli", description="Extrator de NFSe - linha de comando")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = subparsers.add_parser(
+        "extract", help="Extrai PDFs (ou ZIPs) e gera o relatório Excel")
+    extract_parser.add_argument("paths", nargs="+", help="PDFs e ZIPs de entrada")
+    extract_parser.add_argument("--layout", required=True,
+                                help="Nome do layout (em layouts/) ou caminho de um .json")
+    extract_parser.add_argument("--output", required=True, help="Relatório .xlsx de saída")
+    extract_parser.add_argument("--append", action="store_true",
+                                help="Acrescenta só as notas novas ao relatório existente")
+    extract_parser.add_argument("--workers", type=int, default=None,
+                                help="Número de processos (padrão: núcleos - 1)")
+    extract_parser.add_argument("--backend", choices=sorted(pdf_backends.BACKENDS),
+                                default=config.EXTRACTION_BACKEND,
+                                help="Motor de extração (padrão: %(default)s)")
+    extract_parser.add_argument("--prefetch", type=int, default=config.PREFETCH_FILES,
+                                help="PDFs lidos à frente do processamento; 0 desliga "
+                                     "(padrão: %(default)s)")
+    extract_parser.add_argument("--prefetch-mb", type=int,
+                                default=config.PREFETCH_MAX_BYTES // (1024 * 1024),
+                                help="Limite da leitura antecipada, em MB (padrão: %(default)s)")
+    extract_parser.add_argument("--events", default=config.EVENT_LOG_PATH,
+                                help="Log de eventos em JSONL (padrão: %(default)s)")
+    extract_parser.add_argument("--metrics", default=config.METRICS_PATH,
+                                help="Métricas no formato do Prometheus (padrão: %(default)s)")
+    extract_parser.add_argument("--schedule", choices=scheduler.SCHEDULES,
+                                default=config.BATCH_SCHEDULE,
+                                help="Ordem de envio dos PDFs aos processos (padrão: %(default)s)")
+    extract_parser.add_argument("--also", nargs="+", default=None, metavar="ARQUIVO",
+                                help="Grava também as notas nestes arquivos, na mesma passada "
+                                     "(.csv, .jsonl, .sqlite, .xlsx)")
+    extract_parser.set_defaults(func=cmd_extract)
+
+    test_parser = subparsers.add_parser(
+        "test-layout", help="Valida um layout contra uma pasta de PDFs de amostra")
+    test_parser.add_argument("layout", help="Nome do layout (em layouts/) ou caminho de um .json")
+    test_parser.add_argument("folder", help="Pasta com os PDFs (ou ZIPs) de amostra")
+    test_parser.add_argument("--workers", type=int, default=None,
+                             help="Número de processos (padrão: núcleos - 1)")
+    test_parser.set_defaults(func=cmd_test_layout)
+
+    plan_parser = subparsers.add_parser(
+        "shard-plan", help="Divide os PDFs entre partes e grava o manifesto")
+    plan_parser.add_argument("paths", nargs="+", help="PDFs e ZIPs de entrada")
+    plan_parser.add_argument("--shards", type=int, required=True, help="Número de partes")
+    plan_parser.add_argument("--manifest", required=True, help="Manifesto .json de saída")
+    plan_parser.set_defaults(func=cmd_shard_plan)
+
+    run_parser = subparsers.add_parser(
+        "shard-run", help="Processa uma parte do manifesto e grava o arquivo parcial")
+    run_parser.add_argument("manifest", help="Manifesto gerado por shard-plan")
+    run_parser.add_argument("--shard", type=int, required=True,
+                            help="Parte a processar (de 1 ao número de partes)")
+    run_parser.add_argument("--layout", required=True,
+                            help="Nome do layout (em layouts/) ou caminho de um .json")
+    run_parser.add_argument("--output-dir", required=True, help="Pasta dos arquivos parciais")
+    run_parser.add_argument("--workers", type=int, default=None,
+                            help="Número de processos (padrão: núcleos - 1)")
+    run_parser.add_argument("--backend", choices=sorted(pdf_backends.BACKENDS),
+                            default=config.EXTRACTION_BACKEND,
+                            help="Motor de extração (padrão: %(default)s)")
+    run_parser.set_defaults(func=cmd_shard_run)
+
+    merge_parser = subparsers.add_parser(
+        "shard-merge", help="Junta os parciais de todas as partes no relatório final")
+    merge_parser.add_argument("manifest", help="Manifesto gerado por shard-plan")
+    merge_parser.add_argument("partials", nargs="+", help="Arquivos parciais (um por parte)")
+    merge_parser.add_argument("--output", required=True, help="Relatório .xlsx de saída")
+    merge_parser.set_defaults(func=cmd_shard_merge)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,11 +13,69 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 PDF_SAMPLES_DIR = BASE_DIR / "pdf_samples"
 LAYOUTS_DIR = BASE_DIR / "layouts"  # <-- Caminho para os arquivos de layout
+DATA_DIR = BASE_DIR / "data"  # Dados persistentes entre execuções (índices)
 
 # Garante que os diretórios existam
 OUTPUT_DIR.mkdir(exist_ok=True)
 PDF_SAMPLES_DIR.mkdir(exist_ok=True)
 LAYOUTS_DIR.mkdir(exist_ok=True)
+DATA_DIR.mkdir(exist_ok=True)
+
+# --- Detecção de Duplicatas ---
+# Índice histórico de notas já processadas (hash do arquivo e chave de negócio)
+DEDUP_INDEX_PATH = DATA_DIR / "indice_duplicatas.sqlite"
+# "flag": mantém as duplicatas no relatório, indicando o arquivo original
+# "collapse": remove as duplicatas do relatório
+DEDUP_MODE = "flag"
+
+# --- Extração ---
+# Motor usado para ler o texto das caixas (ver pdf_backends.py):
+# "pdfplumber" (referência), "pdfminer" (enxuto, mesmo resultado) ou "cache"
+# (caracteres guardados em disco, ver glyph_cache.py)
+EXTRACTION_BACKEND = "pdfplumber"
+# Ordem de envio dos PDFs aos processos (ver scheduler.py): "ordem" (a ordem
+# de entrada) ou "maiores_primeiro" (os maiores de cada janela de
+# SCHEDULE_WINDOW PDFs primeiro; lê o catálogo de cada PDF a mais antes da
+# extração). O relatório sai na ordem de entrada nos dois casos.
+BATCH_SCHEDULE = "ordem"
+# PDFs reordenados juntos em "maiores_primeiro": limita as notas guardadas
+# até a ordem de entrada ser restaurada
+SCHEDULE_WINDOW = 64
+
+# --- Leitura Antecipada ---
+# PDFs lidos à frente do processamento, em threads (útil em pastas de rede).
+# 0 desliga a leitura antecipada.
+PREFETCH_FILES = 16
+# Limite de bytes lidos à frente do processamento
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+# Leituras simultâneas
+PREFETCH_THREADS = 4
+
+# --- Saídas Adicionais (ver output_sinks.py) ---
+# Separador e vírgula decimal dos CSVs, como o Excel em português espera
+CSV_DELIMITER = ";"
+CSV_DECIMAL = ","
+
+# --- Monitoramento ---
+MONITORING_DIR = DATA_DIR / "monitoramento"
+# Log de eventos (JSONL) com o resultado de cada arquivo processado
+EVENT_LOG_PATH = MONITORING_DIR / "eventos.jsonl"
+# Métricas no formato texto do Prometheus (para o textfile collector)
+METRICS_PATH = MONITORING_DIR / "nfse_extractor.prom"
+# Intervalo, em segundos, entre as atualizações do arquivo de métricas
+METRICS_REFRESH_SECONDS = 15
+
+# --- Caches ---
+CACHE_DIR = DATA_DIR / "cache"
+# Caracteres de cada página já analisada (usado pelo teste de layouts e pelo
+# motor de extração "cache", ver glyph_cache.py)
+CHAR_CACHE_DIR = CACHE_DIR / "chars"
+# Tamanho máximo do cache de caracteres; as páginas usadas há mais tempo saem primeiro
+CHAR_CACHE_MAX_MB = 1024
+# Páginas renderizadas (PNG) para o criador de layouts e as ferramentas
+RENDER_CACHE_DIR = CACHE_DIR / "renders"
+# Tamanho máximo do cache de páginas renderizadas; as menos usadas saem primeiro
+RENDER_CACHE_MAX_MB = 512
 
 
 def load_layout(layout_name: str) -> Dict[str, Any]:
@@ -25,13 +83,17 @@ def load_layout(layout_name: str) -> Dict[str, Any]:
     Carrega um mapa de campos (layout) de um arquivo JSON.
 
     Args:
-        layout_name (str): O nome do arquivo de layout (sem a extensão .json).
+        layout_name (str): O nome do arquivo de layout (sem a extensão .json)
+                           ou o caminho de um arquivo .json.
 
     Returns:
         Dict[str, Any]: O dicionário contendo o mapa de campos.
                         Lança uma exceção se o arquivo não for encontrado ou for inválido.
     """
-    layout_path = LAYOUTS_DIR / f"{layout_name}.json"
+    if layout_name.lower().endswith(".json"):
+        layout_path = Path(layout_name)
+    else:
+        layout_path = LAYOUTS_DIR / f"{layout_name}.json"
     try:
         with open(layout_path, 'r', encoding='utf-8') as f:
             return json.load(f)
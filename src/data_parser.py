@@ -6,20 +6,25 @@ extraídos do PDF. Cada função utiliza expressões regulares (Regex) para
 isolar a informação útil.
 """
 import re
-from typing import Optional
+from typing import Any, Dict, Optional
+
+# CNPJ (14 dígitos) ou CPF (11 dígitos), com ou sem formatação
+DOCUMENT_PATTERN = re.compile(
+    r'(?<!\d)(?:\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}|\d{3}\.?\d{3}\.?\d{3}-?\d{2})(?!\d)', re.ASCII)
 
 
 def parse_cnpj(raw_text: str) -> Optional[str]:
     """
     Localiza e limpa um número de CNPJ/CPF do texto.
-    Retorna apenas os dígitos.
+    Retorna apenas os dígitos (14 para CNPJ, 11 para CPF). Os dígitos
+    verificadores não são conferidos aqui (ver document_validator).
 
     Exemplo: 'CNPJ: 12.345.678/0001-99' -> '12345678000199'
+             'CPF: 024.677.021-03' -> '02467702103'
     """
     if not raw_text:
         return None
-    # Regex para encontrar 14 dígitos com ou sem formatação
-    match = re.search(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}', raw_text)
+    match = DOCUMENT_PATTERN.search(raw_text)
     if match:
         # Remove todos os caracteres não numéricos
         return re.sub(r'\D', '', match.group(0))
@@ -84,3 +89,20 @@ def clean_text(raw_text: str) -> str:
         return ""
     # Substitui múltiplas quebras de linha e espaços por um único espaço
     return re.sub(r'\s+', ' ', raw_text).strip()
+
+
+def parse_raw_data(raw_data: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Aplica a função de limpeza adequada a cada campo extraído.
+    Usa 'parse_<campo>' quando existir; caso contrário, 'clean_text'.
+    Valores que não são texto (ex: a confiança dos campos achados por
+    rótulo) passam sem alteração.
+    """
+    clean_data = {}
+    for field, raw_value in raw_data.items():
+        if not isinstance(raw_value, str):
+            clean_data[field] = raw_value
+            continue
+        parser_function = globals().get(f"parse_{field}", clean_text)
+        clean_data[field] = parser_function(raw_value)
+    return clean_data
@@ -0,0 +1,149 @@
+"""
+Módulo de Detecção de Notas Duplicadas
+
+Detecta a mesma nota aparecendo mais de uma vez, em duas etapas:
+
+1. Antes da extração, por hash do conteúdo do arquivo: cópias idênticas
+   (ex: 'nota - Copia.pdf') são processadas uma única vez.
+2. Depois da extração, por chave de negócio: CNPJ do prestador + número da
+   nota + data de emissão, o que pega a mesma nota salva em PDFs diferentes.
+
+O índice é persistido em um banco SQLite, então duplicatas são detectadas
+também entre execuções, ao longo de todo o histórico processado.
+"""
+import hashlib
+import sqlite3
+import zipfile
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src import data_parser
+from src.input_sources import PdfSource
+
+# Coluna adicionada ao relatório com o nome do arquivo original da duplicata
+DUPLICATE_COLUMN = "duplicata_de"
+
+# Falhas de leitura de uma fonte: disco/rede, ou um membro de ZIP corrompido
+READ_ERRORS = (OSError, zlib.error, zipfile.BadZipFile)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_hashes (
+    hash TEXT PRIMARY KEY,
+    arquivo TEXT NOT NULL,
+    visto_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS business_keys (
+    chave TEXT PRIMARY KEY,
+    arquivo TEXT NOT NULL,
+    visto_em TEXT NOT NULL
+);
+"""
+
+
+def content_hash(source: PdfSource) -> str:
+    """Calcula o hash (BLAKE2b de 128 bits) do conteúdo de uma fonte de PDF."""
+    digest = hashlib.blake2b(digest_size=16)
+    if source.data is not None:  # Já em memória (ex: leitura antecipada)
+        digest.update(source.data)
+        return digest.hexdigest()
+    with source.open() as stream:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def business_key(record: Dict[str, Any], roles: Dict[str, str]) -> Optional[str]:
+    """
+    Monta a chave de negócio 'cnpj|numero|data' de um registro extraído.
+    Retorna None se algum dos três componentes estiver ausente.
+
+    Args:
+        record (Dict[str, Any]): O registro limpo de uma nota.
+        roles (Dict[str, str]): Papéis do layout (ver field_roles.resolve_roles).
+    """
+    try:
+        cnpj = data_parser.parse_cnpj(str(record[roles["cnpj_prestador"]] or ""))
+        number = data_parser.parse_number(str(record[roles["numero_nota"]] or ""))
+        date = data_parser.parse_date(str(record[roles["data_emissao"]] or ""))
+    except KeyError:
+        return None
+    if not cnpj or number is None or not date:
+        return None
+    return f"{cnpj}|{number}|{date}"
+
+
+class DuplicateIndex:
+    """
+    Índice persistente de notas já processadas.
+
+    As inserções ficam em uma transação até commit(); se a execução falhar
+    antes de gerar o relatório, nada é gravado no histórico.
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.connection = sqlite3.connect(str(db_path))
+        self.connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def _check(self, table: str, column: str, key: str, name: str) -> Optional[str]:
+        """Registra a chave; se já existia para outro arquivo, retorna o nome dele."""
+        row = self.connection.execute(
+            f"SELECT arquivo FROM {table} WHERE {column} = ?", (key,)).fetchone()
+        if row is None:
+            self.connection.execute(
+                f"INSERT INTO {table} ({column}, arquivo, visto_em) VALUES (?, ?, ?)",
+                (key, name, datetime.now().isoformat(timespec="seconds")))
+            return None
+        # O mesmo arquivo reprocessado em outra execução não é uma duplicata
+        return row[0] if row[0] != name else None
+
+    def check_content(self, digest: str, name: str) -> Optional[str]:
+        """Verifica o hash do conteúdo. Retorna o arquivo original se for duplicata."""
+        return self._check("content_hashes", "hash", digest, name)
+
+    def check_record(self, record: Dict[str, Any], roles: Dict[str, str]) -> Optional[str]:
+        """Verifica a chave de negócio. Retorna o arquivo original se for duplicata."""
+        key = business_key(record, roles)
+        if key is None:
+            return None
+        return self._check("business_keys", "chave", key, record["arquivo_origem"])
+
+
+def iter_unique_sources(sources: Iterable[PdfSource], index: DuplicateIndex,
+                        duplicates: List[Tuple[PdfSource, str]]) -> Iterator[PdfSource]:
+    """
+    Gera apenas as fontes únicas, à medida que são lidas, e acrescenta as
+    cópias idênticas a 'duplicates' como (duplicata, arquivo original).
+    """
+    for source in sources:
+        try:
+            digest = content_hash(source)
+        except READ_ERRORS:
+            # Deixa a falha de leitura para a etapa de extração reportar
+            yield source
+            continue
+        original = index.check_content(digest, source.name)
+        if original:
+            duplicates.append((source, original))
+        else:
+            yield source
+
+
+def split_content_duplicates(sources: Iterable[PdfSource], index: DuplicateIndex
+                             ) -> Tuple[List[PdfSource], List[Tuple[PdfSource, str]]]:
+    """
+    Separa as fontes únicas das cópias idênticas, antes da extração.
+
+    Returns:
+        Tuple: (fontes a processar, lista de (duplicata, arquivo original)).
+    """
+    duplicates = []
+    unique = list(iter_unique_sources(sources, index, duplicates))
+    return unique, duplicates
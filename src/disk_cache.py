@@ -0,0 +1,57 @@
+"""
+Módulo de Limpeza dos Caches em Disco
+
+Os caches em data/cache crescem a cada PDF novo aberto ou processado.
+prune() mantém uma pasta de cache abaixo de um tamanho máximo, removendo
+primeiro os arquivos usados há mais tempo: quem lê do cache chama touch()
+no arquivo, então a data de modificação marca o último uso.
+"""
+import os
+from pathlib import Path
+from typing import Union
+
+
+def touch(path: Union[str, Path]) -> None:
+    """Marca um arquivo do cache como usado agora (ignora um arquivo já removido)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune(cache_dir: Union[str, Path], max_bytes: int) -> int:
+    """
+    Remove os arquivos usados há mais tempo até a pasta caber em 'max_bytes'.
+
+    Arquivos temporários (gravações em andamento) não são contados nem
+    removidos, e um arquivo que não pode ser removido agora (ex: aberto por
+    outro processo no Windows) é mantido.
+
+    Args:
+        cache_dir (Union[str, Path]): A pasta do cache.
+        max_bytes (int): O tamanho máximo da pasta.
+
+    Returns:
+        int: Bytes removidos.
+    """
+    entries = []
+    try:
+        with os.scandir(cache_dir) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".tmp") and entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return 0
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total - removed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += size
+    return removed
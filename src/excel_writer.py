@@ -1,8 +1,19 @@
 """
 Módulo de Geração de Planilhas Excel
 """
+import os
+import posixpath
+import re
+import shutil
+import zipfile
+from xml.sax.saxutils import escape, unescape
+
 import pandas as pd
-from typing import List, Dict, Any
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple, Union
+
+from src.record_store import RecordTable
 
 # A importação do config não é mais necessária aqui
 # from .config import OUTPUT_DIR
@@ -10,27 +21,268 @@ from typing import List, Dict, Any
 # A assinatura da função agora espera o caminho completo
 
 
-def generate_excel_report(data: List[Dict[str, Any]], output_path: str) -> None:
+# Planilhas extras: {nome: (cabeçalho, linhas)}
+SummarySheets = Dict[str, Tuple[List[str], List[List[Any]]]]
+
+
+def generate_excel_report(data: Union[RecordTable, List[Dict[str, Any]]], output_path: str,
+                          summaries: Optional[SummarySheets] = None) -> None:
     """
-    Gera um relatório Excel a partir de uma lista de dicionários.
+    Gera um relatório Excel a partir dos registros processados. Uma falha
+    na gravação é informada e propagada, como em append_excel_report.
 
     Args:
-        data (List[Dict[str, Any]]): A lista de dados processados.
+        data (Union[RecordTable, List[Dict[str, Any]]]): Os dados processados,
+            em uma RecordTable (por colunas) ou em uma lista de dicionários.
         output_path (str): O caminho completo onde o arquivo Excel será salvo.
+        summaries (SummarySheets, optional): Planilhas de resumo gravadas
+            depois da planilha de dados (ver summaries.SummaryTotals.sheets).
     """
     if not data:
         print("Nenhum dado para gerar o relatório. O arquivo Excel não será criado.")
         return
 
     try:
-        df = pd.DataFrame(data)
+        if isinstance(data, RecordTable):
+            # Monta o DataFrame direto das colunas, sem um dict por nota
+            df = pd.DataFrame(data.to_columns(), columns=data.columns)
+        else:
+            df = pd.DataFrame(data)
 
         # A variável output_path já é o caminho completo, não precisamos mais construí-lo
         print(f"\nGerando relatório Excel em: {output_path}")
 
-        df.to_excel(output_path, index=False, engine='openpyxl')
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False)
+            for sheet_name, (header, rows) in (summaries or {}).items():
+                pd.DataFrame(rows, columns=header).to_excel(
+                    writer, sheet_name=sheet_name, index=False)
 
         print("Relatório Excel gerado com sucesso!")
 
     except Exception as e:
         print(f"ERRO: Não foi possível gerar o arquivo Excel. Detalhes: {e}")
+        raise
+
+
+def read_report_keys(report_path: str, key_columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Lê apenas as colunas-chave de um relatório gerado por esta ferramenta.
+
+    Args:
+        report_path (str): O relatório .xlsx existente.
+        key_columns (Sequence[str]): Colunas a ler (ex: 'arquivo_origem' e o
+                                     número da nota). As ausentes são ignoradas.
+
+    Returns:
+        Dict[str, Any]: {"header": colunas do relatório, "rows": número de
+                         notas, "keys": {coluna: lista de valores}}.
+    """
+    workbook = load_workbook(report_path, read_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = [cell for cell in next(sheet.iter_rows(max_row=1, values_only=True), ())]
+        header = [str(name) for name in header if name is not None]
+        positions = {name: header.index(name) for name in key_columns if name in header}
+        keys = {name: [] for name in positions}
+        rows = 0
+        if positions:
+            # Lê só o intervalo de colunas que contém as chaves
+            first, last = min(positions.values()), max(positions.values())
+            for values in sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1,
+                                          values_only=True):
+                rows += 1
+                for name, position in positions.items():
+                    keys[name].append(values[position - first])
+        return {"header": header, "rows": rows, "keys": keys}
+    finally:
+        workbook.close()
+
+
+def _cell_xml(ref: str, value: Any) -> str:
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            return ""
+        return f'<c r="{ref}" t="n"><v>{value}</v></c>'
+    return (f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">'
+            f'{escape(str(value))}</t></is></c>')
+
+
+def _rows_xml(rows: Iterable[Sequence[Any]], first_row: int) -> Iterable[str]:
+    for offset, values in enumerate(rows):
+        number = first_row + offset
+        cells = "".join(_cell_xml(f"{get_column_letter(i + 1)}{number}", value)
+                        for i, value in enumerate(values) if value is not None)
+        yield f'<row r="{number}">{cells}</row>'
+
+
+def _sheet_paths(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Mapeia o nome de cada planilha ao caminho do seu XML, na ordem do relatório."""
+    workbook = archive.read("xl/workbook.xml").decode("utf-8")
+    rels = archive.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    targets = {}
+    for relationship in re.findall(r"<Relationship\b[^>]*>", rels):
+        rel_id = re.search(r'\bId="([^"]+)"', relationship).group(1)
+        target = re.search(r'Target="([^"]+)"', relationship).group(1)
+        targets[rel_id] = target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+    paths = {}
+    for sheet in re.findall(r"<sheet\b[^>]*>", workbook):
+        name = unescape(re.search(r'\bname="([^"]*)"', sheet).group(1))
+        paths[name] = targets[re.search(r'\br:id="([^"]+)"', sheet).group(1)]
+    if not paths:
+        raise ValueError("Planilha de dados não encontrada no relatório.")
+    return paths
+
+
+def _sheet_xml(header: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """XML completo de uma planilha pequena (usado nas de resumo)."""
+    last_cell = f"{get_column_letter(max(len(header), 1))}{len(rows) + 1}"
+    body = "".join(_rows_xml([header, *rows], 1))
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<dimension ref="A1:{last_cell}"/><sheetData>{body}</sheetData></worksheet>')
+
+
+def _add_sheets(archive: zipfile.ZipFile, names: Sequence[str]) -> Tuple[Dict[str, bytes], Dict[str, str]]:
+    """
+    Registra planilhas novas no pacote (workbook, relações e tipos de conteúdo).
+
+    Returns:
+        Tuple: ({arquivo do pacote: novo conteúdo}, {nome da planilha: caminho do XML}).
+    """
+    workbook = archive.read("xl/workbook.xml").decode("utf-8")
+    rels = archive.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    content_types = archive.read("[Content_Types].xml").decode("utf-8")
+    existing_files = set(archive.namelist())
+    next_sheet_id = max(map(int, re.findall(r'<sheet\b[^>]*\bsheetId="(\d+)"', workbook)), default=0) + 1
+    used_rel_ids = set(re.findall(r'\bId="([^"]+)"', rels))
+
+    paths = {}
+    sheets_xml, rels_xml, types_xml = "", "", ""
+    number = 1
+    for name in names:
+        while f"xl/worksheets/sheet{number}.xml" in existing_files:
+            number += 1
+        path = f"xl/worksheets/sheet{number}.xml"
+        existing_files.add(path)
+        rel_id = f"rIdResumo{number}"
+        while rel_id in used_rel_ids:
+            rel_id += "_"
+        used_rel_ids.add(rel_id)
+        paths[name] = path
+        quoted_name = escape(name, {'"': "&quot;"})
+        sheets_xml += f'<sheet name="{quoted_name}" sheetId="{next_sheet_id}" r:id="{rel_id}"/>'
+        rels_xml += (f'<Relationship Id="{rel_id}" Target="worksheets/sheet{number}.xml" '
+                     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>')
+        types_xml += (f'<Override PartName="/{path}" ContentType="application/'
+                      'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+        next_sheet_id += 1
+
+    updated = {
+        "xl/workbook.xml": workbook.replace("</sheets>", sheets_xml + "</sheets>", 1),
+        "xl/_rels/workbook.xml.rels": rels.replace("</Relationships>", rels_xml + "</Relationships>", 1),
+        "[Content_Types].xml": content_types.replace("</Types>", types_xml + "</Types>", 1),
+    }
+    return {name: content.encode("utf-8") for name, content in updated.items()}, paths
+
+
+def append_excel_report(data: RecordTable, output_path: str, existing: Dict[str, Any],
+                        summaries: Optional[SummarySheets] = None) -> None:
+    """
+    Acrescenta notas novas ao final de um relatório existente.
+
+    O XML da planilha é copiado em blocos, sem ser interpretado, e as novas
+    linhas são inseridas antes de '</sheetData>'. Não há carga do relatório
+    inteiro no openpyxl/pandas, então o custo é dominado pela cópia dos bytes.
+    Colunas que não existiam no relatório são adicionadas ao final do cabeçalho.
+
+    Args:
+        data (RecordTable): As notas novas.
+        output_path (str): O relatório existente (é substituído ao final).
+        existing (Dict[str, Any]): O resultado de read_report_keys().
+        summaries (SummarySheets, optional): Planilhas de resumo, reescritas
+            por inteiro (ou criadas, se o relatório ainda não as tiver).
+    """
+    header = list(existing["header"])
+    new_columns = [name for name in data.columns if name not in header]
+    header.extend(new_columns)
+    positions = [data.columns.index(name) if name in data.columns else None for name in header]
+    rows = ([values[p] if p is not None else None for p in positions]
+            for values in data.iter_rows())
+
+    first_new_row = existing["rows"] + 2  # +1 do cabeçalho, +1 para a próxima linha
+    last_row = existing["rows"] + 1 + len(data)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+
+    print(f"\nAcrescentando {len(data)} nota(s) ao relatório: {output_path}")
+    try:
+        with zipfile.ZipFile(output_path) as zin, \
+                zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            sheet_paths = _sheet_paths(zin)
+            sheet_path = next(iter(sheet_paths.values()))
+            summaries = summaries or {}
+            missing = [name for name in summaries if name not in sheet_paths]
+            replaced, new_paths = _add_sheets(zin, missing) if missing else ({}, {})
+            sheet_paths.update(new_paths)
+            replaced.update({sheet_paths[name]: _sheet_xml(*sheet).encode("utf-8")
+                             for name, sheet in summaries.items()})
+
+            for info in zin.infolist():
+                if info.filename in replaced:
+                    zout.writestr(info, replaced.pop(info.filename))
+                    continue
+                with zin.open(info) as src, zout.open(info.filename, "w", force_zip64=True) as dst:
+                    if info.filename != sheet_path:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                        continue
+                    _splice_sheet(src, dst, header, new_columns, rows, first_new_row, last_row)
+            for filename, content in replaced.items():  # Planilhas de resumo novas
+                zout.writestr(filename, content)
+        os.replace(tmp_path, output_path)
+        print("Relatório Excel atualizado com sucesso!")
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"ERRO: Não foi possível atualizar o arquivo Excel. Detalhes: {e}")
+        raise
+
+
+def _splice_sheet(src, dst, header, new_columns, rows, first_new_row, last_row) -> None:
+    """Copia o XML da planilha inserindo as novas linhas (e colunas) em streaming."""
+    end_tag = b"</sheetData>"
+    # Início do arquivo até o fim da linha de cabeçalho: ajusta a dimensão e as colunas
+    head = b""
+    while b"</row>" not in head:
+        chunk = src.read(64 * 1024)
+        if not chunk:
+            raise ValueError("Cabeçalho do relatório não encontrado.")
+        head += chunk
+    header_end = head.index(b"</row>")
+    prefix, rest = head[:header_end], head[header_end:]
+    last_column = get_column_letter(len(header))
+    prefix = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="A1:{last_column}{last_row}"'.encode(),
+                    prefix, count=1)
+    first_new_column = len(header) - len(new_columns)
+    prefix += "".join(_cell_xml(f"{get_column_letter(first_new_column + i + 1)}1", name)
+                      for i, name in enumerate(new_columns)).encode("utf-8")
+    dst.write(prefix)
+
+    # Restante: cópia em blocos até '</sheetData>' (que pode cair entre dois blocos)
+    buffer = rest
+    while True:
+        position = buffer.find(end_tag)
+        if position >= 0:
+            dst.write(buffer[:position])
+            for row_xml in _rows_xml(rows, first_new_row):
+                dst.write(row_xml.encode("utf-8"))
+            dst.write(buffer[position:])
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+            return
+        keep = len(end_tag) - 1
+        dst.write(buffer[:-keep])
+        chunk = src.read(1024 * 1024)
+        if not chunk:
+            raise ValueError("Fim dos dados ('</sheetData>') não encontrado no relatório.")
+        buffer = buffer[-keep:] + chunk
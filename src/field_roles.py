@@ -0,0 +1,65 @@
+"""
+Módulo de Papéis de Campos
+
+Os layouts usam nomes livres para os campos ('CNPJ Prestador', 'cnpj_prestador',
+'CNPJ do Prestador'...). Este módulo identifica qual campo de um layout exerce
+cada papel de negócio (CNPJ do prestador, número da nota, data de emissão...),
+para que etapas como deduplicação e totalizações funcionem com qualquer layout.
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+# Para cada papel, uma lista de alternativas; cada alternativa é uma tupla de
+# fragmentos que precisam aparecer todos no nome normalizado do campo.
+ROLE_KEYWORDS: Dict[str, Tuple[Tuple[str, ...], ...]] = {
+    "cnpj_prestador": (("cnpj", "prestador"), ("cpf", "prestador")),
+    "cnpj_tomador": (("cnpj", "tomador"), ("cpf", "tomador")),
+    "nome_prestador": (("nome", "prestador"),),
+    "nome_tomador": (("nome", "tomador"),),
+    "numero_nota": (("numero", "nota"), ("numero", "nf"), ("num", "nf")),
+    "data_emissao": (("data", "emissao"),),
+    "valor_servico": (("valor", "servico"),),
+}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normaliza um nome de campo: sem acentos, minúsculo e com palavras
+    separadas por um único espaço.
+
+    Exemplo: 'Número da Nota' -> 'numero da nota'
+    """
+    without_accents = unicodedata.normalize("NFKD", name).encode(
+        "ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", " ", without_accents.lower()).strip()
+
+
+def find_field(field_names: Iterable[str], role: str) -> Optional[str]:
+    """
+    Retorna o nome do primeiro campo que corresponde ao papel, ou None.
+
+    Exemplo: find_field(['Número da Nota', 'CNPJ Prestador'], 'numero_nota')
+             -> 'Número da Nota'
+    """
+    alternatives = ROLE_KEYWORDS[role]
+    for field_name in field_names:
+        normalized = normalize_name(field_name)
+        if normalized == role.replace("_", " "):
+            return field_name
+        words = normalized.split()
+        for fragments in alternatives:
+            if all(any(word.startswith(fragment) for word in words) for fragment in fragments):
+                return field_name
+    return None
+
+
+def resolve_roles(field_names: Iterable[str]) -> Dict[str, str]:
+    """Mapeia cada papel conhecido para o campo correspondente do layout."""
+    field_names = list(field_names)
+    roles = {}
+    for role in ROLE_KEYWORDS:
+        field_name = find_field(field_names, role)
+        if field_name:
+            roles[role] = field_name
+    return roles
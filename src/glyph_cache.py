@@ -0,0 +1,159 @@
+"""
+Módulo do Cache de Caracteres (glifos)
+
+Guarda em disco os caracteres de cada página já analisada, para que um
+layout novo ou corrigido possa ser aplicado ao arquivo inteiro sem passar
+os PDFs pelo pdfplumber de novo: só as caixas mudaram, não o conteúdo.
+
+Cada página vira um array estruturado do NumPy (um .npy por página, com o
+hash do conteúdo do PDF + o número da página no nome), com o texto, a caixa
+e o tamanho da fonte de cada caractere. Os arrays são abertos por mapeamento
+de memória: só as partes lidas vão para a memória. Um arquivo .json por PDF
+guarda o número de páginas e a caixa de cada uma.
+
+O texto de uma caixa sai de uma seleção vetorizada sobre o array (os
+caracteres que tocam a caixa); só os selecionados viram dicionários para
+as funções de texto do pdfplumber, então o resultado é o mesmo de
+page.crop(caixa).extract_text(). As coordenadas ficam em float64 para
+isso: arredondá-las poderia mudar a quebra de linhas e palavras.
+
+O cache é limitado a config.CHAR_CACHE_MAX_MB (prune_cache, chamada ao fim
+de cada lote e de cada teste de layout): os arquivos usados há mais tempo
+saem primeiro. Quem lê uma página ou um .json sem ela refaz só o que falta.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pdfplumber import utils as pdfplumber_utils
+
+from src import config, disk_cache
+from src.pdf_processor import extract_text_from_chars
+
+COORDINATES = ("x0", "top", "x1", "bottom")
+
+
+def glyph_dtype(text_length: int = 1) -> np.dtype:
+    """Tipo dos arrays do cache. O texto usa a largura do maior caractere da página (ex: ligaduras)."""
+    return np.dtype([("x0", "<f8"), ("top", "<f8"), ("x1", "<f8"), ("bottom", "<f8"),
+                     ("size", "<f4"), ("upright", "?"), ("text", f"<U{max(1, text_length)}")])
+
+
+def to_glyphs(chars: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """Converte os caracteres de uma página (ex: page.chars do pdfplumber) num array do cache."""
+    chars = list(chars)
+    glyphs = np.zeros(len(chars), dtype=glyph_dtype(max((len(c["text"]) for c in chars), default=1)))
+    for name in COORDINATES + ("size", "upright", "text"):
+        glyphs[name] = [c[name] for c in chars]
+    return glyphs
+
+
+def to_chars(glyphs: np.ndarray) -> List[Dict[str, Any]]:
+    """Caracteres no formato do pdfplumber (o 'doctop' é relativo à página, como o 'top')."""
+    columns = [glyphs[name].tolist() for name in ("text", "x0", "top", "x1", "bottom", "upright", "size")]
+    return [{"text": text, "x0": x0, "top": top, "x1": x1, "bottom": bottom,
+             "doctop": top, "upright": upright, "size": size}
+            for text, x0, top, x1, bottom, upright, size in zip(*columns)]
+
+
+def box_mask(glyphs: np.ndarray, box: Sequence[float]) -> np.ndarray:
+    """
+    Seleciona os caracteres que tocam a caixa (x0, top, x1, bottom), com a
+    mesma regra do crop do pdfplumber (utils.crop_to_bbox).
+    """
+    x0, top, x1, bottom = box
+    width = np.minimum(glyphs["x1"], x1) - np.maximum(glyphs["x0"], x0)
+    height = np.minimum(glyphs["bottom"], bottom) - np.maximum(glyphs["top"], top)
+    return (width >= 0) & (height >= 0) & (width + height > 0)
+
+
+def box_text(glyphs: np.ndarray, box: Sequence[float]) -> str:
+    """Texto de uma caixa, igual ao de page.crop(box).extract_text().strip()."""
+    selected = glyphs[box_mask(glyphs, box)]
+    return extract_text_from_chars(to_chars(selected), box) if len(selected) else ""
+
+
+def page_words(glyphs: np.ndarray) -> List[Dict[str, Any]]:
+    """Palavras da página (para as âncoras), como page.extract_words()."""
+    return pdfplumber_utils.extract_words(to_chars(glyphs))
+
+
+def prune_cache(cache_dir: Optional[Path] = None) -> int:
+    """Mantém o cache abaixo de config.CHAR_CACHE_MAX_MB. Retorna os bytes removidos."""
+    return disk_cache.prune(cache_dir or config.CHAR_CACHE_DIR,
+                            config.CHAR_CACHE_MAX_MB * 1024 * 1024)
+
+
+class GlyphCache:
+    """
+    Cache de caracteres em disco.
+
+    Args:
+        cache_dir (Path): Pasta do cache. É criada se não existir.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _page_path(self, digest: str, page_num: int) -> Path:
+        return self.cache_dir / f"{digest}_p{page_num}.npy"
+
+    def _info_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.json"
+
+    def _replace(self, path: Path, write) -> None:
+        # Escrita atômica: outro processo nunca lê um arquivo pela metade
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def load_page(self, digest: str, page_num: int) -> Optional[np.ndarray]:
+        """Os caracteres de uma página (mapeados do disco), ou None se não estiverem no cache."""
+        path = self._page_path(digest, page_num)
+        try:
+            glyphs = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        disk_cache.touch(path)
+        return glyphs
+
+    def save_page(self, digest: str, page_num: int, glyphs: np.ndarray) -> None:
+        self._replace(self._page_path(digest, page_num), lambda f: np.save(f, glyphs))
+
+    def load_info(self, digest: str) -> Optional[Dict[str, Any]]:
+        """{"paginas": número de páginas, "caixas": [caixa de cada página]}, ou None."""
+        path = self._info_path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        disk_cache.touch(path)
+        return info
+
+    def save_info(self, digest: str, page_boxes: Sequence[Sequence[float]]) -> Dict[str, Any]:
+        """Grava o número de páginas e a caixa de cada uma. Retorna o que foi gravado."""
+        info = {"paginas": len(page_boxes), "caixas": [list(map(float, box)) for box in page_boxes]}
+        self._replace(self._info_path(digest),
+                      lambda f: f.write(json.dumps(info).encode("utf-8")))
+        return info
+
+    def fill(self, digest: str, pdf, pages: Iterable[int]) -> Dict[int, np.ndarray]:
+        """
+        Analisa as páginas informadas de um PDF já aberto no pdfplumber e as
+        grava no cache. As caixas das páginas são gravadas à parte (save_info).
+
+        Returns:
+            Dict[int, np.ndarray]: Os caracteres de cada página gravada.
+        """
+        filled = {}
+        for page_num in pages:
+            page = pdf.pages[page_num]
+            filled[page_num] = to_glyphs(page.chars)
+            page.close()  # Libera os objetos analisados da página
+            self.save_page(digest, page_num, filled[page_num])
+        return filled
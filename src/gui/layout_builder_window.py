@@ -3,16 +3,23 @@ Controller para a Janela do Criador de Layouts (Layout Builder).
 """
 import json
 import os
-import traceback
 from PySide6.QtWidgets import (QMainWindow, QFileDialog, QGraphicsScene, QGraphicsRectItem,
                                QTableWidgetItem, QInputDialog, QMessageBox, QGraphicsView)
 # --- LINHA CORRIGIDA ---
-from PySide6.QtCore import QFile, Qt, QRectF, Signal
+from PySide6.QtCore import QFile, QObject, Qt, QPointF, QRectF, QThread, QTimer, Signal
 from PySide6.QtUiTools import QUiLoader
-from PySide6.QtGui import QPixmap, QPen, QImage
-import pdfplumber
+from PySide6.QtGui import QPixmap, QPen
 
-from src import config
+from src import config, layout_tester, render_service
+from src.word_index import anchor_offset
+
+
+# Resolução de referência das coordenadas da cena (usada na conversão para pontos)
+SCENE_DPI = 200
+# Prévia rápida exibida enquanto a página em SCENE_DPI é renderizada
+PREVIEW_DPI = 50
+# Resoluções dos blocos renderizados ao aproximar o zoom
+TILE_DPIS = (400, 600)
 
 
 class PdfViewer(QGraphicsView):
@@ -22,18 +29,24 @@ class PdfViewer(QGraphicsView):
     """
     # Sinal que emitirá as coordenadas do retângulo selecionado
     rect_selected = Signal(QRectF)
+    # Sinal emitido quando o zoom ou a rolagem mudam a área visível
+    view_changed = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setScene(QGraphicsScene(self))
         self.start_pos = None
         self.current_rect_item = None
+        self.base_item = None
+        self.tile_items = {}
         self.setDragMode(QGraphicsView.ScrollHandDrag)
         # Permite que o QGraphicsView ancore a transformação no ponto do mouse
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.horizontalScrollBar().valueChanged.connect(self.view_changed)
+        self.verticalScrollBar().valueChanged.connect(self.view_changed)
 
     def wheelEvent(self, event):
         """
@@ -48,14 +61,47 @@ class PdfViewer(QGraphicsView):
         # Se foi rolada para baixo, aplica zoom out
         else:
             self.scale(1 / zoom_factor, 1 / zoom_factor)
+        self.view_changed.emit()
 
-    def set_pixmap(self, pixmap):
-        """Define a imagem do PDF a ser exibida."""
+    def set_pixmap(self, pixmap, scale=1.0):
+        """
+        Define a imagem do PDF a ser exibida. 'scale' ajusta imagens
+        renderizadas em outra resolução às coordenadas da cena (SCENE_DPI).
+        """
         self.scene().clear()
-        self.scene().addPixmap(pixmap)
+        self.tile_items = {}
+        self.base_item = self.scene().addPixmap(pixmap)
+        self.base_item.setScale(scale)
+        self.base_item.setTransformationMode(Qt.SmoothTransformation)
         # Reseta a visualização para mostrar a imagem inteira com zoom
         self.fitInView(self.scene().itemsBoundingRect(), Qt.KeepAspectRatio)
 
+    def replace_pixmap(self, pixmap, scale=1.0):
+        """Troca a imagem base (ex: prévia -> alta resolução) mantendo o zoom e os retângulos."""
+        if self.base_item is None:
+            self.set_pixmap(pixmap, scale)
+            return
+        self.base_item.setPixmap(pixmap)
+        self.base_item.setScale(scale)
+
+    def add_tile(self, key, pixmap, pos, scale, dpi):
+        """Sobrepõe um bloco em alta resolução à imagem base."""
+        item = self.scene().addPixmap(pixmap)
+        item.setPos(pos)
+        item.setScale(scale)
+        item.setTransformationMode(Qt.SmoothTransformation)
+        # Acima da imagem base (blocos de maior DPI por cima), abaixo dos retângulos
+        item.setZValue(1 + dpi / 10000)
+        self.tile_items[key] = item
+
+    def visible_scene_rect(self):
+        """Área da cena atualmente visível."""
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+
+    def zoom_level(self):
+        """Pixels de tela por unidade da cena."""
+        return self.transform().m11() * self.devicePixelRatioF()
+
     def mousePressEvent(self, event):
         """Inicia o desenho do retângulo com o botão esquerdo."""
         if event.button() == Qt.LeftButton:
@@ -75,6 +121,7 @@ class PdfViewer(QGraphicsView):
 
             pen = QPen(Qt.red, 2, Qt.SolidLine)
             self.current_rect_item = self.scene().addRect(rect, pen)
+            self.current_rect_item.setZValue(2)
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
@@ -105,18 +152,40 @@ class LayoutBuilderWindow(QMainWindow):
         self.window = loader.load(ui_file, self)
         ui_file.close()
 
-        self.pdf_page = None
+        self.pdf_path = None
+        self.page_size = None
+        self.base_dpi = None  # Resolução da imagem base exibida no momento
+        self.pending_tiles = set()
+        self.word_index = None
         self.mapped_fields = {}
+        self.field_anchors = {}  # Âncoras opcionais: nome do campo -> {"text", "offset"}
+        self.layout_tester = None  # Mantido entre testes para reaproveitar o cache
+        self.test_folder = ""
+        self.test_worker = None
 
         # Conecta os sinais aos slots
         self.window.btn_load_pdf.clicked.connect(self.load_pdf)
         self.window.btn_save_layout.clicked.connect(self.save_layout)
         self.window.btn_clear_selection.clicked.connect(self.clear_all_fields)
+        self.window.btn_test_layout.clicked.connect(self.test_layout)
 
         # Conecta o sinal do nosso PdfViewer customizado
         self.window.graphics_view_pdf.rect_selected.connect(
             self.on_rect_selected)
 
+        # Renderização em segundo plano, compartilhada com as ferramentas
+        self.render_service = render_service.get_service()
+        self.render_bridge = RenderBridge()
+        self.render_bridge.rendered.connect(self.on_page_rendered)
+        self.render_bridge.indexed.connect(self.on_page_indexed)
+        self.render_bridge.failed.connect(self.on_page_failed)
+        # Agrupa eventos seguidos de zoom/rolagem antes de pedir novos blocos
+        self.tile_timer = QTimer(self)
+        self.tile_timer.setSingleShot(True)
+        self.tile_timer.setInterval(150)
+        self.tile_timer.timeout.connect(self.request_tiles)
+        self.window.graphics_view_pdf.view_changed.connect(self.tile_timer.start)
+
         self.update_table()
         self.window.show()
 
@@ -126,32 +195,88 @@ class LayoutBuilderWindow(QMainWindow):
         if not file_path:
             return
 
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                self.pdf_page = pdf.pages[0]
-                # Aumenta a resolução para melhor zoom
-                pil_image = self.pdf_page.to_image(resolution=200).original
-
-                if pil_image.mode != "RGBA":
-                    pil_image = pil_image.convert("RGBA")
+        # Tudo em segundo plano: uma prévia em baixa resolução aparece
+        # primeiro, depois a página é analisada (tamanho e palavras, para as
+        # âncoras) e a página em SCENE_DPI substitui a prévia
+        self.pdf_path = file_path
+        self.page_size = None
+        self.word_index = None
+        self.base_dpi = None
+        self.pending_tiles = set()
+        self.render_bridge.request(
+            self.render_service, ("base", file_path, PREVIEW_DPI), file_path, 0, PREVIEW_DPI)
+        self.render_bridge.request_index(self.render_service, ("index", file_path), file_path, 0)
+        self.render_bridge.request(
+            self.render_service, ("base", file_path, SCENE_DPI), file_path, 0, SCENE_DPI)
+
+    def on_page_indexed(self, key, result):
+        """Recebe o tamanho e o índice de palavras da página carregada."""
+        if key[1] != self.pdf_path:
+            return  # Resultado de um PDF carregado anteriormente
+        self.page_size, self.word_index = result
+        self.request_tiles()
+
+    def on_page_failed(self, key, message):
+        """Informa que o PDF carregado não pôde ser aberto."""
+        if key[1] != self.pdf_path:
+            return
+        self.pdf_path = None  # Descarta os resultados que ainda chegarem deste PDF
+        self.show_message_box(
+            "Erro", f"Não foi possível carregar o PDF:\n{message}", "critical")
+
+    def on_page_rendered(self, key, png_path):
+        """Exibe uma imagem renderizada (prévia, página ou bloco de zoom)."""
+        if key[1] != self.pdf_path:
+            return  # Resultado de um PDF carregado anteriormente
+        viewer = self.window.graphics_view_pdf
+        # O Qt decodifica o PNG do cache direto em um pixmap, sem passar pelo PIL
+        pixmap = QPixmap(png_path)
+        dpi = key[2]
+
+        if key[0] == "base":
+            if self.base_dpi is None:
+                viewer.set_pixmap(pixmap, SCENE_DPI / dpi)
+                self.clear_all_fields()
+                self.base_dpi = dpi
+            elif dpi > self.base_dpi:
+                viewer.replace_pixmap(pixmap, SCENE_DPI / dpi)
+                self.base_dpi = dpi
+            return
 
-                qimage = QImage(pil_image.tobytes(
-                    "raw", "RGBA"), pil_image.width, pil_image.height, QImage.Format_RGBA8888)
-                pixmap = QPixmap.fromImage(qimage)
+        tile = key[3]
+        self.pending_tiles.discard(key)
+        to_scene = SCENE_DPI / 72
+        viewer.add_tile(key, pixmap, QPointF(tile[0] * to_scene, tile[1] * to_scene),
+                        SCENE_DPI / dpi, dpi)
 
-                self.window.graphics_view_pdf.set_pixmap(pixmap)
-                self.clear_all_fields()
-        except Exception as e:
-            traceback.print_exc()
-            self.show_message_box(
-                "Erro", f"Não foi possível carregar o PDF:\n{e}", "critical")
+    def request_tiles(self):
+        """Pede blocos em alta resolução para a área visível quando o zoom passa da imagem base."""
+        if not self.pdf_path or self.base_dpi != SCENE_DPI or self.page_size is None:
+            return
+        viewer = self.window.graphics_view_pdf
+        needed_dpi = SCENE_DPI * viewer.zoom_level()
+        if needed_dpi <= SCENE_DPI * 1.2:
+            return
+        dpi = next((d for d in TILE_DPIS if d >= needed_dpi), TILE_DPIS[-1])
+
+        rect = viewer.visible_scene_rect()
+        to_points = 72 / SCENE_DPI
+        region = (rect.left() * to_points, rect.top() * to_points,
+                  rect.right() * to_points, rect.bottom() * to_points)
+        for tile in render_service.tiles_for_region(region, self.page_size):
+            key = ("tile", self.pdf_path, dpi, tile)
+            if key in viewer.tile_items or key in self.pending_tiles:
+                continue
+            self.pending_tiles.add(key)
+            self.render_bridge.request(
+                self.render_service, key, self.pdf_path, 0, dpi, tile)
 
     def on_rect_selected(self, rect):
         """Chamado quando um retângulo é selecionado no PdfViewer."""
-        if not self.pdf_page:
-            return
+        if self.page_size is None:
+            return  # Página ainda não carregada (ou em análise)
 
-        conversion_factor = 72 / 200  # Resolução aumentada para 200
+        conversion_factor = 72 / SCENE_DPI  # Resolução aumentada para 200
         coords = [
             round(rect.left() * conversion_factor, 2),
             round(rect.top() * conversion_factor, 2),
@@ -163,10 +288,29 @@ class LayoutBuilderWindow(QMainWindow):
             self, "Nome do Campo", "Digite o nome para este campo:")
         if ok and field_name:
             perm_pen = QPen(Qt.green, 2, Qt.DashLine)
-            self.window.graphics_view_pdf.scene().addRect(rect, perm_pen)
+            self.window.graphics_view_pdf.scene().addRect(rect, perm_pen).setZValue(2)
             self.mapped_fields[field_name] = coords
+            self.field_anchors.pop(field_name, None)
+            self.ask_anchor(field_name, coords)
             self.update_table()
 
+    def ask_anchor(self, field_name, coords):
+        """Pergunta por um rótulo âncora opcional e calcula o deslocamento do campo."""
+        anchor_text, ok = QInputDialog.getText(
+            self, "Âncora (opcional)",
+            "Rótulo próximo ao campo (ex: CPF/CNPJ:).\nDeixe vazio para usar apenas as coordenadas:")
+        if not ok or not anchor_text.strip() or self.word_index is None:
+            return
+
+        position = self.word_index.find(anchor_text, near=(coords[0], coords[1]))
+        if position is None:
+            self.show_message_box(
+                "Atenção", f"O rótulo '{anchor_text}' não foi encontrado na página.\n"
+                "O campo usará apenas as coordenadas.", "warning")
+            return
+        self.field_anchors[field_name] = {
+            "text": anchor_text.strip(), "offset": anchor_offset(position, coords)}
+
     def update_table(self):
         """Atualiza a tabela com os campos mapeados."""
         self.window.table_widget_fields.setRowCount(0)
@@ -175,11 +319,15 @@ class LayoutBuilderWindow(QMainWindow):
             self.window.table_widget_fields.insertRow(row_position)
             self.window.table_widget_fields.setItem(
                 row_position, 0, QTableWidgetItem(name))
+            description = str(coords)
+            if name in self.field_anchors:
+                description += f"  (âncora: {self.field_anchors[name]['text']})"
             self.window.table_widget_fields.setItem(
-                row_position, 1, QTableWidgetItem(str(coords)))
+                row_position, 1, QTableWidgetItem(description))
 
     def clear_all_fields(self):
         self.mapped_fields = {}
+        self.field_anchors = {}
         # Limpa apenas os retângulos verdes, a imagem base é gerenciada por set_pixmap
         scene = self.window.graphics_view_pdf.scene()
         items_to_remove = [item for item in scene.items(
@@ -189,6 +337,49 @@ class LayoutBuilderWindow(QMainWindow):
             scene.removeItem(item)
         self.update_table()
 
+    def build_layout_data(self):
+        """Monta o dicionário do layout no formato dos arquivos JSON."""
+        layout_data = {}
+        for name, coords in self.mapped_fields.items():
+            layout_data[name] = {"page": 0, "coords": coords}
+            if name in self.field_anchors:
+                layout_data[name]["anchor"] = self.field_anchors[name]
+        return layout_data
+
+    def test_layout(self):
+        """Aplica o layout atual a uma pasta de amostras, em segundo plano."""
+        if not self.mapped_fields:
+            self.show_message_box(
+                "Atenção", "Nenhum campo foi mapeado ainda.", "warning")
+            return
+        if self.test_worker is not None and self.test_worker.isRunning():
+            return
+
+        folder = QFileDialog.getExistingDirectory(
+            self, "Selecionar Pasta de Amostras", self.test_folder or str(config.PDF_SAMPLES_DIR))
+        if not folder:
+            return
+        if folder != self.test_folder or self.layout_tester is None:
+            # Um novo testador para outra pasta; o da pasta atual guarda os
+            # campos já avaliados, então mover um retângulo reavalia só ele.
+            self.layout_tester = layout_tester.LayoutTester.from_folder(folder)
+            self.test_folder = folder
+
+        self.window.btn_test_layout.setEnabled(False)
+        self.window.statusbar.showMessage("Testando layout...")
+        self.test_worker = LayoutTestWorker(self.layout_tester, self.build_layout_data())
+        self.test_worker.progress.connect(
+            lambda done, total: self.window.statusbar.showMessage(
+                f"Testando layout... {done}/{total} arquivo(s)"))
+        self.test_worker.finished.connect(self.on_test_finished)
+        self.test_worker.start()
+
+    def on_test_finished(self, report_text):
+        """Exibe o relatório do teste de layout."""
+        self.window.btn_test_layout.setEnabled(True)
+        self.window.statusbar.clearMessage()
+        self.show_message_box("Resultado do Teste de Layout", report_text, "info")
+
     def save_layout(self):
         """Salva o layout mapeado em um arquivo JSON."""
         if not self.mapped_fields:
@@ -199,9 +390,7 @@ class LayoutBuilderWindow(QMainWindow):
         file_name, ok = QInputDialog.getText(
             self, "Salvar Layout", "Digite o nome do arquivo de layout (ex: prefeitura_campinas):")
         if ok and file_name:
-            layout_data = {}
-            for name, coords in self.mapped_fields.items():
-                layout_data[name] = {"page": 0, "coords": coords}
+            layout_data = self.build_layout_data()
 
             output_path = os.path.join(config.LAYOUTS_DIR, f"{file_name}.json")
             try:
@@ -226,3 +415,53 @@ class LayoutBuilderWindow(QMainWindow):
         }
         msg_box.setIcon(icon_map.get(level, QMessageBox.NoIcon))
         msg_box.exec()
+
+
+class RenderBridge(QObject):
+    """
+    Entrega à thread da interface os resultados do serviço de renderização.
+    O sinal é emitido na thread de renderização e o Qt o enfileira para a GUI.
+    """
+    rendered = Signal(object, str)     # (chave da requisição, caminho do PNG)
+    indexed = Signal(object, object)   # (chave, ((largura, altura), WordIndex))
+    failed = Signal(object, str)       # (chave, mensagem de erro da análise)
+
+    def request(self, service, key, *args):
+        future = service.submit(*args)
+        future.add_done_callback(lambda f: self._on_done(key, f))
+
+    def request_index(self, service, key, pdf_path, page_num):
+        future = service.submit_page_index(pdf_path, page_num)
+        future.add_done_callback(lambda f: self._on_indexed(key, f))
+
+    def _on_done(self, key, future):
+        if future.exception() is None:
+            self.rendered.emit(key, str(future.result()))
+        else:
+            print(f"Erro ao renderizar {key}: {future.exception()}")
+
+    def _on_indexed(self, key, future):
+        if future.exception() is None:
+            self.indexed.emit(key, future.result())
+        else:
+            self.failed.emit(key, str(future.exception()))
+
+
+class LayoutTestWorker(QThread):
+    """
+    Worker thread que executa o teste de layout sem congelar a janela.
+    """
+    progress = Signal(int, int)  # (arquivos avaliados, total)
+    finished = Signal(str)       # Relatório formatado (ou mensagem de erro)
+
+    def __init__(self, tester, layout_data):
+        super().__init__()
+        self.tester = tester
+        self.layout_data = layout_data
+
+    def run(self):
+        try:
+            report = self.tester.run(self.layout_data, progress=self.progress.emit)
+            self.finished.emit(layout_tester.format_report(report))
+        except Exception as e:
+            self.finished.emit(f"Ocorreu um erro ao testar o layout:\n{e}")
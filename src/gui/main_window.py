@@ -11,7 +11,7 @@ import sys
 from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox
 from PySide6.QtCore import QFile, QThread, Signal
 from PySide6.QtUiTools import QUiLoader
-from src import config, pdf_processor, data_parser, excel_writer
+from src import config, input_sources, pipeline
 from src.gui.layout_builder_window import LayoutBuilderWindow
 
 
@@ -68,9 +68,10 @@ class MainWindow(QMainWindow):
                 "Erro: Pasta de layouts não encontrada.")
 
     def select_pdfs(self):
-        """Abre uma caixa de diálogo para selecionar múltiplos arquivos PDF."""
+        """Abre uma caixa de diálogo para selecionar múltiplos arquivos PDF ou ZIP."""
         file_paths, _ = QFileDialog.getOpenFileNames(
-            self, "Selecionar arquivos PDF", "", "Arquivos PDF (*.pdf)")
+            self, "Selecionar arquivos PDF", "",
+            "Arquivos PDF ou ZIP (*.pdf *.zip);;Arquivos PDF (*.pdf);;Arquivos ZIP (*.zip)")
         if file_paths:
             self.pdf_files = file_paths
             self.window.list_widget_files.clear()
@@ -121,7 +122,8 @@ class MainWindow(QMainWindow):
         self.update_ui_state(processing=True)
 
         # Cria e inicia a worker thread
-        self.worker = Worker(self.pdf_files, layout_map, self.output_file_path)
+        self.worker = Worker(self.pdf_files, layout_map, self.output_file_path,
+                             append=self.window.check_box_append.isChecked())
         self.worker.progress.connect(self.window.progress_bar.setValue)
         self.worker.status_changed.connect(self.window.label_status.setText)
         self.worker.finished.connect(self.on_processing_finished)
@@ -157,6 +159,7 @@ class MainWindow(QMainWindow):
         self.window.btn_process_files.setEnabled(enable_process_button)
 
         self.window.combo_box_layouts.setEnabled(not processing)
+        self.window.check_box_append.setEnabled(not processing)
 
         if not processing:
             self.window.progress_bar.setValue(0)
@@ -174,9 +177,9 @@ class MainWindow(QMainWindow):
     def dropEvent(self, event):
         """Chamado quando os arquivos são "soltados" na janela."""
         urls = event.mimeData().urls()
-        # Filtra para manter apenas arquivos .pdf
+        # Filtra para manter apenas arquivos .pdf e .zip
         pdf_paths = [url.toLocalFile() for url in urls if url.isLocalFile(
-        ) and url.toLocalFile().lower().endswith('.pdf')]
+        ) and input_sources.is_supported_file(url.toLocalFile())]
 
         if pdf_paths:
             # Adiciona os novos arquivos à lista existente
@@ -240,52 +243,35 @@ class Worker(QThread):
     finished = Signal(str)
     error = Signal(str)                # Para sinalizar um erro crítico
 
-    def __init__(self, pdf_paths, layout_map, output_path):
+    def __init__(self, pdf_paths, layout_map, output_path, append=False):
         super().__init__()
         self.pdf_paths = pdf_paths
         self.layout_map = layout_map
         self.output_path = output_path  # Armazena o caminho completo
+        self.append = append  # Acrescenta ao relatório existente em vez de reescrevê-lo
 
     def run(self):
         """
         Este método é executado quando a thread inicia. Contém a lógica de extração.
         """
         try:
-            total_files = len(self.pdf_paths)
-            all_nfse_data = []
-
-            for i, pdf_path in enumerate(self.pdf_paths):
-                filename = os.path.basename(pdf_path)
-                self.status_changed.emit(f"Processando: {filename}...")
-
-                raw_data = pdf_processor.extract_data_from_pdf(
-                    pdf_path, self.layout_map)
-                if not raw_data:
-                    continue  # Pula arquivos que falharam na extração
-
-                clean_data = {"arquivo_origem": filename}
-                for field, raw_value in raw_data.items():
-                    parser_function = getattr(
-                        data_parser, f"parse_{field}", data_parser.clean_text)
-                    clean_data[field] = parser_function(raw_value)
-
-                all_nfse_data.append(clean_data)
-
-                # Calcula e emite o progresso
-                progress_percentage = int(((i + 1) / total_files) * 100)
-                self.progress.emit(progress_percentage)
-
-            if not all_nfse_data:
+            summary = pipeline.run_pipeline(
+                self.pdf_paths, self.layout_map, self.output_path,
+                append=self.append,
+                on_progress=self.progress.emit,
+                on_status=self.status_changed.emit)
+
+            if summary["notas"]:
+                action = "atualizado" if self.append else "salvo"
+                self.finished.emit(
+                    f"Processo concluído! {summary['notas']} nota(s) gravada(s). "
+                    f"Relatório {action} em:\n{self.output_path}")
+            elif self.append and summary["ja_no_relatorio"]:
+                self.finished.emit(
+                    "Nenhuma nota nova: todas já estavam no relatório.")
+            else:
                 self.error.emit(
                     "Nenhum dado pôde ser extraído dos arquivos selecionados.")
-                return
-
-            self.status_changed.emit("Gerando relatório Excel...")
-            excel_writer.generate_excel_report(
-                all_nfse_data, output_path=self.output_path)
-
-            self.finished.emit(
-                f"Processo concluído! Relatório salvo em:\n{self.output_path}")
 
         except Exception as e:
             self.error.emit(f"Ocorreu um erro: {str(e)}")
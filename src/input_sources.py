@@ -0,0 +1,138 @@
+"""
+Módulo de Fontes de Entrada
+
+Abstrai de onde vem cada PDF a ser processado: um arquivo em disco, um membro
+de um arquivo ZIP ou um buffer de bytes em memória. Os PDFs dentro de ZIPs são
+lidos diretamente do arquivo compactado, sem extração para disco.
+"""
+import io
+import os
+import threading
+import zipfile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Cache de ZipFiles abertos, para não reler o diretório central do arquivo a
+# cada membro (um ZIP pode conter milhares de PDFs). A chave inclui o PID: um
+# processo criado por fork herda o cache, mas não pode usar os ZipFiles do pai,
+# que dividem com ele o descritor e a posição de leitura do arquivo.
+_ZIP_HANDLES: Dict[Tuple[int, str], zipfile.ZipFile] = {}
+_ZIP_LOCK = threading.Lock()
+
+
+class PdfSource:
+    """
+    Descreve uma fonte de PDF de forma leve e serializável (pickle), para que
+    possa ser enviada aos processos de trabalho. O conteúdo só é lido em open().
+
+    Attributes:
+        name (str): Nome usado nos relatórios (ex: 'lote.zip/nota_01.pdf').
+        path (str): Caminho do PDF ou do ZIP no disco (None para bytes).
+        member (str): Nome do membro dentro do ZIP (None se não for ZIP).
+        data (bytes): Conteúdo em memória (apenas para fontes de bytes).
+        size (int): Tamanho em bytes do PDF, quando conhecido.
+    """
+    __slots__ = ("name", "path", "member", "data", "size")
+
+    def __init__(self, name: str, path: Optional[str] = None,
+                 member: Optional[str] = None, data: Optional[bytes] = None,
+                 size: Optional[int] = None):
+        self.name = name
+        self.path = path
+        self.member = member
+        self.data = data
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"PdfSource({self.name!r})"
+
+    def open(self) -> BinaryIO:
+        """Abre a fonte e retorna um objeto tipo arquivo, pronto para o pdfplumber."""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        if self.member is not None:
+            # O pdfminer faz muitos seeks para trás; em um membro comprimido isso
+            # forçaria descompressões repetidas, então o membro vai para memória.
+            # O consumo fica limitado ao tamanho de um PDF por processo.
+            return io.BytesIO(_get_zip(self.path).read(self.member))
+        return open(self.path, "rb")
+
+    def read_bytes(self) -> bytes:
+        """Lê todo o conteúdo da fonte."""
+        if self.data is not None:
+            return self.data
+        with self.open() as stream:
+            return stream.read()
+
+
+def _get_zip(zip_path: str) -> zipfile.ZipFile:
+    """Retorna um ZipFile aberto para o caminho, reaproveitando o do cache deste processo."""
+    key = (os.getpid(), zip_path)
+    with _ZIP_LOCK:  # As threads de leitura antecipada abrem membros em paralelo
+        handle = _ZIP_HANDLES.get(key)
+        if handle is None:
+            handle = zipfile.ZipFile(zip_path)
+            _ZIP_HANDLES[key] = handle
+    return handle
+
+
+def close_zip_handles() -> None:
+    """
+    Fecha os ZipFiles abertos por este processo. Chamada no fim de cada lote;
+    os herdados de outro processo são apenas esquecidos (quem os abriu os fecha).
+    """
+    pid = os.getpid()
+    with _ZIP_LOCK:
+        for (owner, _), handle in list(_ZIP_HANDLES.items()):
+            if owner == pid:
+                handle.close()
+        _ZIP_HANDLES.clear()
+
+
+def is_supported_file(path: str) -> bool:
+    """Indica se o caminho é um PDF ou um ZIP aceito como entrada."""
+    return path.lower().endswith((".pdf", ".zip"))
+
+
+def iter_zip_sources(zip_path: str) -> Iterator[PdfSource]:
+    """
+    Gera uma fonte para cada PDF contido em um arquivo ZIP.
+    Apenas o diretório central é lido aqui; o conteúdo fica no arquivo.
+    """
+    zip_name = os.path.basename(zip_path)
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            yield PdfSource(f"{zip_name}/{info.filename}", path=zip_path,
+                            member=info.filename, size=info.file_size)
+
+
+def from_bytes(name: str, data: bytes) -> PdfSource:
+    """Cria uma fonte a partir de um PDF já carregado em memória."""
+    return PdfSource(name, data=data, size=len(data))
+
+
+def expand_sources(paths: Iterable[str]) -> List[PdfSource]:
+    """
+    Converte uma lista de caminhos (PDFs e ZIPs) em fontes individuais de PDF.
+
+    Args:
+        paths (Iterable[str]): Caminhos selecionados pelo usuário.
+
+    Returns:
+        List[PdfSource]: Uma fonte por PDF, na ordem dos caminhos recebidos.
+    """
+    sources = []
+    for path in paths:
+        if path.lower().endswith(".zip"):
+            try:
+                sources.extend(iter_zip_sources(path))
+            except (zipfile.BadZipFile, OSError) as e:
+                print(f"Erro ao ler o arquivo ZIP '{path}': {e}")
+        else:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            sources.append(PdfSource(os.path.basename(path), path=path, size=size))
+    return sources
@@ -0,0 +1,238 @@
+"""
+Módulo de Extração por Rótulos (sem layout)
+
+Permite processar notas de prefeituras que ainda não têm um layout desenhado.
+Em vez de caixas com coordenadas, um "layout de rótulos" lista, para cada
+campo, os rótulos que costumam precedê-lo nas NFSe ("Número da Nota", "Data
+de Emissão", "CPF/CNPJ"...):
+
+    "cnpj_tomador": {"tipo": "documento", "secao": "tomador",
+                     "rotulos": ["CPF/CNPJ", "CNPJ/CPF", "CNPJ", "CPF"]}
+
+Todos os rótulos (e os títulos de seção, como "Dados do Tomador") são
+compilados numa única expressão regular, que percorre o texto da página uma
+só vez. Para cada rótulo encontrado, o valor é procurado à direita dele, na
+mesma linha, e depois logo abaixo, na mesma coluna (o formato de grade usado
+por muitas prefeituras). O valor precisa ter o formato do tipo do campo.
+
+Cada campo recebe uma confiança entre 0 e 1: maior quando o valor está na
+mesma linha do rótulo e quando o rótulo é o primeiro (o mais específico) da
+lista; menor para textos livres, que não têm formato a conferir, e para
+CNPJs/CPFs com dígitos verificadores errados.
+"""
+import json
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import document_validator
+from src.data_parser import DOCUMENT_PATTERN
+from src.word_index import WordIndex
+
+# Formato esperado do valor, por tipo de campo ("texto" aceita qualquer coisa)
+VALUE_PATTERNS = {
+    "documento": DOCUMENT_PATTERN,
+    "data": re.compile(r"\d{2}/\d{2}/\d{4}"),
+    "valor": re.compile(r"\d{1,3}(?:\.\d{3})*,\d{2}"),
+    "numero": re.compile(r"\d+"),
+}
+# Títulos que mudam a seção corrente da nota (para rótulos como "CPF/CNPJ",
+# que aparecem tanto nos dados do prestador quanto nos do tomador)
+SECTION_LABELS = {
+    "prestador": ("Dados do Prestador", "Prestador de Serviço", "Prestador de Serviços"),
+    "tomador": ("Dados do Tomador", "Tomador de Serviço", "Tomador de Serviços"),
+    "intermediario": ("Dados do Intermediário", "Intermediário de Serviços"),
+}
+# Rótulos que contêm um rótulo conhecido mas se referem a outra coisa; são
+# reconhecidos só para não serem confundidos com ele
+IGNORED_LABELS = ("Data de Emissão do RPS", "Número do RPS", "Série do RPS",
+                  "Razão Social do Intermediário")
+
+# Confiança pela posição do valor: (tipos com formato, texto livre)
+SAME_LINE_CONFIDENCE = (1.0, 0.8)
+BELOW_CONFIDENCE = (0.8, 0.6)
+# Redução por posição do rótulo na lista do campo (o primeiro é o mais específico)
+LABEL_RANK_PENALTY = 0.05
+INVALID_DOCUMENT_FACTOR = 0.5
+# Linhas abaixo do rótulo em que o valor ainda é procurado
+LINES_BELOW = 2
+# Folga horizontal (em pontos) ao procurar o valor sob o rótulo
+COLUMN_TOLERANCE = 4.0
+
+_ACCENTS = str.maketrans("áàâãäéèêëíìîïóòôõöúùûüçñÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑºª",
+                         "aaaaaeeeeiiiiooooouuuucnaaaaaeeeeiiiiooooouuuucnoa")
+
+
+def fold(text: str) -> str:
+    """Texto sem acentos e em minúsculas, para comparar com os rótulos."""
+    return text.translate(_ACCENTS).lower()
+
+
+def _label_pattern(label: str) -> str:
+    # Espaços opcionais entre as partes: 'CPF/CNPJ' também casa com 'CPF / CNPJ'.
+    # O rótulo não atravessa linhas.
+    tokens = re.findall(r"[a-z0-9]+|[^a-z0-9\s]", fold(label))
+    return " *".join(re.escape(token) for token in tokens)
+
+
+def is_label_layout(layout_map: Dict[str, Any]) -> bool:
+    """Indica se o layout é de rótulos (campos com 'rotulos' e sem coordenadas)."""
+    return bool(layout_map) and all(
+        isinstance(params, dict) and "rotulos" in params and "coords" not in params
+        for params in layout_map.values())
+
+
+class LabelMatcher:
+    """
+    Localiza os campos de um layout de rótulos nas palavras de uma página.
+
+    Args:
+        layout_map (Dict[str, Any]): {campo: {"tipo", "rotulos", "secao" (opcional)}}.
+    """
+
+    def __init__(self, layout_map: Dict[str, Any]):
+        self.fields = list(layout_map)
+        # Rótulo normalizado -> lista de (campo, seção exigida, posição na lista)
+        targets: Dict[str, List[Tuple[Optional[str], Optional[str], int]]] = {}
+        for field_name, params in layout_map.items():
+            for rank, label in enumerate(params["rotulos"]):
+                targets.setdefault(_label_pattern(label), []).append(
+                    (field_name, params.get("secao"), rank))
+        for section, labels in SECTION_LABELS.items():
+            for label in labels:
+                targets.setdefault(_label_pattern(label), []).append((None, section, -1))
+        for label in IGNORED_LABELS:
+            targets.setdefault(_label_pattern(label), [])
+
+        # Rótulos mais longos primeiro: 'Data de Emissão do RPS' vence 'Data de Emissão'
+        ordered = sorted(targets, key=len, reverse=True)
+        self._targets = [targets[pattern] for pattern in ordered]
+        self.kinds = {name: params.get("tipo", "texto") for name, params in layout_map.items()}
+        alternatives = "|".join(f"(?P<r{i}>{pattern})" for i, pattern in enumerate(ordered))
+        self.pattern = re.compile(rf"(?<![a-z0-9])(?:{alternatives})(?![a-z0-9])")
+
+    def match_page(self, index: WordIndex, found: Dict[str, Tuple[str, float]],
+                   section: Optional[str] = None) -> Optional[str]:
+        """
+        Procura os campos numa página e atualiza 'found' ({campo: (valor, confiança)})
+        quando encontrar um valor mais confiável.
+
+        Returns:
+            Optional[str]: A seção corrente no fim da página (continua na próxima).
+        """
+        words, lines = index.words, index.lines
+        if not words:
+            return section
+
+        # Texto da página (uma linha por linha de palavras) e o início de cada palavra nele
+        starts, parts, offset = [], [], 0
+        for i, word in enumerate(words):
+            if i:
+                separator = "\n" if lines[i] != lines[i - 1] else " "
+                parts.append(separator)
+                offset += 1
+            starts.append(offset)
+            folded = fold(word["text"])
+            parts.append(folded)
+            offset += len(folded)
+        text = "".join(parts)
+
+        # Uma única passada pelo texto, com todos os rótulos de uma vez
+        matches = []  # (primeira palavra, última palavra, alvos)
+        for match in self.pattern.finditer(text):
+            first = bisect_right(starts, match.start()) - 1
+            last = bisect_right(starts, match.end() - 1) - 1
+            matches.append((first, last, self._targets[int(match.lastgroup[1:])]))
+
+        for position, (first, last, targets) in enumerate(matches):
+            for field_name, required_section, rank in targets:
+                if field_name is None:
+                    section = required_section
+                    continue
+                if required_section and required_section != section:
+                    continue
+                # O próximo rótulo da mesma linha limita a região do valor
+                following = matches[position + 1][0] if position + 1 < len(matches) else len(words)
+                candidate = self._capture(index, first, last, following, self.kinds[field_name])
+                if candidate is None:
+                    continue
+                value, confidence = candidate
+                confidence = max(0.0, confidence - rank * LABEL_RANK_PENALTY)
+                if self.kinds[field_name] == "documento" and not \
+                        document_validator.check_digits_valid(
+                            [document_validator.normalize_document(value)])[0]:
+                    confidence *= INVALID_DOCUMENT_FACTOR
+                if confidence > found.get(field_name, ("", 0.0))[1]:
+                    found[field_name] = (value, round(confidence, 2))
+        return section
+
+    def complete(self, found: Dict[str, Tuple[str, float]]) -> bool:
+        """Indica se todos os campos já têm um valor com a maior confiança possível."""
+        return all(field_name in found and found[field_name][1] >= self._best(field_name)
+                   for field_name in self.fields)
+
+    def _best(self, field_name: str) -> float:
+        return SAME_LINE_CONFIDENCE[0 if self.kinds[field_name] in VALUE_PATTERNS else 1]
+
+    def _capture(self, index: WordIndex, first: int, last: int, following: int,
+                 kind: str) -> Optional[Tuple[str, float]]:
+        words, lines = index.words, index.lines
+        typed = 0 if kind in VALUE_PATTERNS else 1
+
+        # 1) À direita do rótulo, na mesma linha, até o próximo rótulo
+        end = last + 1
+        while end < len(words) and end < following and lines[end] == lines[last]:
+            end += 1
+        value = self._value(" ".join(w["text"] for w in words[last + 1:end]), kind)
+        if value:
+            return value, SAME_LINE_CONFIDENCE[typed]
+
+        # 2) Logo abaixo, na coluna do rótulo (até o próximo rótulo da mesma linha)
+        left = words[first]["x0"] - COLUMN_TOLERANCE
+        right = float("inf")
+        if following < len(words) and lines[following] == lines[first]:
+            right = words[following]["x0"] - COLUMN_TOLERANCE
+        position, line = end, lines[last]
+        for _ in range(LINES_BELOW):
+            while position < len(words) and lines[position] == line:
+                position += 1
+            if position >= len(words):
+                return None
+            line = lines[position]
+            column = []
+            scan = position
+            while scan < len(words) and lines[scan] == line:
+                center = (words[scan]["x0"] + words[scan]["x1"]) / 2
+                if left <= center < right:
+                    column.append(words[scan]["text"])
+                scan += 1
+            value = self._value(" ".join(column), kind)
+            if value:
+                return value, BELOW_CONFIDENCE[typed]
+        return None
+
+    @staticmethod
+    def _value(text: str, kind: str) -> Optional[str]:
+        pattern = VALUE_PATTERNS.get(kind)
+        if pattern is None:
+            value = text.strip(" :-=.")
+            return value or None
+        match = pattern.search(text)
+        return match.group(0) if match else None
+
+
+_matchers: Dict[str, LabelMatcher] = {}
+
+
+def get_matcher(layout_map: Dict[str, Any]) -> LabelMatcher:
+    """Retorna o LabelMatcher do layout, compilado uma única vez por processo."""
+    key = json.dumps(layout_map, sort_keys=True)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = LabelMatcher(layout_map)
+    return matcher
+
+
+def confidence_column(field_name: str) -> str:
+    """Nome da coluna do relatório com a confiança de um campo."""
+    return f"confianca_{field_name}"
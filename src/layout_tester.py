@@ -0,0 +1,245 @@
+"""
+Módulo de Validação de Layouts em Lote
+
+Aplica um layout a uma pasta inteira de PDFs de amostra, em paralelo, e
+resume a qualidade de cada campo: taxa de preenchimento, taxa de sucesso
+do parser e os arquivos atípicos (campos vazios, formato inválido ou
+tamanho muito diferente do habitual).
+
+Para que testes repetidos sejam rápidos:
+- os caracteres de cada página ficam em um cache em disco (por hash do
+  arquivo + página, ver glyph_cache.py), então o PDF só é analisado pelo
+  pdfplumber uma vez;
+- o texto de cada campo fica em memória, indexado pela definição do campo,
+  então ao mover um único retângulo apenas aquele campo é reavaliado.
+"""
+import json
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import pdfplumber
+
+from src import (config, data_parser, deduplicator, document_validator, field_roles,
+                 glyph_cache, input_sources)
+from src.batch_processor import default_workers, worker_pool
+from src.input_sources import PdfSource
+from src.word_index import WordIndex, resolve_box
+
+# Parser usado para medir a taxa de sucesso de cada papel de campo. Um CNPJ/CPF
+# com dígitos verificadores errados costuma ser uma caixa cortando o número.
+ROLE_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "cnpj_prestador": document_validator.parse_valid_document,
+    "cnpj_tomador": document_validator.parse_valid_document,
+    "numero_nota": data_parser.parse_number,
+    "data_emissao": data_parser.parse_date,
+    "valor_servico": data_parser.parse_monetary,
+}
+
+# Taxa mínima de preenchimento para um campo vazio ser considerado atípico
+OUTLIER_MIN_FILL_RATE = 0.5
+
+
+def evaluate_source(source: PdfSource, fields: Dict[str, Any], cache_dir: Path
+                    ) -> Tuple[str, Dict[str, str], Optional[str]]:
+    """
+    Extrai o texto bruto dos campos informados em uma fonte, usando o cache
+    de caracteres (ver glyph_cache.py). Executada nos processos de trabalho.
+
+    Returns:
+        Tuple: (nome da fonte, {campo: texto bruto}, mensagem de erro ou None).
+    """
+    try:
+        cache = glyph_cache.GlyphCache(cache_dir)
+        digest = deduplicator.content_hash(source)
+        glyphs_by_page = {}
+        missing_pages = []
+        for page_num in sorted({params["page"] for params in fields.values()}):
+            glyphs = cache.load_page(digest, page_num)
+            if glyphs is None:
+                missing_pages.append(page_num)
+            else:
+                glyphs_by_page[page_num] = glyphs
+
+        if missing_pages:
+            with source.open() as stream, pdfplumber.open(stream) as pdf:
+                cache.save_info(digest, [page.bbox for page in pdf.pages])
+                glyphs_by_page.update(cache.fill(digest, pdf, missing_pages))
+
+        word_indexes = {}
+        values = {}
+        for field_name, params in fields.items():
+            glyphs = glyphs_by_page[params["page"]]
+            index = None
+            if params.get("anchor"):
+                if params["page"] not in word_indexes:
+                    word_indexes[params["page"]] = WordIndex(glyph_cache.page_words(glyphs))
+                index = word_indexes[params["page"]]
+            values[field_name] = glyph_cache.box_text(glyphs, resolve_box(params, index))
+        return source.name, values, None
+    except Exception as e:
+        return source.name, {}, f"{type(e).__name__}: {e}"
+
+
+# --- Relatório ---
+
+def build_report(layout_map: Dict[str, Any], values: Dict[str, Dict[str, str]],
+                 errors: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Calcula as estatísticas por campo a partir dos textos extraídos.
+
+    Args:
+        layout_map (Dict[str, Any]): O layout testado.
+        values (Dict[str, Dict[str, str]]): {arquivo: {campo: texto bruto}}.
+        errors (Dict[str, str]): {arquivo: mensagem} dos arquivos que falharam.
+
+    Returns:
+        Dict[str, Any]: {"files", "errors", "fields": {campo: {...}}, "outliers"}.
+    """
+    roles = {field: role for role, field in field_roles.resolve_roles(layout_map).items()}
+    total = len(values)
+    fields_report = {}
+    outliers = []
+
+    for field_name in layout_map:
+        parser = ROLE_PARSERS.get(roles.get(field_name), data_parser.clean_text)
+        filled, parsed, lengths = [], 0, []
+        for name, file_values in values.items():
+            raw = file_values.get(field_name, "")
+            if not raw:
+                continue
+            filled.append(name)
+            lengths.append(len(raw))
+            parsed_value = parser(raw)
+            if parsed_value is not None and parsed_value != "":
+                parsed += 1
+            else:
+                outliers.append((name, field_name, raw, "formato inválido"))
+
+        fill_rate = len(filled) / total if total else 0.0
+        fields_report[field_name] = {
+            "fill_rate": fill_rate,
+            "parse_rate": parsed / total if total else 0.0,
+        }
+
+        if fill_rate >= OUTLIER_MIN_FILL_RATE:
+            filled_set = set(filled)
+            outliers.extend((name, field_name, "", "vazio")
+                            for name in values if name not in filled_set)
+
+        if len(lengths) >= 3:
+            # Tamanho atípico: distante da mediana em mais de 3 desvios absolutos
+            median = statistics.median(lengths)
+            mad = statistics.median(abs(length - median) for length in lengths)
+            limit = max(3 * mad, 5)
+            for name in filled:
+                raw = values[name][field_name]
+                if abs(len(raw) - median) > limit:
+                    outliers.append((name, field_name, raw, "tamanho atípico"))
+
+    return {"files": total, "errors": errors, "fields": fields_report,
+            "outliers": sorted(outliers)}
+
+
+def format_report(report: Dict[str, Any], max_outliers: int = 30) -> str:
+    """Formata o relatório de validação como texto legível."""
+    lines = [f"Arquivos testados: {report['files']}"]
+    if report["errors"]:
+        lines.append(f"Arquivos com erro: {len(report['errors'])}")
+        lines.extend(f"  - {name}: {message}" for name, message in sorted(report["errors"].items()))
+
+    lines.append("")
+    lines.append(f"{'Campo':<35} {'Preenchido':>11} {'Válido':>8}")
+    for field_name, stats in report["fields"].items():
+        lines.append(f"{field_name[:35]:<35} {stats['fill_rate']:>10.0%} {stats['parse_rate']:>8.0%}")
+
+    if report["outliers"]:
+        lines.append("")
+        lines.append(f"Valores atípicos ({len(report['outliers'])}):")
+        for name, field_name, raw, reason in report["outliers"][:max_outliers]:
+            shown = f" '{raw[:40]}'" if raw else ""
+            lines.append(f"  - {name} | {field_name}: {reason}{shown}")
+        if len(report["outliers"]) > max_outliers:
+            lines.append(f"  ... e mais {len(report['outliers']) - max_outliers}.")
+    return "\n".join(lines)
+
+
+# --- Execução ---
+
+class LayoutTester:
+    """
+    Testa layouts contra um conjunto fixo de amostras.
+
+    Mantém os textos já extraídos entre execuções: a cada run() apenas os
+    campos cuja definição mudou (ou é nova) são reavaliados.
+    """
+
+    def __init__(self, paths: Iterable[str], max_workers: Optional[int] = None,
+                 cache_dir: Path = None):
+        self.sources = input_sources.expand_sources(paths)
+        self.max_workers = max_workers or default_workers()
+        self.cache_dir = Path(cache_dir or config.CHAR_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # {arquivo: {definição do campo (JSON): texto bruto}}
+        self._field_values: Dict[str, Dict[str, str]] = {}
+
+    @classmethod
+    def from_folder(cls, folder: str, **kwargs) -> "LayoutTester":
+        """Cria um testador com todos os PDFs e ZIPs de uma pasta."""
+        paths = sorted(str(p) for p in Path(folder).iterdir()
+                       if p.is_file() and input_sources.is_supported_file(p.name))
+        return cls(paths, **kwargs)
+
+    def run(self, layout_map: Dict[str, Any],
+            progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Aplica o layout às amostras e retorna o relatório (ver build_report).
+
+        Args:
+            layout_map (Dict[str, Any]): O layout a testar.
+            progress (Callable[[int, int], None], optional): Chamada com
+                (arquivos concluídos, total) a cada arquivo avaliado.
+        """
+        signatures = {field: json.dumps(params, sort_keys=True)
+                      for field, params in layout_map.items()}
+
+        tasks = []
+        for source in self.sources:
+            known = self._field_values.get(source.name, {})
+            missing = {field: layout_map[field] for field, signature in signatures.items()
+                       if signature not in known}
+            if missing:
+                tasks.append((source, missing))
+
+        errors = {}
+        for done, (name, values, error) in enumerate(self._evaluate(tasks), start=1):
+            if error:
+                errors[name] = error
+            else:
+                known = self._field_values.setdefault(name, {})
+                for field, raw in values.items():
+                    known[signatures[field]] = raw
+            if progress:
+                progress(done, len(tasks))
+
+        values = {}
+        for source in self.sources:
+            if source.name in errors:
+                continue
+            known = self._field_values.get(source.name, {})
+            values[source.name] = {field: known.get(signature, "")
+                                   for field, signature in signatures.items()}
+        if tasks:
+            glyph_cache.prune_cache(self.cache_dir)
+        return build_report(layout_map, values, errors)
+
+    def _evaluate(self, tasks):
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            for source, fields in tasks:
+                yield evaluate_source(source, fields, self.cache_dir)
+            return
+        with worker_pool(self.max_workers) as executor:
+            futures = [executor.submit(evaluate_source, source, fields, self.cache_dir)
+                       for source, fields in tasks]
+            for future in futures:
+                yield future.result()
@@ -0,0 +1,237 @@
+"""
+Módulo de Monitoramento
+
+Registra o que acontece em cada execução em formatos lidos por máquinas:
+
+- um log de eventos em JSONL (uma linha JSON por evento), com o resultado,
+  a duração, o número de páginas e a classe do erro de cada arquivo;
+- um arquivo de métricas no formato texto do Prometheus (contadores e
+  histogramas de latência), para o 'textfile collector' do node_exporter.
+
+Os eventos ficam num buffer em memória e são gravados em blocos; as métricas
+são reescritas periodicamente por uma thread em segundo plano, de forma
+atômica (arquivo temporário + os.replace), como o coletor espera.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from src import config
+
+# Limites (em segundos) dos buckets do histograma de duração por arquivo
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Eventos acumulados antes de uma gravação em disco
+EVENT_BUFFER_SIZE = 256
+
+
+class EventLog:
+    """Log de eventos em JSONL, gravado em blocos."""
+
+    def __init__(self, path: Path, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def emit(self, event: str, **fields: Any):
+        """Acrescenta um evento ao buffer (gravado quando o buffer enche)."""
+        line = json.dumps({"ts": round(time.time(), 3), "evento": event, **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self._buffer.clear()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+
+class Metrics:
+    """Contadores e histogramas no formato texto do Prometheus."""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        # {nome: {labels: valor}}; labels é uma tupla ordenada de (chave, valor)
+        self._values = {}
+        # {nome: {labels: [contagem de cada bucket..., contagem acima do último, soma]}}
+        self._histograms = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """Declara uma métrica ('counter', 'gauge' ou 'histogram')."""
+        self._types[name] = kind
+        self._help[name] = help_text
+        (self._histograms if kind == "histogram" else self._values).setdefault(name, {})
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: str):
+        with self._lock:
+            self._values[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._histograms[name].get(key)
+            if state is None:
+                state = self._histograms[name][key] = [0] * (len(self.buckets) + 2)
+            # Só o bucket exato é contado aqui; o acumulado é feito ao exportar
+            state[bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def render(self) -> str:
+        """Retorna todas as métricas no formato texto do Prometheus."""
+        lines = []
+        with self._lock:
+            for name, kind in self._types.items():
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind != "histogram":
+                    for labels, value in self._values[name].items():
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                for labels, state in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(state[-1])}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path):
+        """Grava as métricas de forma atômica, para o coletor nunca ler um arquivo pela metade."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(temp_path, path)
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Monitor:
+    """
+    Junta o log de eventos e as métricas do extrator.
+
+    Enquanto estiver aberto, uma thread em segundo plano grava os eventos
+    pendentes e reescreve o arquivo de métricas a cada 'refresh_seconds'.
+    Qualquer um dos dois caminhos pode ser None para desligar aquela saída.
+    """
+
+    def __init__(self, events_path: Optional[Path] = config.EVENT_LOG_PATH,
+                 metrics_path: Optional[Path] = config.METRICS_PATH,
+                 refresh_seconds: float = config.METRICS_REFRESH_SECONDS):
+        self.events = EventLog(events_path) if events_path else None
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.metrics = Metrics()
+        self.metrics.describe("nfse_files_processed_total", "counter",
+                              "Arquivos processados, por resultado (ok, sem_texto, erro).")
+        self.metrics.describe("nfse_extraction_errors_total", "counter",
+                              "Falhas de extração, por classe do erro.")
+        self.metrics.describe("nfse_pages_processed_total", "counter",
+                              "Páginas dos PDFs processados.")
+        self.metrics.describe("nfse_duplicates_total", "counter",
+                              "Notas duplicadas encontradas, por tipo (conteudo, nota).")
+        self.metrics.describe("nfse_extraction_duration_seconds", "histogram",
+                              "Duração da extração de cada arquivo.")
+        self.metrics.describe("nfse_last_run_timestamp_seconds", "gauge",
+                              "Momento (Unix) do fim da última execução em lote.")
+        self.metrics.describe("nfse_last_run_makespan_seconds", "gauge",
+                              "Tempo da extração (do primeiro envio ao último resultado) "
+                              "na última execução em lote.")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(refresh_seconds,),
+                                        name="monitor-refresh", daemon=True)
+        self._thread.start()
+
+    def file_processed(self, name: str, outcome: Dict[str, Any], **extra: Any):
+        """Registra o resultado da extração de um arquivo (ver batch_processor.extract_source)."""
+        self.metrics.inc("nfse_files_processed_total", resultado=outcome["resultado"])
+        self.metrics.observe("nfse_extraction_duration_seconds", outcome["duracao"])
+        if outcome["paginas"]:
+            self.metrics.inc("nfse_pages_processed_total", outcome["paginas"])
+        if outcome["erro"]:
+            self.metrics.inc("nfse_extraction_errors_total", erro=outcome["erro"])
+        if self.events:
+            self.events.emit("arquivo", arquivo=name, resultado=outcome["resultado"],
+                             duracao_ms=round(outcome["duracao"] * 1000, 1),
+                             paginas=outcome["paginas"], erro=outcome["erro"],
+                             mensagem=outcome["mensagem"], **extra)
+
+    def duplicate(self, name: str, original: str, kind: str):
+        """Registra uma duplicata ('conteudo': arquivo idêntico; 'nota': mesma nota)."""
+        self.metrics.inc("nfse_duplicates_total", tipo=kind)
+        if self.events:
+            self.events.emit("duplicata", arquivo=name, original=original, tipo=kind)
+
+    def event(self, event: str, **fields: Any):
+        """Registra um evento livre (ex: início e fim de uma execução)."""
+        if self.events:
+            self.events.emit(event, **fields)
+
+    def run_finished(self, **summary: Any):
+        self.metrics.set("nfse_last_run_timestamp_seconds", round(time.time(), 3))
+        if summary.get("makespan_s") is not None:
+            self.metrics.set("nfse_last_run_makespan_seconds", summary["makespan_s"])
+        self.event("execucao_fim", **summary)
+        self.refresh()
+
+    def refresh(self):
+        """Grava os eventos pendentes e reescreve o arquivo de métricas."""
+        if self.events:
+            self.events.flush()
+        if self.metrics_path:
+            try:
+                self.metrics.write_textfile(self.metrics_path)
+            except OSError as e:
+                print(f"Erro ao gravar as métricas em '{self.metrics_path}': {e}")
+
+    def _refresh_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            self.refresh()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.refresh()
+        if self.events:
+            self.events.close()
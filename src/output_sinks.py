@@ -0,0 +1,231 @@
+"""
+Módulo de Saídas Adicionais
+
+Grava as notas de uma execução em vários formatos ao mesmo tempo, sem
+repetir a extração: além do relatório Excel principal, cada nota é enviada
+a um ou mais destinos ('sinks') configurados, escolhidos pela extensão:
+
+- .xlsx: outra planilha Excel, com as planilhas de resumo no fim;
+- .csv: separado por ';' e com vírgula decimal, para importação no ERP;
+- .jsonl: um objeto JSON por linha;
+- .sqlite / .db: uma tabela 'notas' num banco SQLite local.
+
+Cada destino tem a sua thread de gravação e uma fila limitada: as notas são
+gravadas à medida que chegam, e um destino lento segura a execução (quando
+a fila dele enche) em vez de acumular notas na memória. Um destino que
+falha é registrado e deixa de receber notas, sem afetar os demais nem o
+relatório principal.
+"""
+import csv
+import json
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from openpyxl import Workbook
+
+from src import config, deduplicator, excel_writer, label_matcher
+
+# Notas esperando na fila de cada destino
+SINK_QUEUE_SIZE = 256
+# Notas por transação no SQLite
+SQLITE_BATCH_SIZE = 500
+# Nome da planilha das notas (o mesmo que o pandas usa no relatório principal)
+EXCEL_SHEET_NAME = "Sheet1"
+
+_END = object()  # Marca o fim das notas na fila de um destino
+
+
+def output_columns(layout_map: Dict[str, Any]) -> List[str]:
+    """Colunas gravadas nas saídas: as mesmas do relatório principal."""
+    columns = ["arquivo_origem", *layout_map]
+    if label_matcher.is_label_layout(layout_map):
+        columns += [label_matcher.confidence_column(field_name) for field_name in layout_map]
+    return columns + [deduplicator.DUPLICATE_COLUMN]
+
+
+class ExcelSink:
+    """
+    Planilha Excel gravada em modo de escrita contínua do openpyxl: cada nota
+    vira uma linha na hora (o openpyxl guarda as linhas num arquivo temporário,
+    não na memória) e as planilhas de resumo entram no fim, antes de salvar.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.file = open(path, "wb")  # Um caminho inválido falha antes da primeira nota
+        self.columns = list(columns)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(EXCEL_SHEET_NAME)
+        self.sheet.append(self.columns)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.sheet.append([record.get(name) for name in self.columns])
+
+    def close(self, summaries: Optional[excel_writer.SummarySheets] = None) -> None:
+        for sheet_name, (header, rows) in (summaries or {}).items():
+            sheet = self.workbook.create_sheet(sheet_name)
+            sheet.append(header)
+            for row in rows:
+                sheet.append(row)
+        try:
+            self.workbook.save(self.file)
+        finally:
+            self.file.close()
+
+
+class CsvSink:
+    """CSV no formato do Excel em português (';' e vírgula decimal), com BOM para o UTF-8."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=list(columns),
+                                     delimiter=config.CSV_DELIMITER, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.writer.writerow({name: (str(value).replace(".", config.CSV_DECIMAL)
+                                     if isinstance(value, float) else value)
+                              for name, value in record.items()})
+
+    def close(self, summaries=None) -> None:
+        self.file.close()
+
+
+class JsonlSink:
+    """Um objeto JSON por nota, uma nota por linha."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self, summaries=None) -> None:
+        self.file.close()
+
+
+class SqliteSink:
+    """Tabela 'notas' num banco SQLite (recriada a cada execução), gravada em lotes."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.columns = list(columns)
+        # A conexão é criada aqui e usada só pela thread do destino
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        quoted = ", ".join(f'"{name}"' for name in self.columns)
+        self.connection.execute("DROP TABLE IF EXISTS notas")
+        self.connection.execute(f"CREATE TABLE notas ({quoted})")
+        self.insert = f"INSERT INTO notas ({quoted}) VALUES ({', '.join('?' * len(self.columns))})"
+        self.batch = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.batch.append(tuple(record.get(name) for name in self.columns))
+        if len(self.batch) >= SQLITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self.connection.executemany(self.insert, self.batch)
+        self.connection.commit()
+        self.batch = []
+
+    def close(self, summaries=None) -> None:
+        try:
+            if self.batch:
+                self._flush()
+        finally:
+            self.connection.close()
+
+
+SINK_TYPES = {".xlsx": ExcelSink, ".csv": CsvSink, ".jsonl": JsonlSink,
+              ".sqlite": SqliteSink, ".db": SqliteSink}
+
+
+def sink_type(path: str):
+    """A classe do destino pela extensão do arquivo."""
+    try:
+        return SINK_TYPES[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Formato de saída desconhecido: '{path}'. "
+                         f"Extensões aceitas: {', '.join(SINK_TYPES)}.") from None
+
+
+class _SinkWorker:
+    """Um destino, a sua fila e a thread que grava nele."""
+
+    def __init__(self, path: str, columns: Sequence[str], queue_size: int):
+        self.path = path
+        self.error: Optional[str] = None
+        self.summaries = None
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, args=(columns,),
+                                       name=f"saida-{Path(path).name}", daemon=True)
+        self.thread.start()
+
+    def _run(self, columns):
+        sink = None
+        ended = False
+        try:
+            sink = sink_type(self.path)(self.path, columns)
+            while True:
+                record = self.queue.get()
+                if record is _END:
+                    ended = True
+                    break
+                sink.write(record)
+            sink.close(self.summaries)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Erro ao gravar a saída '{self.path}': {self.error}")
+            if sink is not None:
+                try:
+                    sink.close()
+                except Exception:
+                    pass
+            # Continua esvaziando a fila, para que a execução não fique presa nela
+            # (se a falha foi ao fechar o destino, o fim da fila já foi lido)
+            while not ended and self.queue.get() is not _END:
+                pass
+
+
+class FanOut:
+    """
+    Envia cada nota a todos os destinos informados, cada um na sua thread.
+
+    Args:
+        paths (Sequence[str]): Os arquivos de saída (o formato vem da extensão).
+        columns (Sequence[str]): As colunas gravadas (ver output_columns).
+        queue_size (int, optional): Notas na fila de cada destino (padrão:
+                                    SINK_QUEUE_SIZE). Com a fila cheia, write()
+                                    espera o destino.
+    """
+
+    def __init__(self, paths: Sequence[str], columns: Sequence[str],
+                 queue_size: Optional[int] = None):
+        for path in paths:
+            sink_type(path)  # Extensão inválida falha antes de a extração começar
+        self.workers = [_SinkWorker(str(path), columns, queue_size or SINK_QUEUE_SIZE)
+                        for path in paths]
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Envia uma nota a todos os destinos (espera se a fila de algum estiver cheia)."""
+        for worker in self.workers:
+            worker.queue.put(dict(record))  # Cópia: a nota pode mudar depois do envio
+
+    def close(self, summaries: Optional[excel_writer.SummarySheets] = None) -> Dict[str, str]:
+        """
+        Encerra todos os destinos e espera o fim das gravações.
+
+        Args:
+            summaries (SummarySheets, optional): Planilhas de resumo, gravadas
+                                                 nas saídas Excel.
+
+        Returns:
+            Dict[str, str]: {arquivo: erro} dos destinos que falharam.
+        """
+        for worker in self.workers:
+            worker.summaries = summaries
+            worker.queue.put(_END)
+        for worker in self.workers:
+            worker.thread.join()
+        return {worker.path: worker.error for worker in self.workers if worker.error}
@@ -0,0 +1,278 @@
+"""
+Módulo de Motores de Extração
+
+Define os motores ('backends') que leem o texto das caixas de um layout.
+Todos seguem a mesma interface: extract(pdf, field_map) retorna os dados
+brutos (um texto por campo) e o número de páginas do PDF.
+
+- "pdfplumber": a implementação de referência, com page.crop().extract_text().
+- "pdfminer": um motor enxuto que roda o interpretador do pdfminer direto,
+  sem análise de layout e sem montar os objetos completos do pdfplumber. Só
+  os caracteres que caem dentro das caixas do layout são guardados (ou todos
+  os da página, se algum campo dela usar âncora). Linhas, retângulos e
+  imagens são ignorados.
+- "cache": lê os caracteres do cache em disco (ver glyph_cache.py), por
+  hash do conteúdo + página; só as páginas que ainda não estão lá passam
+  pelo pdfplumber (e são gravadas). Reaplicar um layout corrigido a um
+  arquivo já processado não analisa nenhum PDF de novo.
+- "rotulos": usado automaticamente com layouts de rótulos (sem coordenadas,
+  ver label_matcher.py). Lê todos os caracteres de cada página com o mesmo
+  dispositivo do motor "pdfminer" e procura os campos pelos rótulos.
+
+O texto de cada caixa é montado pelas mesmas funções do pdfplumber em todos
+os motores, então o resultado é o mesmo (ver tools/check_backends.py).
+"""
+import hashlib
+import io
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import pdfplumber
+from pdfminer.converter import PDFLayoutAnalyzer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfplumber import utils as pdfplumber_utils
+
+from src import config, glyph_cache, label_matcher
+from src.pdf_processor import extract_fields, extract_text_from_chars
+from src.word_index import WordIndex, resolve_box
+
+PdfInput = Union[str, BinaryIO]
+
+
+class PdfplumberBackend:
+    """Motor de referência: o pdfplumber completo."""
+
+    name = "pdfplumber"
+
+    def extract(self, pdf_input: PdfInput, field_map: Dict[str, Any]) -> Tuple[Dict[str, str], int]:
+        with pdfplumber.open(pdf_input) as pdf:
+            return extract_fields(pdf, field_map), len(pdf.pages)
+
+
+class _PageGeometry:
+    """
+    Caixa da página e conversão de coordenadas, calculadas como no pdfplumber
+    (MediaBox normalizada pela rotação, origem no canto superior esquerdo).
+    """
+
+    __slots__ = ("height", "bbox", "x_offset", "top_offset")
+
+    def __init__(self, page: PDFPage):
+        x0, x1 = sorted((page.mediabox[0], page.mediabox[2]))
+        y0, y1 = sorted((page.mediabox[1], page.mediabox[3]))
+        if (resolve1(page.attrs.get("Rotate")) or 0) % 360 in (90, 270):
+            x0, y0, x1, y1 = y0, x0, y1, x1
+        self.height = y1 - y0
+        self.bbox = (x0, -y0, x1, self.height - y0)
+        self.x_offset = x0
+        self.top_offset = -y0
+
+
+class _CharCollector(PDFLayoutAnalyzer):
+    """
+    Dispositivo do pdfminer que só guarda caracteres, e só os que tocam uma
+    das caixas informadas (todas as da página se 'boxes' for None).
+    """
+
+    def __init__(self, rsrcmgr: PDFResourceManager, geometry: _PageGeometry,
+                 doctop: float, boxes: Optional[List[Tuple[float, float, float, float]]]):
+        super().__init__(rsrcmgr, laparams=None)
+        self.geometry = geometry
+        self.doctop = doctop
+        self.boxes = boxes
+        self.chars = []
+
+    def render_char(self, *args, **kwargs) -> float:
+        advance = super().render_char(*args, **kwargs)
+        # O pdfminer calcula a caixa do caractere; ela é convertida e o objeto descartado
+        item = self.cur_item._objs.pop()
+        geometry = self.geometry
+        top = geometry.height - item.y1 + geometry.top_offset
+        bottom = geometry.height - item.y0 + geometry.top_offset
+        x0 = item.x0 + geometry.x_offset
+        x1 = item.x1 + geometry.x_offset
+        if self.boxes is None or any(x1 >= bx0 and x0 <= bx1 and bottom >= btop and top <= bbottom
+                                     for bx0, btop, bx1, bbottom in self.boxes):
+            self.chars.append({"text": item.get_text(), "x0": x0, "x1": x1, "top": top,
+                               "bottom": bottom, "doctop": self.doctop + top,
+                               "upright": item.upright, "size": item.size})
+        return advance
+
+    def paint_path(self, *args, **kwargs) -> None:
+        pass  # Linhas e retângulos não entram no texto dos campos
+
+    def render_image(self, *args, **kwargs) -> None:
+        pass
+
+
+class PdfminerBackend:
+    """Motor enxuto: interpretador do pdfminer com um dispositivo que só coleta caracteres."""
+
+    name = "pdfminer"
+
+    def extract(self, pdf_input: PdfInput, field_map: Dict[str, Any]) -> Tuple[Dict[str, str], int]:
+        if isinstance(pdf_input, str):
+            with open(pdf_input, "rb") as stream:
+                return self.extract(stream, field_map)
+
+        document = PDFDocument(PDFParser(pdf_input))
+        pages = list(PDFPage.create_pages(document))
+        rsrcmgr = PDFResourceManager(caching=True)
+        fields_by_page = {}
+        for field_name, params in field_map.items():
+            fields_by_page.setdefault(params["page"], []).append(field_name)
+
+        missing = set(fields_by_page) - set(range(len(pages)))
+        if missing:
+            raise IndexError(f"O PDF tem {len(pages)} página(s); o layout usa a página {min(missing)}.")
+
+        extracted = {}
+        doctop = 0.0  # Topo da página no documento, como o 'doctop' do pdfplumber
+        for page_num, page in enumerate(pages):
+            geometry = _PageGeometry(page)
+            fields = fields_by_page.get(page_num)
+            if fields:
+                extracted.update(self._extract_page(rsrcmgr, page, geometry, doctop,
+                                                    {name: field_map[name] for name in fields}))
+            doctop += geometry.height
+
+        # Mesma ordem de campos do layout
+        return {field_name: extracted[field_name] for field_name in field_map}, len(pages)
+
+    def _extract_page(self, rsrcmgr, page, geometry, doctop, fields):
+        anchored = any(params.get("anchor") for params in fields.values())
+        boxes = None
+        if not anchored:
+            boxes = [_clamp(resolve_box(params, None), geometry.bbox) for params in fields.values()]
+
+        device = _CharCollector(rsrcmgr, geometry, doctop, boxes)
+        PDFPageInterpreter(rsrcmgr, device).process_page(page)
+
+        index = WordIndex(pdfplumber_utils.extract_words(device.chars)) if anchored else None
+        values = {}
+        for field_name, params in fields.items():
+            coords = _clamp(resolve_box(params, index if params.get("anchor") else None),
+                            geometry.bbox)
+            values[field_name] = extract_text_from_chars(device.chars, coords)
+        return values
+
+
+def _clamp(box, bbox):
+    """Limita uma caixa (x0, top, x1, bottom) à caixa da página."""
+    clamped = (max(box[0], bbox[0]), max(box[1], bbox[1]),
+               min(box[2], bbox[2]), min(box[3], bbox[3]))
+    if clamped[0] > clamped[2] or clamped[1] > clamped[3]:
+        # Mesmo erro que o page.crop() do pdfplumber daria
+        raise ValueError(f"Caixa {tuple(box)} fora da página {tuple(bbox)}.")
+    return clamped
+
+
+class CacheBackend:
+    """Motor com cache: os caracteres de cada página vêm do cache em disco (config.CHAR_CACHE_DIR)."""
+
+    name = "cache"
+
+    def extract(self, pdf_input: PdfInput, field_map: Dict[str, Any]) -> Tuple[Dict[str, str], int]:
+        if isinstance(pdf_input, str):
+            with open(pdf_input, "rb") as stream:
+                return self.extract(stream, field_map)
+
+        data = pdf_input.read()
+        # Mesmo hash de deduplicator.content_hash
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        cache = glyph_cache.GlyphCache(config.CHAR_CACHE_DIR)
+        needed = sorted({params["page"] for params in field_map.values()})
+
+        info = cache.load_info(digest)
+        glyphs = {}
+        if info is not None:
+            for page_num in needed:
+                page_glyphs = cache.load_page(digest, page_num) if page_num < info["paginas"] else None
+                if page_glyphs is not None:
+                    glyphs[page_num] = page_glyphs
+        if info is None or any(page_num not in glyphs and page_num < info["paginas"]
+                               for page_num in needed):
+            with pdfplumber.open(io.BytesIO(data)) as pdf:
+                info = cache.save_info(digest, [page.bbox for page in pdf.pages])
+                glyphs.update(cache.fill(digest, pdf, [page_num for page_num in needed
+                                                       if page_num not in glyphs
+                                                       and page_num < len(pdf.pages)]))
+
+        absent = [page_num for page_num in needed if page_num >= info["paginas"]]
+        if absent:
+            raise IndexError(f"O PDF tem {info['paginas']} página(s); o layout usa a página {absent[0]}.")
+
+        indexes = {}
+        extracted = {}
+        for field_name, params in field_map.items():
+            page_num = params["page"]
+            index = None
+            if params.get("anchor"):
+                if page_num not in indexes:
+                    indexes[page_num] = WordIndex(glyph_cache.page_words(glyphs[page_num]))
+                index = indexes[page_num]
+            coords = _clamp(resolve_box(params, index), info["caixas"][page_num])
+            extracted[field_name] = glyph_cache.box_text(glyphs[page_num], coords)
+        return extracted, info["paginas"]
+
+
+class LabelBackend:
+    """
+    Motor dos layouts de rótulos: procura cada campo pelo rótulo no texto da
+    página. Retorna também a confiança de cada campo, em colunas próprias.
+    """
+
+    name = "rotulos"
+
+    def extract(self, pdf_input: PdfInput, field_map: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        if isinstance(pdf_input, str):
+            with open(pdf_input, "rb") as stream:
+                return self.extract(stream, field_map)
+
+        matcher = label_matcher.get_matcher(field_map)
+        document = PDFDocument(PDFParser(pdf_input))
+        rsrcmgr = PDFResourceManager(caching=True)
+        found = {}
+        section = None
+        doctop = 0.0
+        page_count = 0
+        for page in PDFPage.create_pages(document):
+            page_count += 1
+            # Depois que todos os campos foram achados com confiança máxima, só conta as páginas
+            if not matcher.complete(found):
+                geometry = _PageGeometry(page)
+                device = _CharCollector(rsrcmgr, geometry, doctop, None)
+                PDFPageInterpreter(rsrcmgr, device).process_page(page)
+                index = WordIndex(pdfplumber_utils.extract_words(device.chars))
+                section = matcher.match_page(index, found, section)
+                doctop += geometry.height
+
+        values = {field_name: found.get(field_name, ("", 0.0))[0] for field_name in field_map}
+        values.update({label_matcher.confidence_column(field_name): found.get(field_name, ("", 0.0))[1]
+                       for field_name in field_map})
+        return values, page_count
+
+
+BACKENDS = {backend.name: backend
+            for backend in (PdfplumberBackend(), PdfminerBackend(), CacheBackend())}
+LABEL_BACKEND = LabelBackend()
+
+
+def get_backend(name: Optional[str] = None):
+    """Retorna o motor pelo nome (padrão: config.EXTRACTION_BACKEND)."""
+    name = name or config.EXTRACTION_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Motor de extração desconhecido: '{name}'. "
+                         f"Disponíveis: {', '.join(sorted(BACKENDS))}.") from None
+
+
+def backend_for(layout_map: Dict[str, Any], name: Optional[str] = None):
+    """Motor para um layout: os de rótulos usam sempre o LabelBackend; os demais, get_backend(name)."""
+    if label_matcher.is_label_layout(layout_map):
+        return LABEL_BACKEND
+    return get_backend(name)
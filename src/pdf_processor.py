@@ -5,19 +5,24 @@ Responsável pela lógica central de abrir, ler e extrair dados brutos
 de um arquivo PDF de NFSe, utilizando um mapa de coordenadas dinâmico.
 """
 import pdfplumber
-from typing import Dict, Any
+from pdfplumber import utils as pdfplumber_utils
+from typing import Dict, Any, BinaryIO, List, Sequence, Union
+
+from src.word_index import WordIndex, resolve_box
 
 # REMOVEMOS: from .config import FIELD_MAP
 
 # A assinatura da função agora inclui o parâmetro 'field_map'
 
 
-def extract_data_from_pdf(pdf_path: str, field_map: Dict[str, Any]) -> Dict[str, Any]:
+def extract_data_from_pdf(pdf_path: Union[str, BinaryIO], field_map: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extrai dados de um único arquivo PDF de NFSe com base em um mapa de campos.
 
     Args:
-        pdf_path (str): O caminho completo para o arquivo PDF.
+        pdf_path (Union[str, BinaryIO]): O caminho completo para o arquivo PDF
+                                         ou um objeto tipo arquivo já aberto
+                                         (ex: membro de um ZIP em memória).
         field_map (Dict[str, Any]): O dicionário de layout com os campos e
                                     suas coordenadas.
 
@@ -25,25 +30,68 @@ def extract_data_from_pdf(pdf_path: str, field_map: Dict[str, Any]) -> Dict[str,
         Dict[str, Any]: Um dicionário com os dados brutos extraídos.
                         Retorna None em caso de erro.
     """
-    extracted_data = {}
-
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            # Itera sobre o mapa de campos RECEBIDO COMO PARÂMETRO
-            for field_name, params in field_map.items():
-                page_num = params['page']
-                # Converte a lista de coordenadas do JSON para uma tupla
-                coords = tuple(params['coords'])
-
-                page = pdf.pages[page_num]
-                box = page.crop(coords)
-                raw_text = box.extract_text()
-
-                extracted_data[field_name] = raw_text.strip(
-                ) if raw_text else ""
-
+            return extract_fields(pdf, field_map)
     except Exception as e:
         print(f"Erro ao processar o arquivo PDF '{pdf_path}': {e}")
         return None
 
+
+def extract_fields(pdf: pdfplumber.PDF, field_map: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Extrai os campos do layout de um PDF já aberto.
+
+    Diferente de extract_data_from_pdf, não trata os erros: quem chama decide
+    como registrá-los (ex: o processamento em lote, que guarda a classe do erro).
+
+    Returns:
+        Dict[str, str]: Um dicionário com os dados brutos extraídos.
+    """
+    extracted_data = {}
+    # Índices de palavras por página, construídos só se algum campo usar âncora
+    word_indexes = {}
+    # Último campo de cada página: depois dele, os caches da página são liberados
+    last_field = {params['page']: field_name for field_name, params in field_map.items()}
+
+    # Itera sobre o mapa de campos RECEBIDO COMO PARÂMETRO
+    for field_name, params in field_map.items():
+        page_num = params['page']
+        page = pdf.pages[page_num]
+
+        index = None
+        if params.get('anchor'):
+            if page_num not in word_indexes:
+                word_indexes[page_num] = WordIndex.from_page(page)
+            index = word_indexes[page_num]
+
+        # Caixa absoluta ou relativa à âncora, limitada à página
+        x0, top, x1, bottom = resolve_box(params, index)
+        coords = (max(x0, page.bbox[0]), max(top, page.bbox[1]),
+                  min(x1, page.bbox[2]), min(bottom, page.bbox[3]))
+
+        box = page.crop(coords)
+        raw_text = box.extract_text()
+
+        extracted_data[field_name] = raw_text.strip(
+        ) if raw_text else ""
+
+        if last_field[page_num] == field_name:
+            # O pdfplumber guarda os objetos analisados em cada página até o PDF
+            # ser fechado; soltá-los aqui mantém só uma página em memória por vez
+            word_indexes.pop(page_num, None)
+            page.close()
+
     return extracted_data
+
+
+def extract_text_from_chars(chars: List[Dict[str, Any]], coords: Sequence[float]) -> str:
+    """
+    Extrai o texto de uma caixa a partir de uma lista de caracteres já lida
+    (ex: de um cache), com o mesmo resultado de page.crop(coords).extract_text().
+
+    Os caracteres precisam das chaves: text, x0, top, x1, bottom, upright e doctop.
+    """
+    cropped = pdfplumber_utils.crop_to_bbox(chars, tuple(coords))
+    raw_text = pdfplumber_utils.extract_text(cropped) if cropped else ""
+    return raw_text.strip() if raw_text else ""
@@ -0,0 +1,318 @@
+"""
+Módulo do Fluxo de Extração
+
+Orquestra uma execução completa, usada tanto pela interface gráfica quanto
+pela linha de comando: expande as fontes (PDFs e ZIPs), descarta cópias
+idênticas, extrai em paralelo, detecta notas duplicadas e grava o relatório.
+As linhas do relatório seguem a ordem de entrada, inclusive as das cópias
+idênticas (que não passam pela extração).
+Cada arquivo processado é registrado no log de eventos e nas métricas
+(ver monitoring.py), e as notas alimentam os totais das planilhas de resumo
+(ver summaries.py) à medida que passam.
+
+Com 'outputs', as notas também são gravadas em outros formatos (CSV, JSONL,
+SQLite, outra planilha) na mesma passada, à medida que passam (ver
+output_sinks.py).
+
+No modo de acréscimo ('append'), lê apenas as colunas-chave do relatório
+existente, extrai somente os PDFs que ainda não estão nele e acrescenta as
+linhas novas, sem reescrever as antigas.
+"""
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from src import (batch_processor, config, data_parser, deduplicator, excel_writer,
+                 field_roles, glyph_cache, input_sources, monitoring, output_sinks, scheduler,
+                 summaries)
+from src.prefetch import Prefetcher
+from src.record_store import RecordTable
+
+
+def _note_key(cnpj: Any, number: Any):
+    """Chave (CNPJ do prestador, número da nota) para reconhecer notas já no relatório."""
+    cnpj = data_parser.parse_cnpj(str(cnpj)) if cnpj is not None else None
+    number = data_parser.parse_number(str(number)) if number is not None else None
+    return (cnpj, number) if cnpj and number is not None else None
+
+
+def run_pipeline(paths: Iterable[str], layout_map: Dict[str, Any], output_path: str,
+                 append: bool = False, max_workers: Optional[int] = None,
+                 on_progress: Optional[Callable[[int], None]] = None,
+                 on_status: Optional[Callable[[str], None]] = None,
+                 monitor: Optional[monitoring.Monitor] = None,
+                 backend: Optional[str] = None,
+                 prefetch_files: Optional[int] = None,
+                 prefetch_bytes: Optional[int] = None,
+                 schedule: Optional[str] = None,
+                 outputs: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Executa a extração e grava (ou atualiza) o relatório Excel.
+
+    Args:
+        paths (Iterable[str]): PDFs e ZIPs de entrada.
+        layout_map (Dict[str, Any]): O layout a aplicar.
+        output_path (str): O relatório de saída.
+        append (bool): Se True e o relatório existir, acrescenta apenas as
+                       notas novas a ele.
+        max_workers (int, optional): Número de processos de extração.
+        on_progress (Callable[[int], None], optional): Recebe o progresso (0-100).
+        on_status (Callable[[str], None], optional): Recebe mensagens de status.
+        monitor (monitoring.Monitor, optional): Destino dos eventos e métricas.
+                                                Sem ele, um Monitor com os caminhos
+                                                de config é aberto só para esta execução.
+        backend (str, optional): O motor de extração (padrão: config.EXTRACTION_BACKEND).
+        prefetch_files (int, optional): PDFs lidos à frente do processamento
+                                        (padrão: config.PREFETCH_FILES; 0 desliga).
+        prefetch_bytes (int, optional): Limite de bytes da leitura antecipada
+                                        (padrão: config.PREFETCH_MAX_BYTES).
+        schedule (str, optional): Ordem de envio aos processos: "maiores_primeiro"
+                                  ou "ordem" (padrão: config.BATCH_SCHEDULE).
+        outputs (Sequence[str], optional): Outros arquivos que recebem as mesmas
+                                           linhas do relatório (.csv, .jsonl,
+                                           .sqlite, .xlsx). No modo de acréscimo,
+                                           recebem só as notas novas.
+
+    Returns:
+        Dict[str, Any]: Contadores da execução: 'notas' (linhas gravadas),
+                        'falhas', 'duplicatas', 'ja_no_relatorio' e
+                        'saidas_com_erro' (saídas adicionais que falharam); e o tempo
+                        da extração: 'makespan_s' (do primeiro envio ao último
+                        resultado) e 'ocupacao' (fração do tempo em que os
+                        processos estiveram extraindo).
+    """
+    own_monitor = monitor is None
+    if own_monitor:
+        monitor = monitoring.Monitor()
+    try:
+        if prefetch_files is None:
+            prefetch_files = config.PREFETCH_FILES
+        schedule = schedule or config.BATCH_SCHEDULE
+        if schedule not in scheduler.SCHEDULES:
+            raise ValueError(f"Ordem de envio desconhecida: '{schedule}'. "
+                             f"Disponíveis: {', '.join(scheduler.SCHEDULES)}.")
+        return _run(paths, layout_map, output_path, append, max_workers, on_progress,
+                    on_status, monitor, backend, prefetch_files, prefetch_bytes, schedule,
+                    outputs or ())
+    except Exception as e:
+        monitor.event("execucao_erro", erro=type(e).__name__, mensagem=str(e))
+        raise
+    finally:
+        if own_monitor:
+            monitor.close()
+
+
+def _run(paths, layout_map, output_path, append, max_workers, on_progress, on_status,
+         monitor, backend, prefetch_files, prefetch_bytes, schedule, outputs):
+    started = time.perf_counter()
+    status = on_status or (lambda message: None)
+    progress = on_progress or (lambda percentage: None)
+    summary = {"notas": 0, "falhas": 0, "duplicatas": 0, "ja_no_relatorio": 0,
+               "saidas_com_erro": 0}
+    roles = field_roles.resolve_roles(layout_map)
+
+    # Expande os ZIPs em fontes individuais, sem extraí-los para o disco
+    sources = input_sources.expand_sources(paths)
+    monitor.event("execucao_inicio", arquivos=len(sources), relatorio=str(output_path),
+                  acrescentar=append)
+
+    existing = None
+    known_notes = set()
+    totals = summaries.SummaryTotals(roles)
+    if append and os.path.exists(output_path):
+        # Índice de notas já no relatório, lido só das colunas-chave
+        status("Lendo o relatório existente...")
+        key_columns = ["arquivo_origem"] + [roles[role] for role in ("cnpj_prestador", "numero_nota")
+                                            if role in roles]
+        existing = excel_writer.read_report_keys(output_path, key_columns)
+        known_files = set(existing["keys"].get("arquivo_origem", []))
+        if len(existing["keys"]) == len(key_columns) > 1:
+            known_notes = {key for key in map(_note_key, existing["keys"][key_columns[1]],
+                                              existing["keys"][key_columns[2]]) if key}
+        if totals and not totals.load_report(output_path):
+            # Relatório sem planilhas de resumo: os totais são refeitos uma única vez
+            columns = totals.report_columns()
+            previous = excel_writer.read_report_keys(output_path, columns)
+            totals.load_report_rows(previous["keys"], previous["rows"])
+        before = len(sources)
+        sources = [source for source in sources if source.name not in known_files]
+        summary["ja_no_relatorio"] = before - len(sources)
+
+    # Saídas adicionais: recebem cada linha do relatório assim que ela é definida
+    fanout = None
+    if outputs:
+        fanout = output_sinks.FanOut(outputs, output_sinks.output_columns(layout_map))
+    index = deduplicator.DuplicateIndex(config.DEDUP_INDEX_PATH)
+    try:
+        total_files = len(sources)
+        # A posição de entrada de cada fonte acompanha o envio: 'planned' na
+        # ordem de envio, 'seen' depois da leitura, 'submitted' depois do
+        # descarte das cópias idênticas (as descartadas vão para 'skipped', com
+        # o arquivo original). Os resultados e as cópias saem na ordem de entrada.
+        reordered = schedule == "maiores_primeiro" and total_files > 1
+        planned, seen, submitted, skipped = deque(), deque(), deque(), {}
+
+        def plan(sources):
+            if reordered:
+                sources = scheduler.longest_first_windows(sources, config.SCHEDULE_WINDOW)
+            else:
+                sources = enumerate(sources)
+            for position, source in sources:
+                planned.append(position)
+                yield source
+        sources = plan(sources)
+
+        reader = None
+        if prefetch_files > 0:
+            # Lê os próximos PDFs em segundo plano enquanto os anteriores são processados
+            sources = reader = Prefetcher(sources, max_files=prefetch_files,
+                                          max_bytes=prefetch_bytes)
+
+        def read(sources):
+            for source in sources:
+                seen.append((planned.popleft(), source))
+                yield source
+        sources = read(sources)
+
+        # Cópias idênticas (mesmo conteúdo) são processadas uma única vez. As
+        # fontes passam pelo hash em fluxo, já lidas, a caminho da extração.
+        status("Verificando arquivos duplicados...")
+        content_duplicates = deque()  # (cópia, original), na ordem de leitura
+        sources = deduplicator.iter_unique_sources(sources, index, content_duplicates)
+        collapse = config.DEDUP_MODE == "collapse"
+        duplicates_found = 0
+
+        def skip_copy(position):
+            nonlocal duplicates_found
+            # As cópias entram em 'content_duplicates' na mesma ordem em que são lidas
+            skipped[position] = content_duplicates.popleft()
+            duplicates_found += 1
+
+        def submit(sources):
+            for source in sources:
+                position, read_source = seen.popleft()
+                while read_source is not source:  # Cópia idêntica, descartada
+                    skip_copy(position)
+                    position, read_source = seen.popleft()
+                submitted.append(position)
+                yield source
+        sources = submit(sources)
+
+        # Registros guardados por colunas, sem um dicionário por nota
+        table = RecordTable.from_layout(layout_map)
+
+        busy_seconds = 0.0
+
+        def on_outcome(source, outcome):
+            nonlocal busy_seconds
+            busy_seconds += outcome["duracao"]
+            monitor.file_processed(source.name, outcome)
+            if outcome["erro"]:
+                print(f"Erro ao processar '{source.name}': {outcome['mensagem']}")
+
+        def add_row(row):
+            table.append(row)
+            if fanout is not None:
+                fanout.write(row)
+
+        def add_record(source, clean_data):
+            if not clean_data:
+                summary["falhas"] += 1
+                return  # Pula arquivos que falharam na extração
+
+            if known_notes and roles.keys() >= {"cnpj_prestador", "numero_nota"}:
+                key = _note_key(clean_data[roles["cnpj_prestador"]], clean_data[roles["numero_nota"]])
+                if key in known_notes:
+                    summary["ja_no_relatorio"] += 1
+                    return  # A mesma nota já está no relatório, vinda de outro arquivo
+
+            # Mesma nota (CNPJ + número + data) já vista em outro arquivo
+            original = index.check_record(clean_data, roles)
+            if original:
+                summary["duplicatas"] += 1
+                monitor.duplicate(source.name, original, "nota")
+                if collapse:
+                    return
+            clean_data[deduplicator.DUPLICATE_COLUMN] = original or ""
+            add_row(clean_data)
+            if not original:
+                totals.add(clean_data)  # Duplicatas não entram nos totais
+
+        def add_copy(source, original):
+            summary["duplicatas"] += 1
+            monitor.duplicate(source.name, original, "conteudo")
+            if not collapse:
+                add_row({"arquivo_origem": source.name, deduplicator.DUPLICATE_COLUMN: original})
+
+        # Resultados que chegaram antes de uma posição anterior, por posição
+        # de entrada. Cada nota sai assim que todas as anteriores saíram; como
+        # as janelas são enviadas uma após a outra, guarda no máximo uma janela
+        # (na ordem de entrada, os resultados já chegam em ordem).
+        waiting = {}
+        next_position = 0
+
+        def release():
+            nonlocal next_position
+            while next_position in waiting or next_position in skipped:
+                if next_position in waiting:
+                    add_record(*waiting.pop(next_position))
+                else:
+                    add_copy(*skipped.pop(next_position))
+                next_position += 1
+
+        extraction_started = time.perf_counter()
+        results = batch_processor.run_batch(sources, layout_map, max_workers=max_workers,
+                                            on_outcome=on_outcome, backend=backend)
+        for i, (source, clean_data) in enumerate(results):
+            status(f"Processando: {source.name}...")
+            progress(int(((i + 1 + duplicates_found) / total_files) * 100))
+            waiting[submitted.popleft()] = (source, clean_data)
+            release()
+        makespan = time.perf_counter() - extraction_started
+
+        # Cópias idênticas no fim do lote, que nenhuma fonte seguinte revelou
+        while seen:
+            skip_copy(seen.popleft()[0])
+        release()
+
+        progress(100)
+        summary["notas"] = len(table)
+        workers = max_workers or batch_processor.default_workers()
+        summary["makespan_s"] = round(makespan, 3)
+        summary["ocupacao"] = round(busy_seconds / (makespan * workers), 3) if makespan else None
+        finished = {"duracao_s": round(time.perf_counter() - started, 3), "ordem_envio": schedule}
+        if reader is not None:
+            # Tempo em que o processamento ficou parado esperando a leitura
+            finished["espera_leitura_s"] = round(reader.wait_seconds, 3)
+        if fanout is not None:
+            status("Concluindo as saídas adicionais...")
+            failed = fanout.close(totals.sheets())
+            fanout = None
+            summary["saidas_com_erro"] = len(failed)
+            for path, error in failed.items():
+                monitor.event("saida_erro", saida=path, erro=error)
+        if not table:
+            monitor.run_finished(**finished, **summary)
+            return summary
+
+        if existing is not None:
+            status("Acrescentando as notas novas ao relatório...")
+            excel_writer.append_excel_report(table, output_path, existing,
+                                             summaries=totals.sheets())
+        else:
+            status("Gerando relatório Excel...")
+            excel_writer.generate_excel_report(table, output_path=output_path,
+                                               summaries=totals.sheets())
+
+        # Só grava o histórico de duplicatas depois do relatório gerado
+        index.commit()
+        monitor.run_finished(**finished, **summary)
+        return summary
+    finally:
+        if fanout is not None:
+            fanout.close()  # Execução interrompida: encerra as threads de gravação
+        index.close()
+        input_sources.close_zip_handles()
+        if (backend or config.EXTRACTION_BACKEND) == "cache":
+            glyph_cache.prune_cache()
@@ -0,0 +1,87 @@
+"""
+Módulo de Leitura Antecipada
+
+Lê os próximos PDFs de um lote em threads de segundo plano enquanto os
+anteriores são processados. Com os arquivos numa pasta de rede (SMB), a
+espera pela rede passa a acontecer ao mesmo tempo que o trabalho de CPU, em
+vez de alternar com ele.
+
+A leitura antecipada é limitada em número de arquivos e em bytes. O conteúdo
+lido vai para PdfSource.data; PdfSource.open() o entrega ao pdfplumber num
+io.BytesIO, que usa o mesmo buffer sem copiá-lo.
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+from src import config, deduplicator
+from src.input_sources import PdfSource
+
+
+def _load(source: PdfSource) -> PdfSource:
+    """Lê o conteúdo da fonte. Em caso de erro (inclusive um membro de ZIP
+    corrompido), devolve a fonte sem conteúdo: a extração tentará de novo e
+    registrará a falha."""
+    if source.data is not None:
+        return source
+    try:
+        data = source.read_bytes()
+    except deduplicator.READ_ERRORS:
+        return source
+    return PdfSource(source.name, path=source.path, member=source.member,
+                     data=data, size=len(data))
+
+
+class Prefetcher:
+    """
+    Itera sobre as fontes na ordem original, com o conteúdo já em memória.
+
+    Args:
+        sources (Iterable[PdfSource]): As fontes do lote.
+        max_files (int, optional): Arquivos lidos à frente do consumidor.
+        max_bytes (int, optional): Limite de bytes lidos à frente. Um arquivo
+                                   maior que o limite ainda é lido, sozinho.
+        threads (int, optional): Leituras simultâneas.
+
+    Attributes:
+        wait_seconds (float): Tempo total que o consumidor esperou pela leitura
+                              (perto de zero quando a leitura acompanha o processamento).
+    """
+
+    def __init__(self, sources: Iterable[PdfSource], max_files: Optional[int] = None,
+                 max_bytes: Optional[int] = None, threads: Optional[int] = None):
+        self.sources = sources
+        self.max_files = max(1, max_files or config.PREFETCH_FILES)
+        self.max_bytes = max_bytes or config.PREFETCH_MAX_BYTES
+        self.threads = threads or config.PREFETCH_THREADS
+        self.wait_seconds = 0.0
+
+    def __iter__(self) -> Iterator[PdfSource]:
+        pending = deque()  # (tamanho reservado, future), na ordem das fontes
+        reserved = 0
+        sources = iter(self.sources)
+        next_source = next(sources, None)
+        with ThreadPoolExecutor(max_workers=self.threads,
+                                thread_name_prefix="prefetch") as executor:
+            while next_source is not None or pending:
+                # Enche a janela de leitura até o limite de arquivos ou de bytes
+                while next_source is not None and len(pending) < self.max_files:
+                    # Fontes já em memória não contam; sem tamanho conhecido, conta zero
+                    size = (next_source.size or 0) if next_source.data is None else 0
+                    if pending and reserved + size > self.max_bytes:
+                        break
+                    pending.append((size, executor.submit(_load, next_source)))
+                    reserved += size
+                    next_source = next(sources, None)
+
+                size, future = pending.popleft()
+                if not future.done():
+                    started = time.perf_counter()
+                    source = future.result()
+                    self.wait_seconds += time.perf_counter() - started
+                else:
+                    source = future.result()
+                reserved -= size
+                yield source
+
@@ -0,0 +1,182 @@
+"""
+Módulo de Armazenamento Compacto de Registros
+
+Guarda os registros extraídos de um lote em colunas, em vez de um dicionário
+por nota. Cada nota deixa de carregar suas próprias chaves e a sobrecarga de
+um dict; colunas numéricas ficam em arrays tipados e textos curtos que se
+repetem (CNPJs, nomes, datas) são internados e compartilhados entre as notas.
+
+Veja tools/bench_records.py para a comparação de memória por nota.
+"""
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Textos até este tamanho são internados (valores longos raramente se repetem)
+INTERN_MAX_LENGTH = 64
+
+
+class _Column:
+    """
+    Uma coluna de valores. Começa tipada ('int' ou 'float', em array) conforme
+    o primeiro valor não nulo e passa a 'object' (lista) se aparecer um valor
+    de outro tipo. Nulos em colunas tipadas são marcados em 'nulls'.
+    """
+    __slots__ = ("kind", "data", "nulls")
+
+    def __init__(self, size: int = 0):
+        # Até o primeiro valor não nulo, a coluna só conta os nulos
+        self.kind = "empty"
+        self.data: Any = size
+        self.nulls: Optional[bytearray] = None
+
+    def __len__(self) -> int:
+        return self.data if self.kind == "empty" else len(self.data)
+
+    def append(self, value: Any) -> None:
+        if value is None:
+            if self.kind == "empty":
+                self.data += 1
+            elif self.kind == "object":
+                self.data.append(None)
+            else:
+                self.data.append(0)
+                self.nulls.append(1)
+            return
+
+        if self.kind == "empty":
+            self._start(value)
+        elif self.kind == "int" and not _is_int(value):
+            if isinstance(value, float):
+                self._convert("float")
+            else:
+                self._convert("object")
+        elif self.kind == "float" and (isinstance(value, bool) or not isinstance(value, (float, int))):
+            self._convert("object")
+
+        if self.kind == "object":
+            if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+                value = sys.intern(value)
+            self.data.append(value)
+        else:
+            self.data.append(value)
+            self.nulls.append(0)
+
+    def _start(self, value: Any) -> None:
+        nulls = self.data
+        if _is_int(value):
+            self.kind, self.data = "int", array("q", [0]) * nulls
+        elif isinstance(value, float):
+            self.kind, self.data = "float", array("d", [0.0]) * nulls
+        else:
+            self.kind, self.data = "object", [None] * nulls
+            return
+        self.nulls = bytearray(b"\x01") * nulls
+
+    def _convert(self, kind: str) -> None:
+        values = list(self)
+        if kind == "float":
+            self.data = array("d", (0.0 if v is None else float(v) for v in values))
+        else:
+            self.data, self.nulls = values, None
+        self.kind = kind
+
+    def __getitem__(self, index: int) -> Any:
+        if self.kind == "empty":
+            return None
+        if self.kind == "object":
+            return self.data[index]
+        return None if self.nulls[index] else self.data[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.kind == "empty":
+            return iter([None] * self.data)
+        if self.kind == "object":
+            return iter(self.data)
+        return (None if null else value for value, null in zip(self.data, self.nulls))
+
+    def nbytes(self) -> int:
+        """Memória aproximada ocupada pela coluna (sem contar textos compartilhados)."""
+        if self.kind == "empty":
+            return 0
+        if self.kind == "object":
+            return sys.getsizeof(self.data)
+        return self.data.buffer_info()[1] * self.data.itemsize + len(self.nulls)
+
+
+def _is_int(value: Any) -> bool:
+    # int > 2^63 não cabe no array 'q'
+    return isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63
+
+
+class RecordTable:
+    """
+    Tabela de registros armazenada por colunas.
+
+    Aceita dicionários em append() (como os produzidos pelo processamento em
+    lote) e os devolve em iter_dicts(), mas nunca guarda um dict por nota.
+    Campos novos criam colunas sob demanda, preenchidas com None nas notas
+    anteriores.
+    """
+
+    def __init__(self, columns: Sequence[str] = ()):
+        self._rows = 0
+        self._columns: Dict[str, _Column] = {}
+        for name in columns:
+            self._add_column(name)
+
+    @classmethod
+    def from_layout(cls, layout_map: Dict[str, Any]) -> "RecordTable":
+        """Cria a tabela com o esquema do layout: 'arquivo_origem' + um campo por coluna."""
+        return cls(["arquivo_origem", *layout_map])
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def _add_column(self, name: str) -> _Column:
+        column = _Column(self._rows)
+        self._columns[sys.intern(name)] = column
+        return column
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Adiciona um registro (campos ausentes ficam como None)."""
+        for name in record:
+            if name not in self._columns:
+                self._add_column(name)
+        for name, column in self._columns.items():
+            column.append(record.get(name))
+        self._rows += 1
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def column(self, name: str) -> List[Any]:
+        """Retorna os valores de uma coluna, em ordem."""
+        return list(self._columns[name])
+
+    def row(self, index: int) -> Tuple[Any, ...]:
+        """Retorna os valores de uma nota, na ordem das colunas."""
+        return tuple(column[index] for column in self._columns.values())
+
+    def iter_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Gera as notas como tuplas, na ordem das colunas."""
+        return zip(*(iter(column) for column in self._columns.values())) if self._columns else iter(())
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Gera as notas como dicionários (para código que ainda espera dicts)."""
+        names = self.columns
+        for values in self.iter_rows():
+            yield dict(zip(names, values))
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Retorna {coluna: valores}, pronto para pandas.DataFrame."""
+        return {name: list(column) for name, column in self._columns.items()}
+
+    def nbytes(self) -> int:
+        """Memória aproximada das colunas (arrays e listas de referências)."""
+        return sum(column.nbytes() for column in self._columns.values())
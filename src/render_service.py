@@ -0,0 +1,189 @@
+"""
+Módulo de Renderização de Páginas
+
+Serviço compartilhado para rasterizar páginas de PDF, usado pelo criador de
+layouts e pelas ferramentas em tools/.
+
+- A renderização roda em uma thread dedicada (o PDFium não é thread-safe,
+  então todas as chamadas passam por ela), sem travar a interface.
+- Cada imagem é salva em um cache em disco (PNG), com chave formada pelo
+  hash do arquivo + página + DPI (+ recorte, para os blocos de zoom).
+  Abrir de novo a mesma amostra não renderiza nada.
+- O resultado é o caminho do PNG em cache: o Qt decodifica o arquivo direto
+  em um QImage e o OpenCV direto em um array, sem cópias intermediárias
+  via PIL.
+- O cache é limitado a config.RENDER_CACHE_MAX_MB: ao abrir e ao encerrar o
+  serviço, as imagens usadas há mais tempo são removidas.
+- A análise da página no pdfplumber (tamanho e palavras, para as âncoras)
+  também roda na thread de renderização (submit_page_index).
+"""
+import hashlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import pdfplumber
+import pypdfium2
+
+from src import config, disk_cache
+from src.word_index import WordIndex
+
+# Tamanho (em pontos de PDF) dos blocos renderizados em alta resolução no zoom
+TILE_SIZE = 144
+
+
+class RenderService:
+    """
+    Renderiza páginas (ou blocos de páginas) de PDF com cache em disco.
+
+    Use submit() para renderizar em segundo plano (retorna um Future com o
+    caminho do PNG) ou render() para aguardar o resultado.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_cache_mb: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or config.RENDER_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = (max_cache_mb or config.RENDER_CACHE_MAX_MB) * 1024 * 1024
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+        self._executor.submit(disk_cache.prune, self.cache_dir, self.max_cache_bytes)
+        # Hash de cada arquivo, revalidado pelo tamanho e data de modificação
+        self._digests: Dict[str, Tuple[int, float, str]] = {}
+        # Último documento aberto, reaproveitado entre páginas e blocos
+        self._open_path: Optional[str] = None
+        self._open_doc = None
+
+    def shutdown(self) -> None:
+        """Encerra a thread de renderização."""
+        self._executor.submit(self._close_document)
+        self._executor.submit(disk_cache.prune, self.cache_dir, self.max_cache_bytes)
+        self._executor.shutdown(wait=True)
+
+    def submit(self, pdf_path: str, page_num: int, dpi: int,
+               tile: Optional[Sequence[float]] = None) -> "Future[Path]":
+        """
+        Agenda a renderização de uma página na thread de renderização.
+
+        Args:
+            pdf_path (str): Caminho do PDF.
+            page_num (int): Índice da página (começando em 0).
+            dpi (int): Resolução desejada.
+            tile (Sequence[float], optional): Recorte (x0, top, x1, bottom) em
+                pontos de PDF. Sem ele, renderiza a página inteira.
+
+        Returns:
+            Future[Path]: Caminho do PNG em cache.
+        """
+        return self._executor.submit(self._render, str(pdf_path), page_num, dpi, tile)
+
+    def render(self, pdf_path: str, page_num: int, dpi: int,
+               tile: Optional[Sequence[float]] = None) -> Path:
+        """Renderiza uma página e aguarda o caminho do PNG em cache."""
+        return self.submit(pdf_path, page_num, dpi, tile).result()
+
+    def submit_page_index(self, pdf_path: str, page_num: int
+                          ) -> "Future[Tuple[Tuple[float, float], WordIndex]]":
+        """
+        Agenda a análise de uma página no pdfplumber, na thread de renderização.
+
+        Returns:
+            Future: ((largura, altura) da página em pontos, índice das palavras).
+        """
+        return self._executor.submit(self._page_index, str(pdf_path), page_num)
+
+    def page_count(self, pdf_path: str) -> int:
+        """Retorna o número de páginas do PDF."""
+        return self._executor.submit(lambda: len(self._document(str(pdf_path)))).result()
+
+    def page_size(self, pdf_path: str, page_num: int) -> Tuple[float, float]:
+        """Retorna (largura, altura) da página em pontos de PDF."""
+        return self._executor.submit(
+            lambda: tuple(self._document(str(pdf_path))[page_num].get_size())).result()
+
+    # --- Executado apenas na thread de renderização ---
+
+    def _file_digest(self, pdf_path: str) -> str:
+        stat = os.stat(pdf_path)
+        cached = self._digests.get(pdf_path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            return cached[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self._digests[pdf_path] = (stat.st_size, stat.st_mtime, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _document(self, pdf_path: str):
+        if self._open_path != pdf_path:
+            self._close_document()
+            self._open_doc = pypdfium2.PdfDocument(pdf_path)
+            self._open_path = pdf_path
+        return self._open_doc
+
+    def _close_document(self) -> None:
+        if self._open_doc is not None:
+            self._open_doc.close()
+        self._open_doc = None
+        self._open_path = None
+
+    def _render(self, pdf_path: str, page_num: int, dpi: int,
+                tile: Optional[Sequence[float]]) -> Path:
+        name = f"{self._file_digest(pdf_path)}_p{page_num}_{dpi}dpi"
+        if tile:
+            name += "_" + "_".join(f"{v:g}" for v in tile)
+        cache_path = self.cache_dir / f"{name}.png"
+        if cache_path.exists():
+            disk_cache.touch(cache_path)
+            return cache_path
+
+        page = self._document(pdf_path)[page_num]
+        crop = (0, 0, 0, 0)
+        if tile:
+            # O PDFium recorta pela quantidade a remover de cada borda
+            # (esquerda, baixo, direita, cima), com origem no canto inferior
+            width, height = page.get_size()
+            x0, top, x1, bottom = tile
+            crop = (max(x0, 0), max(height - bottom, 0),
+                    max(width - x1, 0), max(top, 0))
+        bitmap = page.render(scale=dpi / 72, crop=crop, prefer_bgrx=True)
+
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        bitmap.to_pil().convert("RGB").save(tmp_path, format="PNG")
+        os.replace(tmp_path, cache_path)
+        return cache_path
+
+    def _page_index(self, pdf_path: str, page_num: int) -> Tuple[Tuple[float, float], WordIndex]:
+        with pdfplumber.open(pdf_path) as pdf:
+            page = pdf.pages[page_num]
+            return (float(page.width), float(page.height)), WordIndex.from_page(page)
+
+
+def tiles_for_region(region: Sequence[float], page_size: Tuple[float, float]) -> list:
+    """
+    Lista os blocos da grade (de TILE_SIZE pontos) que cobrem uma região
+    (x0, top, x1, bottom) da página, já limitados às bordas da página.
+    """
+    width, height = page_size
+    x0, top, x1, bottom = region
+    first_col, last_col = int(max(x0, 0) // TILE_SIZE), int(min(x1, width) // TILE_SIZE)
+    first_row, last_row = int(max(top, 0) // TILE_SIZE), int(min(bottom, height) // TILE_SIZE)
+    tiles = []
+    for row in range(first_row, last_row + 1):
+        for col in range(first_col, last_col + 1):
+            tile = (col * TILE_SIZE, row * TILE_SIZE,
+                    min((col + 1) * TILE_SIZE, width), min((row + 1) * TILE_SIZE, height))
+            if tile[0] < tile[2] and tile[1] < tile[3]:
+                tiles.append(tile)
+    return tiles
+
+
+_default_service: Optional[RenderService] = None
+
+
+def get_service() -> RenderService:
+    """Retorna o serviço de renderização compartilhado do processo."""
+    global _default_service
+    if _default_service is None:
+        _default_service = RenderService()
+    return _default_service
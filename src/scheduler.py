@@ -0,0 +1,105 @@
+"""
+Módulo de Ordenação do Lote
+
+O tempo de extração varia muito entre os PDFs: milissegundos para uma nota
+de uma página, segundos para um PDF grande de várias páginas. Distribuídos
+na ordem de entrada, um arquivo grande no fim do lote deixa todos os
+processos parados, menos um, esperando por ele.
+
+Aqui o custo de cada PDF é estimado antes da extração, a partir do tamanho
+e do número de páginas (lido só da tabela de referências e do catálogo do
+PDF, sem interpretar as páginas), e os maiores são enviados primeiro. Como
+os processos de trabalho pegam a próxima tarefa assim que ficam livres, os
+arquivos pequenos preenchem o fim do lote.
+
+No fluxo de extração a ordenação é feita em janelas de PDFs seguidos
+(longest_first_windows): a estimativa é lida janela a janela, à medida que
+o lote avança, e a ordem original é restaurada nota a nota antes do
+relatório (ver pipeline.py), guardando no máximo as notas de uma janela.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+from src import config
+from src.input_sources import PdfSource
+
+SCHEDULES = ("maiores_primeiro", "ordem")
+# Bytes equivalentes a uma página no custo estimado (imagens pesam no
+# tamanho, mas quase nada na extração de texto)
+BYTES_PER_PAGE = 256 * 1024
+
+
+def page_count(source: PdfSource) -> Optional[int]:
+    """
+    Lê o número de páginas do catálogo do PDF, sem interpretar as páginas.
+    Membros de ZIP não são lidos aqui (exigiriam descompactar o arquivo).
+    """
+    if source.data is None and source.member is not None:
+        return None
+    try:
+        with source.open() as stream:
+            document = PDFDocument(PDFParser(stream))
+            return int(resolve1(resolve1(document.catalog["Pages"])["Count"]))
+    except Exception:
+        return None  # PDF inválido: a extração vai registrar o erro
+
+
+def estimate_cost(source: PdfSource) -> float:
+    """Custo relativo da extração, em 'páginas equivalentes'."""
+    size = source.size
+    if size is None and source.path and source.member is None:
+        try:
+            size = os.path.getsize(source.path)
+        except OSError:
+            size = 0
+    size = size or 0
+    pages = page_count(source)
+    if pages is None:
+        pages = max(1, size // BYTES_PER_PAGE)
+    return pages + size / BYTES_PER_PAGE
+
+
+def longest_first(sources: Iterable[PdfSource],
+                  threads: Optional[int] = None) -> List[Tuple[int, PdfSource]]:
+    """
+    Ordena as fontes da mais cara para a mais barata.
+
+    Returns:
+        List[Tuple[int, PdfSource]]: (posição original, fonte), na ordem de envio.
+                                     Fontes de mesmo custo (ex: cópias idênticas)
+                                     mantêm a ordem original.
+    """
+    sources = list(sources)
+    with ThreadPoolExecutor(max_workers=threads or config.PREFETCH_THREADS,
+                            thread_name_prefix="probe") as executor:
+        costs = list(executor.map(estimate_cost, sources))
+    order = sorted(range(len(sources)), key=lambda i: -costs[i])
+    return [(i, sources[i]) for i in order]
+
+
+def longest_first_windows(sources: Iterable[PdfSource], window: int,
+                          threads: Optional[int] = None) -> Iterator[Tuple[int, PdfSource]]:
+    """
+    Ordena as fontes da mais cara para a mais barata dentro de cada janela de
+    'window' fontes seguidas. Todas as fontes de uma janela saem antes das da
+    seguinte, e o custo de uma janela só é estimado quando ela é alcançada.
+
+    Yields:
+        Tuple[int, PdfSource]: (posição original, fonte), na ordem de envio.
+    """
+    sources = iter(sources)
+    start = 0
+    while True:
+        chunk = list(islice(sources, window))
+        if not chunk:
+            return
+        for position, source in longest_first(chunk, threads):
+            yield start + position, source
+        start += len(chunk)
+
@@ -0,0 +1,288 @@
+"""
+Módulo de Execução em Partes (Shards)
+
+Divide um lote muito grande (ex: o reprocessamento do arquivo do ano) entre
+várias máquinas ou vários processos independentes:
+
+1. plan_shards: grava um manifesto com todos os PDFs, na ordem de entrada,
+   e a parte ('shard') de cada um. A parte sai de um hash do nome do
+   arquivo, então o mesmo arquivo cai sempre na mesma parte.
+2. run_shard: processa só os PDFs de uma parte e grava um arquivo parcial
+   (JSON Lines compactado) que se descreve sozinho: o manifesto de origem,
+   o layout usado e, para cada PDF, a posição no manifesto, o hash do
+   conteúdo e o registro extraído. O arquivo só aparece com o nome final
+   quando a parte termina, então um parcial incompleto nunca é aceito.
+3. merge_partials: junta os parciais de todas as partes no relatório final,
+   na ordem do manifesto, detectando cópias idênticas e notas duplicadas
+   como numa execução única (ver pipeline.py).
+
+Os caminhos do manifesto precisam valer em todas as máquinas (ex: uma pasta
+de rede montada no mesmo lugar).
+"""
+import gzip
+import hashlib
+import heapq
+import json
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from src import (batch_processor, config, deduplicator, excel_writer, field_roles,
+                 glyph_cache, input_sources, summaries)
+from src.input_sources import PdfSource
+from src.prefetch import Prefetcher
+from src.record_store import RecordTable
+
+MANIFEST_VERSION = 1
+PARTIAL_SUFFIX = ".jsonl.gz"
+
+
+def shard_of(name: str, shards: int) -> int:
+    """Parte de um arquivo, a partir do hash do nome (estável entre máquinas e execuções)."""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def _file_digest(path: Union[str, Path]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan_shards(paths: Iterable[str], shards: int, manifest_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Grava o manifesto de uma execução em partes.
+
+    Args:
+        paths (Iterable[str]): PDFs e ZIPs de entrada.
+        shards (int): Número de partes.
+        manifest_path (Union[str, Path]): O arquivo .json do manifesto.
+
+    Returns:
+        Dict[str, Any]: {"arquivos": total de PDFs, "por_parte": PDFs em cada parte}.
+    """
+    if shards < 1:
+        raise ValueError("O número de partes precisa ser pelo menos 1.")
+    sources = input_sources.expand_sources(paths)
+    files = [{"nome": source.name, "caminho": os.path.abspath(source.path),
+              "membro": source.member, "tamanho": source.size,
+              "parte": shard_of(source.name, shards)}
+             for source in sources]
+    manifest = {"versao": MANIFEST_VERSION, "partes": shards,
+                "criado_em": datetime.now().isoformat(timespec="seconds"), "arquivos": files}
+
+    manifest_path = Path(manifest_path)
+    tmp_path = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    per_shard = [0] * shards
+    for entry in files:
+        per_shard[entry["parte"]] += 1
+    return {"arquivos": len(files), "por_parte": per_shard}
+
+
+def load_manifest(manifest_path: Union[str, Path]) -> Dict[str, Any]:
+    """Lê um manifesto e acrescenta a chave 'hash' (o hash do próprio arquivo)."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("versao") != MANIFEST_VERSION:
+        raise ValueError(f"Versão de manifesto não suportada em '{manifest_path}'.")
+    manifest["hash"] = _file_digest(manifest_path)
+    return manifest
+
+
+def partial_path(output_dir: Union[str, Path], shard: int, shards: int) -> Path:
+    return Path(output_dir) / f"parcial_{shard + 1:04d}_de_{shards:04d}{PARTIAL_SUFFIX}"
+
+
+def run_shard(manifest_path: Union[str, Path], shard: int, layout_map: Dict[str, Any],
+              output_dir: Union[str, Path], max_workers: Optional[int] = None,
+              backend: Optional[str] = None) -> Path:
+    """
+    Processa os PDFs de uma parte e grava o arquivo parcial dela.
+
+    Args:
+        manifest_path (Union[str, Path]): O manifesto (ver plan_shards).
+        shard (int): A parte a processar, a partir de 0 (os nomes dos arquivos
+                     e as mensagens contam a partir de 1).
+        layout_map (Dict[str, Any]): O layout a aplicar.
+        output_dir (Union[str, Path]): Pasta onde o parcial é gravado.
+        max_workers (int, optional): Número de processos de extração.
+        backend (str, optional): O motor de extração.
+
+    Returns:
+        Path: O arquivo parcial gravado.
+    """
+    manifest = load_manifest(manifest_path)
+    shards = manifest["partes"]
+    if not 0 <= shard < shards:
+        raise ValueError(f"Parte {shard + 1} inexistente: o manifesto tem {shards} parte(s).")
+
+    positions = [i for i, entry in enumerate(manifest["arquivos"]) if entry["parte"] == shard]
+    sources = [PdfSource(entry["nome"], path=entry["caminho"], member=entry["membro"],
+                         size=entry["tamanho"])
+               for entry in (manifest["arquivos"][i] for i in positions)]
+
+    # O hash do conteúdo é calculado aqui, com o arquivo já lido, para a
+    # detecção de cópias idênticas na junção
+    digests = []
+
+    def hashed(reader):
+        for source in reader:
+            try:
+                digests.append(deduplicator.content_hash(source))
+            except deduplicator.READ_ERRORS:
+                digests.append(None)  # A extração vai registrar a falha de leitura
+            yield source
+
+    outcomes = deque()
+    results = batch_processor.run_batch(
+        hashed(Prefetcher(sources)), layout_map, max_workers=max_workers,
+        on_outcome=lambda source, outcome: outcomes.append(outcome), backend=backend)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    final_path = partial_path(output_dir, shard, shards)
+    tmp_path = final_path.with_name(final_path.name + f".{os.getpid()}.tmp")
+    header = {"tipo": "cabecalho", "manifesto": manifest["hash"], "parte": shard,
+              "partes": shards, "layout": layout_map, "arquivos": len(sources)}
+    written = 0
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for i, (source, record) in enumerate(results):
+                outcome = outcomes.popleft()
+                if outcome["erro"]:
+                    print(f"Erro ao processar '{source.name}': {outcome['mensagem']}")
+                line = {"tipo": "arquivo", "posicao": positions[i], "arquivo": source.name,
+                        "hash": digests[i], "resultado": outcome["resultado"],
+                        "erro": outcome["erro"], "registro": record}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                written += 1
+            f.write(json.dumps({"tipo": "fim", "arquivos": written}) + "\n")
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        # Falha ou interrupção (Ctrl+C): não deixa um parcial pela metade na pasta
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        input_sources.close_zip_handles()
+        if (backend or config.EXTRACTION_BACKEND) == "cache":
+            glyph_cache.prune_cache()
+    return final_path
+
+
+def read_partial_header(path: Union[str, Path]) -> Dict[str, Any]:
+    """Lê só o cabeçalho de um arquivo parcial (manifesto, parte, layout, número de PDFs)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    if header.get("tipo") != "cabecalho":
+        raise ValueError(f"'{path}' não é um arquivo parcial.")
+    return header
+
+
+def iter_partial(path: Union[str, Path], header: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Gera as linhas de um arquivo parcial (uma por PDF, na ordem do manifesto),
+    lendo o arquivo aos poucos. Um parcial incompleto é detectado no fim.
+    """
+    count = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        f.readline()  # Cabeçalho
+        for text in f:
+            line = json.loads(text)
+            if line["tipo"] == "fim":
+                if line["arquivos"] != count or count != header["arquivos"]:
+                    break
+                return
+            count += 1
+            yield line
+    raise ValueError(f"O arquivo parcial '{path}' está incompleto.")
+
+
+def merge_partials(manifest_path: Union[str, Path], partial_paths: Sequence[Union[str, Path]],
+                   output_path: str) -> Dict[str, int]:
+    """
+    Junta os parciais de todas as partes no relatório Excel final.
+
+    Todas as partes do manifesto precisam estar presentes, uma única vez, e
+    com o mesmo layout. As notas saem na ordem do manifesto; cópias idênticas
+    e notas duplicadas são marcadas como numa execução única.
+
+    Returns:
+        Dict[str, int]: 'notas', 'falhas' e 'duplicatas', como em pipeline.run_pipeline.
+    """
+    manifest = load_manifest(manifest_path)
+    shards = manifest["partes"]
+    partials: Dict[int, Dict[str, Any]] = {}
+    for path in partial_paths:
+        partial = read_partial_header(path)
+        if partial["manifesto"] != manifest["hash"]:
+            raise ValueError(f"'{path}' foi gerado a partir de outro manifesto.")
+        if partial["parte"] in partials:
+            raise ValueError(f"A parte {partial['parte'] + 1} aparece mais de uma vez.")
+        partial["caminho"] = path
+        partials[partial["parte"]] = partial
+    missing = [str(shard + 1) for shard in range(shards) if shard not in partials]
+    if missing:
+        raise ValueError(f"Faltam os parciais da(s) parte(s): {', '.join(missing)}.")
+    layouts = {json.dumps(partial["layout"], sort_keys=True) for partial in partials.values()}
+    if len(layouts) > 1:
+        raise ValueError("As partes foram processadas com layouts diferentes.")
+
+    layout_map = partials[0]["layout"]
+    if sum(partial["arquivos"] for partial in partials.values()) != len(manifest["arquivos"]):
+        raise ValueError("Os parciais não cobrem todos os arquivos do manifesto.")
+    # Cada parcial já está na ordem do manifesto: a junção lê todos ao mesmo
+    # tempo, uma linha de cada vez, sem carregá-los na memória
+    lines = heapq.merge(*(iter_partial(partial["caminho"], partial) for partial in partials.values()),
+                        key=lambda line: line["posicao"])
+
+    roles = field_roles.resolve_roles(layout_map)
+    totals = summaries.SummaryTotals(roles)
+    table = RecordTable.from_layout(layout_map)
+    summary = {"notas": 0, "falhas": 0, "duplicatas": 0}
+    collapse = config.DEDUP_MODE == "collapse"
+    index = deduplicator.DuplicateIndex(config.DEDUP_INDEX_PATH)
+    try:
+        for line in lines:
+            original = index.check_content(line["hash"], line["arquivo"]) if line["hash"] else None
+            if original:
+                # Cópia idêntica, na posição dela, como numa execução única
+                summary["duplicatas"] += 1
+                if not collapse:
+                    table.append({"arquivo_origem": line["arquivo"],
+                                  deduplicator.DUPLICATE_COLUMN: original})
+                continue
+            record = line["registro"]
+            if not record:
+                summary["falhas"] += 1
+                continue
+            original = index.check_record(record, roles)
+            if original:
+                summary["duplicatas"] += 1
+                if collapse:
+                    continue
+            record[deduplicator.DUPLICATE_COLUMN] = original or ""
+            table.append(record)
+            if not original:
+                totals.add(record)
+
+        summary["notas"] = len(table)
+        if table:
+            excel_writer.generate_excel_report(table, output_path=output_path,
+                                               summaries=totals.sheets())
+            index.commit()
+        return summary
+    finally:
+        index.close()
@@ -0,0 +1,198 @@
+"""
+Módulo de Extração Assíncrona (asyncio)
+
+API para embutir o extrator em serviços baseados em asyncio, sem que eles
+precisem montar os próprios pools de threads:
+
+    async for result in extract_stream(sources, "prefeitura_go", concurrency=4):
+        if result.ok:
+            salvar(result.record)
+        else:
+            registrar(result.name, result.error)
+
+A extração roda num pool de processos (a mesma função do processamento em
+lote, batch_processor.extract_source), fora do loop de eventos. As fontes
+são consumidas aos poucos e ficam numa fila limitada: quando quem consome
+os resultados está lento, a fila enche e nenhuma fonte nova é lida nem
+enviada aos processos, então a memória não cresce com o lote.
+
+Os resultados saem na ordem das fontes, sempre como StreamResult: um PDF que
+falha gera um resultado com 'error' preenchido, em vez de None. Interromper o
+'async for' (break, exceção ou cancelamento da tarefa) cancela as extrações
+que ainda não começaram.
+"""
+import asyncio
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Union
+
+from src import batch_processor, config, input_sources, pdf_backends
+from src.input_sources import PdfSource
+
+SourceLike = Union[PdfSource, str, Path]
+
+
+class ExtractionError:
+    """
+    Falha na extração de um PDF.
+
+    Attributes:
+        kind (str): A classe da exceção (ex: 'PDFSyntaxError'), ou
+                    'SemTexto' quando o PDF abriu mas nenhum campo tinha texto.
+        message (str): A mensagem da exceção.
+    """
+    __slots__ = ("kind", "message")
+
+    def __init__(self, kind: str, message: str):
+        self.kind = kind
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"ExtractionError({self.kind!r}, {self.message!r})"
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.message}"
+
+
+class StreamResult:
+    """
+    Resultado da extração de uma fonte.
+
+    Attributes:
+        name (str): Nome da fonte (o mesmo de 'arquivo_origem').
+        status (str): "ok", "sem_texto" ou "erro" (ver batch_processor.extract_source).
+        record (Dict[str, Any]): O registro limpo; None em caso de erro.
+        error (ExtractionError): A falha; None quando status é "ok".
+        pages (int): Número de páginas do PDF (None se não abriu).
+        duration (float): Tempo da extração, em segundos.
+    """
+    __slots__ = ("name", "status", "record", "error", "pages", "duration")
+
+    def __init__(self, name: str, status: str, record: Optional[Dict[str, Any]],
+                 error: Optional[ExtractionError], pages: Optional[int], duration: float):
+        self.name = name
+        self.status = status
+        self.record = record
+        self.error = error
+        self.pages = pages
+        self.duration = duration
+
+    @classmethod
+    def from_outcome(cls, name: str, outcome: Dict[str, Any]) -> "StreamResult":
+        error = None
+        if outcome["erro"]:
+            error = ExtractionError(outcome["erro"], outcome["mensagem"] or "")
+        elif outcome["resultado"] == "sem_texto":
+            error = ExtractionError("SemTexto", "Nenhum campo do layout tem texto no PDF.")
+        return cls(name, outcome["resultado"], outcome["registro"], error,
+                   outcome["paginas"], outcome["duracao"])
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    def __repr__(self) -> str:
+        return f"StreamResult({self.name!r}, {self.status!r})"
+
+
+def _as_sources(item: SourceLike) -> Iterable[PdfSource]:
+    if isinstance(item, PdfSource):
+        return (item,)
+    # Caminho de um PDF ou de um ZIP (um ZIP gera uma fonte por PDF)
+    return input_sources.expand_sources([str(item)])
+
+
+async def _iterate(sources: Union[Iterable[SourceLike], AsyncIterable[SourceLike]]):
+    if hasattr(sources, "__aiter__"):
+        async for item in sources:
+            for source in _as_sources(item):
+                yield source
+    else:
+        for item in sources:
+            for source in _as_sources(item):
+                yield source
+
+
+async def extract_stream(sources: Union[Iterable[SourceLike], AsyncIterable[SourceLike]],
+                         layout: Union[str, Dict[str, Any]],
+                         concurrency: Optional[int] = None,
+                         backend: Optional[str] = None,
+                         queue_size: Optional[int] = None,
+                         executor: Optional[Executor] = None) -> AsyncIterator[StreamResult]:
+    """
+    Extrai as fontes em paralelo e gera os resultados na ordem das fontes.
+
+    Args:
+        sources: PdfSource, caminhos de PDFs ou de ZIPs, num iterável comum
+                 ou assíncrono (ex: uma fila de uploads). São consumidos aos
+                 poucos, conforme a fila tem espaço.
+        layout (Union[str, Dict[str, Any]]): O layout ou o nome dele (em layouts/).
+        concurrency (int, optional): Número de processos de extração
+                                     (padrão: batch_processor.default_workers()).
+        backend (str, optional): O motor de extração (padrão: config.EXTRACTION_BACKEND).
+        queue_size (int, optional): Fontes enviadas e ainda não consumidas
+                                    (padrão: 2 por processo). É o limite da
+                                    contrapressão.
+        executor (Executor, optional): Um pool já iniciado (ex: o do serviço),
+                                       usado no lugar de um pool próprio. Não é
+                                       encerrado ao fim do fluxo.
+
+    Yields:
+        StreamResult: Um por PDF, inclusive os que falharam.
+    """
+    layout_map = config.load_layout(layout) if isinstance(layout, str) else layout
+    if not layout_map:
+        raise ValueError(f"Layout inválido ou vazio: '{layout}'.")
+    concurrency = concurrency or batch_processor.default_workers()
+    # Resolvido aqui, e não nos processos, que podem ter a configuração padrão
+    backend = pdf_backends.get_backend(backend).name
+    queue_size = queue_size or concurrency * batch_processor.IN_FLIGHT_PER_WORKER
+
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = batch_processor.worker_pool(concurrency)
+    # (nome da fonte, future) na ordem das fontes; None marca o fim
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def produce():
+        try:
+            async for source in _iterate(sources):
+                future = loop.run_in_executor(executor, batch_processor.extract_source,
+                                              source, layout_map, backend)
+                try:
+                    # Espera aqui quando a fila está cheia: é a contrapressão
+                    await queue.put((source.name, future))
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+        except Exception as e:
+            await queue.put(e)  # Ex: um ZIP corrompido; repassado a quem consome
+        else:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            name, future = item
+            yield StreamResult.from_outcome(name, await future)
+    finally:
+        # Fim normal, break, exceção ou cancelamento: nada novo é enviado e
+        # as extrações que ainda não começaram são canceladas
+        producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if isinstance(item, tuple):
+                item[1].cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+        if own_executor:
+            # Não espera as extrações já em andamento (o loop ficaria bloqueado)
+            executor.shutdown(wait=False, cancel_futures=True)
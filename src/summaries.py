@@ -0,0 +1,153 @@
+"""
+Módulo de Resumos do Relatório
+
+Mantém totais acumulados enquanto as notas passam pelo processamento:
+quantidade de notas e soma do valor do serviço por CNPJ do prestador, por
+tomador e por mês de emissão. A memória usada cresce com o número de grupos,
+não com o número de notas, e os resumos saem prontos no fim da execução,
+sem uma segunda leitura dos dados.
+
+Os resumos são gravados como planilhas extras do relatório. No modo de
+acréscimo, os totais anteriores são lidos dessas mesmas planilhas (que são
+pequenas) e somados aos das notas novas.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from openpyxl import load_workbook
+
+from src import data_parser, deduplicator
+
+# Agrupamento -> nome da planilha de resumo
+SUMMARY_SHEETS = {
+    "prestador": "Resumo por Prestador",
+    "tomador": "Resumo por Tomador",
+    "mes": "Resumo por Mês",
+}
+# Papéis (ver field_roles) usados por cada agrupamento: (chave, descrição)
+GROUP_ROLES = {
+    "prestador": ("cnpj_prestador", "nome_prestador"),
+    "tomador": ("cnpj_tomador", "nome_tomador"),
+    "mes": ("data_emissao", None),
+}
+HEADERS = {
+    "prestador": ["CNPJ/CPF do Prestador", "Prestador", "Notas", "Valor Total"],
+    "tomador": ["CNPJ/CPF do Tomador", "Tomador", "Notas", "Valor Total"],
+    "mes": ["Mês de Emissão", "Notas", "Valor Total"],
+}
+NO_KEY = "(não informado)"
+
+
+def _document_key(value: Any) -> str:
+    digits = re.sub(r"\D", "", str(value)) if value is not None else ""
+    return digits or NO_KEY
+
+
+def _month_key(value: Any) -> str:
+    date = data_parser.parse_date(str(value)) if value else None
+    return f"{date[6:10]}-{date[3:5]}" if date else NO_KEY
+
+
+def _amount(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return None if value != value else float(value)  # NaN
+    return data_parser.parse_monetary(str(value)) if value else None
+
+
+class SummaryTotals:
+    """
+    Totais por grupo, atualizados nota a nota.
+
+    Args:
+        roles (Dict[str, str]): Papéis do layout (ver field_roles.resolve_roles).
+    """
+
+    def __init__(self, roles: Dict[str, str]):
+        self.roles = roles
+        self.value_field = roles.get("valor_servico")
+        # Agrupamento -> {chave: [notas, soma, descrição]}
+        self.groups = {kind: {} for kind in SUMMARY_SHEETS
+                       if GROUP_ROLES[kind][0] in roles}
+
+    def __bool__(self) -> bool:
+        return bool(self.groups)
+
+    def add(self, record: Dict[str, Any]):
+        """Soma uma nota aos totais."""
+        amount = _amount(record.get(self.value_field)) if self.value_field else None
+        for kind, totals in self.groups.items():
+            key_role, label_role = GROUP_ROLES[kind]
+            value = record.get(self.roles[key_role])
+            key = _month_key(value) if kind == "mes" else _document_key(value)
+            label = record.get(self.roles[label_role]) if label_role in self.roles else None
+            self._add(totals, key, 1, amount or 0.0, label)
+
+    @staticmethod
+    def _add(totals, key, count, amount, label):
+        entry = totals.get(key)
+        if entry is None:
+            totals[key] = [count, amount, label or ""]
+            return
+        entry[0] += count
+        entry[1] += amount
+        if not entry[2] and label:
+            entry[2] = label
+
+    def sheets(self) -> Dict[str, Tuple[List[str], List[List[Any]]]]:
+        """Retorna {nome da planilha: (cabeçalho, linhas)}; meses em ordem, os demais pelo valor."""
+        sheets = {}
+        for kind, totals in self.groups.items():
+            if kind == "mes":
+                rows = [[key, count, round(amount, 2)]
+                        for key, (count, amount, _) in sorted(totals.items())]
+            else:
+                ordered = sorted(totals.items(), key=lambda item: (-item[1][1], item[0]))
+                rows = [[key, label, count, round(amount, 2)]
+                        for key, (count, amount, label) in ordered]
+            sheets[SUMMARY_SHEETS[kind]] = (HEADERS[kind], rows)
+        return sheets
+
+    def load_report(self, report_path: str) -> bool:
+        """
+        Soma os totais já gravados nas planilhas de resumo de um relatório.
+
+        Returns:
+            bool: False se o relatório não tiver alguma das planilhas esperadas
+                  (ex: gerado antes dos resumos existirem).
+        """
+        workbook = load_workbook(report_path, read_only=True)
+        try:
+            if any(SUMMARY_SHEETS[kind] not in workbook.sheetnames for kind in self.groups):
+                return False
+            for kind, totals in self.groups.items():
+                rows = workbook[SUMMARY_SHEETS[kind]].iter_rows(min_row=2, values_only=True)
+                for row in rows:
+                    if kind == "mes":
+                        key, count, amount, label = row[0], row[1], row[2], None
+                    else:
+                        key, label, count, amount = row[:4]
+                    if key is not None:
+                        self._add(totals, str(key), int(count or 0), float(amount or 0), label)
+            return True
+        finally:
+            workbook.close()
+
+    def load_report_rows(self, key_values: Dict[str, List[Any]], rows: int):
+        """
+        Soma as notas de um relatório a partir das colunas lidas por
+        excel_writer.read_report_keys (usado quando o relatório não tem resumos).
+        Notas marcadas como duplicatas não entram nos totais.
+        """
+        duplicates = key_values.get(deduplicator.DUPLICATE_COLUMN)
+        for i in range(rows):
+            if duplicates and duplicates[i]:
+                continue
+            self.add({column: values[i] for column, values in key_values.items()})
+
+    def report_columns(self) -> List[str]:
+        """Colunas do relatório necessárias para refazer os totais (ver load_report_rows)."""
+        roles = [role for kind in self.groups for role in GROUP_ROLES[kind] if role]
+        columns = [self.roles[role] for role in roles if role in self.roles]
+        if self.value_field:
+            columns.append(self.value_field)
+        return columns + [deduplicator.DUPLICATE_COLUMN]
@@ -0,0 +1,169 @@
+"""
+Módulo de Índice de Palavras por Página
+
+Permite que um campo do layout seja localizado a partir de um rótulo âncora
+(ex: "CPF/CNPJ:") em vez de apenas coordenadas absolutas. Assim, quando a
+prefeitura desloca o modelo da nota alguns pontos, o campo acompanha o rótulo.
+
+As palavras da página são extraídas uma única vez, ordenadas por posição
+(linha, x0) e indexadas por texto normalizado. Buscar uma âncora custa uma
+consulta ao dicionário mais uma busca binária pela ocorrência mais próxima
+da posição esperada, em vez de uma varredura de extract_words() por campo.
+
+Formato da âncora no layout (o 'offset' é relativo ao canto superior
+esquerdo do rótulo: [dx0, dtop, dx1, dbottom]):
+
+    "cnpj_prestador": {
+        "page": 0,
+        "coords": [193.73, 178.59, 260.88, 186.09],
+        "anchor": {"text": "CPF/CNPJ", "offset": [38.75, 0.0, 105.9, 7.5]}
+    }
+"""
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Distância vertical máxima (em pontos) para duas palavras ficarem na mesma linha
+LINE_TOLERANCE = 3.0
+
+
+def normalize_token(text: str) -> str:
+    """
+    Normaliza uma palavra para comparação: sem acentos, minúscula e sem
+    pontuação nas extremidades.
+
+    Exemplo: 'CPF/CNPJ:' -> 'cpf/cnpj'
+    """
+    without_accents = unicodedata.normalize("NFKD", text).encode(
+        "ascii", "ignore").decode("ascii")
+    return without_accents.lower().strip(" :;.,-")
+
+
+class WordIndex:
+    """
+    Índice das palavras de uma página (no formato de extract_words()).
+
+    Attributes:
+        words (List[Dict[str, Any]]): Palavras ordenadas por (linha, x0).
+        lines (List[int]): Número da linha de cada palavra.
+    """
+
+    def __init__(self, words: List[Dict[str, Any]]):
+        words = list(words)
+        words.sort(key=lambda w: (w["top"], w["x0"]))
+
+        # Agrupa as palavras em linhas, tolerando pequenas variações de 'top'
+        line_number, line_top = -1, None
+        keyed = []
+        for word in words:
+            if line_top is None or word["top"] - line_top > LINE_TOLERANCE:
+                line_number += 1
+                line_top = word["top"]
+            keyed.append((line_number, word["x0"], word))
+        keyed.sort(key=lambda item: (item[0], item[1]))
+
+        self.words = [item[2] for item in keyed]
+        self.lines = [item[0] for item in keyed]
+
+        # Texto normalizado -> posições em self.words (já em ordem de leitura)
+        self._by_text: Dict[str, List[int]] = {}
+        for position, word in enumerate(self.words):
+            self._by_text.setdefault(normalize_token(word["text"]), []).append(position)
+
+    @classmethod
+    def from_page(cls, page) -> "WordIndex":
+        """Cria o índice a partir de uma página do pdfplumber."""
+        return cls(page.extract_words())
+
+    def _matches_at(self, position: int, tokens: Sequence[str]) -> bool:
+        """Verifica se as palavras seguintes, na mesma linha, completam a âncora."""
+        line = self.lines[position]
+        for offset, token in enumerate(tokens[1:], start=1):
+            next_position = position + offset
+            if (next_position >= len(self.words) or self.lines[next_position] != line
+                    or normalize_token(self.words[next_position]["text"]) != token):
+                return False
+        return True
+
+    def _nearest(self, candidates: List[int], near: Tuple[float, float]) -> int:
+        """
+        O candidato mais próximo de 'near'. Os candidatos estão em ordem de
+        leitura, então o 'top' só volta atrás dentro de uma linha (no máximo
+        LINE_TOLERANCE): a busca binária dá o ponto de partida, e a varredura
+        para cada lado para quando nem a tolerância traria um candidato mais perto.
+        """
+        x0, top = near
+        tops = [self.words[p]["top"] for p in candidates]
+        start = bisect_left(tops, top)
+        best, best_distance = None, float("inf")
+        for positions in (range(start, len(candidates)), range(start - 1, -1, -1)):
+            for i in positions:
+                vertical = abs(tops[i] - top)
+                if vertical - LINE_TOLERANCE > best_distance:
+                    break
+                word = self.words[candidates[i]]
+                distance = ((word["x0"] - x0) ** 2 + vertical ** 2) ** 0.5
+                if distance < best_distance or (distance == best_distance and candidates[i] < best):
+                    best, best_distance = candidates[i], distance
+        return best
+
+    def find(self, anchor_text: str, near: Optional[Tuple[float, float]] = None
+             ) -> Optional[Tuple[float, float]]:
+        """
+        Localiza um rótulo na página.
+
+        Args:
+            anchor_text (str): O rótulo (pode ter várias palavras).
+            near (Tuple[float, float], optional): Posição (x0, top) esperada.
+                Quando o rótulo aparece mais de uma vez, vence a ocorrência
+                mais próxima dela; sem ela, vence a primeira em ordem de leitura.
+
+        Returns:
+            Optional[Tuple[float, float]]: O canto (x0, top) do rótulo, ou None.
+        """
+        tokens = [normalize_token(t) for t in anchor_text.split()]
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            return None
+
+        candidates = [p for p in self._by_text.get(tokens[0], [])
+                      if self._matches_at(p, tokens)]
+        if not candidates:
+            return None
+
+        if near is None or len(candidates) == 1:
+            best = candidates[0]
+        else:
+            best = self._nearest(candidates, near)
+
+        word = self.words[best]
+        return word["x0"], word["top"]
+
+
+def resolve_box(params: Dict[str, Any], index: Optional[WordIndex]) -> Tuple[float, ...]:
+    """
+    Calcula a caixa de extração de um campo do layout.
+
+    Se o campo declarar uma âncora e ela for encontrada, a caixa é o 'offset'
+    aplicado à posição da âncora; caso contrário, usa as 'coords' absolutas.
+    """
+    anchor = params.get("anchor")
+    coords = params.get("coords")
+    if anchor and index is not None:
+        offset = anchor["offset"]
+        near = None
+        if coords:
+            # Onde a âncora estava quando o layout foi desenhado
+            near = (coords[0] - offset[0], coords[1] - offset[1])
+        position = index.find(anchor["text"], near=near)
+        if position is not None:
+            x0, top = position
+            return (x0 + offset[0], top + offset[1], x0 + offset[2], top + offset[3])
+    return tuple(coords)
+
+
+def anchor_offset(anchor_position: Tuple[float, float], coords: Sequence[float]) -> List[float]:
+    """Calcula o 'offset' de uma caixa em relação a uma âncora (usado pelo construtor de layouts)."""
+    x0, top = anchor_position
+    return [round(coords[0] - x0, 2), round(coords[1] - top, 2),
+            round(coords[2] - x0, 2), round(coords[3] - top, 2)]
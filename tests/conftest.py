@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# Os geradores de PDFs sintéticos ficam nos scripts de tools/
+sys.path.insert(0, str(ROOT / "tools"))
+
+from src import config, monitoring  # noqa: E402
+
+SAMPLES_DIR = ROOT / "pdf_samples"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--slow", action="store_true",
+                     help="Roda também os testes demorados (marcados com 'slow')")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: teste demorado, só roda com --slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+    skip = pytest.mark.skip(reason="teste demorado: use --slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def samples_dir():
+    """A pasta com as NFS-e de exemplo do repositório."""
+    return SAMPLES_DIR
+
+
+@pytest.fixture
+def dedup_index(tmp_path, monkeypatch):
+    """Índice de duplicatas isolado do histórico real (em data/)."""
+    path = tmp_path / "indice.sqlite"
+    monkeypatch.setattr(config, "DEDUP_INDEX_PATH", path)
+    return path
+
+
+@pytest.fixture
+def monitor():
+    """Monitor sem log de eventos nem métricas em disco."""
+    monitor = monitoring.Monitor(events_path=None, metrics_path=None)
+    yield monitor
+    monitor.close()
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from extraction_api import api  # noqa: E402
+from src import monitoring  # noqa: E402
+
+WORKERS = 3
+
+
+@pytest.fixture
+def pool(monitor, monkeypatch):
+    # start_pool cria o monitor do serviço; aqui, sem log nem métricas em disco
+    monkeypatch.setattr(monitoring, "Monitor", lambda: monitor)
+    monkeypatch.setattr(api, "MONITOR", None)
+    api.start_pool(WORKERS)
+    yield api.POOL
+    api.POOL.shutdown()
+
+
+def test_warm_up_reaches_every_worker(pool):
+    assert len(set(pool.map(api._warm_up, range(WORKERS)))) == WORKERS
+    assert len(pool._processes) == WORKERS
+
+
+def test_extract_uses_the_warm_pool(pool, samples_dir):
+    data = (samples_dir / "nota_goiania.pdf").read_bytes()
+    response = api.app.test_client().post("/extract?layout=prefeitura_go", data=data,
+                                          content_type="application/pdf")
+    assert response.status_code == 200
+    assert response.get_json()["dados"]["cnpj_prestador"] == "53.016.961/0001-50"
@@ -0,0 +1,98 @@
+import sqlite3
+import zipfile
+
+import pytest
+
+from src import config, deduplicator, input_sources, pipeline
+from src.deduplicator import DuplicateIndex
+
+ROLES = {"cnpj_prestador": "cnpj", "numero_nota": "numero", "data_emissao": "data"}
+
+
+def record(name, cnpj="53.016.961/0001-50", number="1", date="10/03/2024"):
+    return {"arquivo_origem": name, "cnpj": cnpj, "numero": number, "data": date}
+
+
+def test_business_key_normalizes_components():
+    assert (deduplicator.business_key(record("a.pdf"), ROLES)
+            == deduplicator.business_key(record("b.pdf", cnpj="53016961000150", number="0001"), ROLES))
+    assert deduplicator.business_key(record("a.pdf", date=""), ROLES) is None
+    assert deduplicator.business_key(record("a.pdf"), {"numero_nota": "numero"}) is None
+
+
+def test_check_record_flags_same_note_in_another_file(tmp_path):
+    index = DuplicateIndex(tmp_path / "indice.sqlite")
+    try:
+        assert index.check_record(record("a.pdf"), ROLES) is None
+        assert index.check_record(record("b.pdf"), ROLES) == "a.pdf"
+        assert index.check_record(record("a.pdf"), ROLES) is None  # O mesmo arquivo de novo
+        assert index.check_record(record("c.pdf", number="2"), ROLES) is None
+    finally:
+        index.close()
+
+
+def test_index_persists_only_after_commit(tmp_path):
+    path = tmp_path / "indice.sqlite"
+    index = DuplicateIndex(path)
+    index.check_content("abc", "a.pdf")
+    index.close()  # Sem commit: execução que falhou antes do relatório
+
+    index = DuplicateIndex(path)
+    assert index.check_content("abc", "b.pdf") is None
+    index.commit()
+    index.close()
+
+    index = DuplicateIndex(path)
+    try:
+        assert index.check_content("abc", "c.pdf") == "b.pdf"
+    finally:
+        index.close()
+
+
+def test_iter_unique_sources_skips_identical_copies(tmp_path):
+    sources = [input_sources.from_bytes(name, data)
+               for name, data in (("a.pdf", b"1"), ("b.pdf", b"2"), ("a - Copia.pdf", b"1"))]
+    duplicates = []
+    index = DuplicateIndex(tmp_path / "indice.sqlite")
+    try:
+        unique = list(deduplicator.iter_unique_sources(sources, index, duplicates))
+    finally:
+        index.close()
+    assert [source.name for source in unique] == ["a.pdf", "b.pdf"]
+    assert [(source.name, original) for source, original in duplicates] == [("a - Copia.pdf", "a.pdf")]
+
+
+def test_iter_unique_sources_passes_unreadable_sources_to_extraction(tmp_path):
+    archive = tmp_path / "lote.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ruim.pdf", b"%PDF-1.4 " + bytes(range(256)) * 400)
+        zf.writestr("boa.pdf", b"%PDF-1.4 boa")
+    # Corrompe os dados comprimidos do primeiro membro
+    data = bytearray(archive.read_bytes())
+    start = data.index(b"ruim.pdf") + len(b"ruim.pdf")
+    data[start + 10:start + 60] = b"\xff" * 50
+    archive.write_bytes(bytes(data))
+
+    sources = input_sources.expand_sources([str(archive)])
+    sources.append(input_sources.PdfSource("sumiu.pdf", path=str(tmp_path / "sumiu.pdf")))
+    index = DuplicateIndex(tmp_path / "indice.sqlite")
+    try:
+        unique = list(deduplicator.iter_unique_sources(sources, index, []))
+    finally:
+        index.close()
+        input_sources.close_zip_handles()
+    assert [source.name for source in unique] == ["lote.zip/ruim.pdf", "lote.zip/boa.pdf", "sumiu.pdf"]
+
+
+def test_index_is_not_committed_when_the_report_fails(tmp_path, samples_dir, dedup_index, monitor):
+    layout = config.load_layout("prefeitura_go")
+    output = tmp_path / "nao_existe" / "relatorio.xlsx"
+    with pytest.raises(OSError):
+        pipeline.run_pipeline([str(samples_dir / "nota_goiania.pdf")], layout, str(output),
+                              max_workers=1, monitor=monitor, prefetch_files=0, schedule="ordem")
+    connection = sqlite3.connect(dedup_index)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM content_hashes").fetchone() == (0,)
+        assert connection.execute("SELECT COUNT(*) FROM business_keys").fetchone() == (0,)
+    finally:
+        connection.close()
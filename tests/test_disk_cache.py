@@ -0,0 +1,31 @@
+import os
+
+from src import disk_cache
+
+
+def make_file(folder, name, size, mtime):
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_removes_least_recently_used_first(tmp_path):
+    old = make_file(tmp_path, "old.png", 400, 1000)
+    used = make_file(tmp_path, "used.png", 400, 2000)
+    new = make_file(tmp_path, "new.png", 400, 3000)
+    disk_cache.touch(used)  # Lido do cache agora
+
+    assert disk_cache.prune(tmp_path, 900) == 400
+    assert not old.exists()
+    assert used.exists() and new.exists()
+
+    assert disk_cache.prune(tmp_path, 400) == 400
+    assert not new.exists() and used.exists()
+
+
+def test_prune_keeps_temporary_files_and_ignores_missing_folder(tmp_path):
+    tmp = make_file(tmp_path, "page.png.123.tmp", 1000, 1000)
+    assert disk_cache.prune(tmp_path, 0) == 0
+    assert tmp.exists()
+    assert disk_cache.prune(tmp_path / "nao_existe", 0) == 0
@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+
+from src import data_parser, document_validator
+from src.document_validator import check_digits_valid, normalize_document, validate_documents
+
+VALID_CNPJ = "11.222.333/0001-81"
+VALID_CPF = "024.677.021-03"
+
+
+def one_by_one(values):
+    """O resultado esperado, valor a valor, pelo caminho de referência."""
+    numbers = [normalize_document(value) if value not in (None, "") else None for value in values]
+    return numbers, [bool(number) and bool(check_digits_valid([number])[0]) for number in numbers]
+
+
+def assert_same_as_one_by_one(values):
+    numbers, valid = validate_documents(values)
+    expected_numbers, expected_valid = one_by_one(values)
+    assert numbers == expected_numbers
+    assert valid.tolist() == expected_valid
+
+
+def test_known_documents():
+    numbers, valid = validate_documents([VALID_CNPJ, "11222333000181", VALID_CPF, "02467702103",
+                                         "11.222.333/0001-82", "000.000.000-00", None, ""])
+    assert numbers == ["11222333000181", "11222333000181", "02467702103", "02467702103",
+                       "11222333000182", "00000000000", None, None]
+    assert valid.tolist() == [True, True, True, True, False, False, False, False]
+
+
+def test_punctuation_outside_the_document_formats_is_not_stripped():
+    values = ["12-345-678-0001-99", "11/222/333/0001/81", "024 677 021 03", "0246.7702.103",
+              "11.222.333/0001-81.", "..11222333000181"]
+    numbers, _ = validate_documents(values)
+    assert numbers[0] is None and data_parser.parse_cnpj(values[0]) is None
+    assert_same_as_one_by_one(values)
+
+
+def test_text_around_the_document_uses_the_regex_path():
+    assert_same_as_one_by_one(["CNPJ: 11.222.333/0001-81", f"CPF {VALID_CPF} (tomador)",
+                               12345678000195, 2467702103, 1.5, True])
+
+
+def test_every_shape_is_accepted_by_the_pattern():
+    for shape in document_validator.DOCUMENT_SHAPES:
+        text = "".join(str(i % 10) if c == "0" else c for i, c in enumerate(str(shape)))
+        assert data_parser.DOCUMENT_PATTERN.fullmatch(text), shape
+
+
+def test_random_values_match_the_one_by_one_path():
+    rng = random.Random(41)
+    alphabet = "0123456789" * 4 + "./- x"
+    values = ["".join(rng.choice(alphabet) for _ in range(rng.randint(10, 19))) for _ in range(5000)]
+    # Documentos bem formados (válidos ou não), com e sem pontuação
+    for _ in range(2000):
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.choice((11, 14))))
+        if len(digits) == 14 and rng.random() < 0.5:
+            digits = f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
+        values.append(digits)
+    rng.shuffle(values)
+    assert_same_as_one_by_one(values)
+
+
+def test_parse_valid_document():
+    assert document_validator.parse_valid_document(f"CNPJ: {VALID_CNPJ}") == "11222333000181"
+    assert document_validator.parse_valid_document("CNPJ: 11.222.333/0001-82") is None
+    assert check_digits_valid(["1122233300018", "abc", None]).tolist() == [False] * 3
+    assert isinstance(validate_documents([])[1], np.ndarray)
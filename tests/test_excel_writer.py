@@ -0,0 +1,99 @@
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from src import excel_writer
+from src.record_store import RecordTable
+
+
+def table(columns, rows):
+    records = RecordTable(columns)
+    for values in rows:
+        records.append(dict(zip(columns, values)))
+    return records
+
+
+def read_sheets(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)]
+                for sheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+@pytest.fixture
+def report(tmp_path):
+    path = tmp_path / "relatorio.xlsx"
+    excel_writer.generate_excel_report(
+        table(["arquivo_origem", "numero", "valor"], [["a.pdf", "1", 10.5], ["b.pdf", "2", 20.0]]),
+        str(path), summaries={"Por prestador": (["prestador", "total"], [["X", 30.5]])})
+    return path
+
+
+def append(path, new_rows, columns=("arquivo_origem", "numero", "valor"), summaries=None):
+    existing = excel_writer.read_report_keys(str(path), ["arquivo_origem"])
+    excel_writer.append_excel_report(table(list(columns), new_rows), str(path), existing,
+                                     summaries=summaries)
+
+
+def test_read_report_keys_reads_only_key_columns(report):
+    existing = excel_writer.read_report_keys(str(report), ["arquivo_origem", "nao_existe"])
+    assert existing == {"header": ["arquivo_origem", "numero", "valor"], "rows": 2,
+                        "keys": {"arquivo_origem": ["a.pdf", "b.pdf"]}}
+
+
+def test_append_adds_rows_after_the_existing_ones(report):
+    append(report, [["c.pdf", "3", 1.25], ["d <&>.pdf", None, 2]])
+    sheets = read_sheets(report)
+    assert sheets["Sheet1"] == [["arquivo_origem", "numero", "valor"], ["a.pdf", "1", 10.5],
+                                ["b.pdf", "2", 20], ["c.pdf", "3", 1.25], ["d <&>.pdf", None, 2]]
+    assert excel_writer.read_report_keys(str(report), ["arquivo_origem"])["rows"] == 4
+
+
+def test_append_adds_new_columns_to_the_header(report):
+    append(report, [["c.pdf", 5.0, "x"]], columns=("arquivo_origem", "valor", "duplicata_de"))
+    rows = read_sheets(report)["Sheet1"]
+    assert rows[0] == ["arquivo_origem", "numero", "valor", "duplicata_de"]
+    assert rows[1] == ["a.pdf", "1", 10.5, None]
+    assert rows[3] == ["c.pdf", None, 5, "x"]
+
+
+def test_append_rewrites_existing_summaries_and_adds_missing_ones(report):
+    append(report, [["c.pdf", "3", 1.0]],
+           summaries={"Por prestador": (["prestador", "total"], [["X", 31.5]]),
+                      "Por mês": (["mes", "total"], [["2024-03", 31.5]])})
+    sheets = read_sheets(report)
+    assert list(sheets) == ["Sheet1", "Por prestador", "Por mês"]
+    assert sheets["Por prestador"] == [["prestador", "total"], ["X", 31.5]]
+    assert sheets["Por mês"] == [["mes", "total"], ["2024-03", 31.5]]
+
+
+def test_append_splices_across_read_chunks(tmp_path):
+    # Relatório maior que o bloco de cópia, para o '</sheetData>' cair em outro bloco
+    path = tmp_path / "grande.xlsx"
+    rows = [[f"nota_{i:06d}.pdf", str(i), i * 1.5] for i in range(30000)]
+    excel_writer.generate_excel_report(table(["arquivo_origem", "numero", "valor"], rows), str(path))
+    with zipfile.ZipFile(path) as archive:
+        assert archive.getinfo("xl/worksheets/sheet1.xml").file_size > 1024 * 1024
+    append(path, [["novo.pdf", "x", 1.0]])
+    data = read_sheets(path)["Sheet1"]
+    assert len(data) == 30002
+    assert data[-2] == rows[-1] and data[-1] == ["novo.pdf", "x", 1]
+
+
+def test_failed_append_leaves_no_temporary_file(report, tmp_path):
+    existing = excel_writer.read_report_keys(str(report), ["arquivo_origem"])
+    broken = tmp_path / "quebrado.xlsx"
+    broken.write_bytes(b"nao e um xlsx")
+    with pytest.raises(zipfile.BadZipFile):
+        excel_writer.append_excel_report(table(["arquivo_origem"], [["c.pdf"]]), str(broken), existing)
+    assert broken.read_bytes() == b"nao e um xlsx"
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_generate_raises_when_the_report_cannot_be_written(tmp_path):
+    with pytest.raises(OSError):
+        excel_writer.generate_excel_report(table(["arquivo_origem"], [["a.pdf"]]),
+                                           str(tmp_path / "nao_existe" / "relatorio.xlsx"))
@@ -0,0 +1,49 @@
+import hashlib
+import io
+import os
+
+from src import config, glyph_cache, pdf_backends
+
+from check_memory import synthetic_layout, synthetic_pdf
+
+
+def cache_size(folder):
+    return sum(path.stat().st_size for path in folder.iterdir())
+
+
+def test_cache_stays_under_the_limit_and_refills_evicted_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHAR_CACHE_DIR", tmp_path / "chars")
+    backend = pdf_backends.BACKENDS["cache"]
+    layout = synthetic_layout(pages=2)
+    documents = [synthetic_pdf(i, pages=2) for i in range(6)]
+    expected = [backend.extract(io.BytesIO(data), layout) for data in documents]
+
+    # Cabem uns dois PDFs; o primeiro foi lido de novo agora e deve ficar
+    per_document = cache_size(config.CHAR_CACHE_DIR) / len(documents)
+    monkeypatch.setattr(config, "CHAR_CACHE_MAX_MB", 2.5 * per_document / (1024 * 1024))
+    for path in config.CHAR_CACHE_DIR.iterdir():
+        os.utime(path, (1000, 1000))
+    assert backend.extract(io.BytesIO(documents[0]), layout) == expected[0]
+
+    assert glyph_cache.prune_cache() > 0
+    assert cache_size(config.CHAR_CACHE_DIR) <= config.CHAR_CACHE_MAX_MB * 1024 * 1024
+    cache = glyph_cache.GlyphCache(config.CHAR_CACHE_DIR)
+    first = hashlib.blake2b(documents[0], digest_size=16).hexdigest()
+    assert cache.load_info(first) is not None and cache.load_page(first, 1) is not None
+
+    # Os PDFs removidos do cache são analisados de novo, com o mesmo resultado
+    for data, result in zip(documents, expected):
+        assert backend.extract(io.BytesIO(data), layout) == result
+
+
+def test_a_removed_page_or_info_file_is_filled_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHAR_CACHE_DIR", tmp_path / "chars")
+    backend = pdf_backends.BACKENDS["cache"]
+    layout = synthetic_layout(pages=2)
+    data = synthetic_pdf(7, pages=2)
+    expected = backend.extract(io.BytesIO(data), layout)
+
+    next(config.CHAR_CACHE_DIR.glob("*_p1.npy")).unlink()
+    assert backend.extract(io.BytesIO(data), layout) == expected
+    next(config.CHAR_CACHE_DIR.glob("*.json")).unlink()
+    assert backend.extract(io.BytesIO(data), layout) == expected
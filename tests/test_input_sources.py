@@ -0,0 +1,63 @@
+import multiprocessing
+import zipfile
+
+import pytest
+
+from src import input_sources
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "lote.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(20):
+            zf.writestr(f"nota_{i:02d}.pdf", (f"%PDF-1.4 nota {i} " * 2000).encode())
+    yield str(path)
+    input_sources.close_zip_handles()
+
+
+def _read_all(sources, queue):
+    try:
+        queue.put([source.read_bytes()[:20] for source in sources for _ in range(3)])
+    except Exception as e:
+        queue.put(repr(e))
+
+
+def test_zip_members_are_read_without_extraction(archive):
+    sources = input_sources.expand_sources([archive])
+    assert [source.name for source in sources][:2] == ["lote.zip/nota_00.pdf", "lote.zip/nota_01.pdf"]
+    assert sources[3].read_bytes().startswith(b"%PDF-1.4 nota 3 ")
+
+
+def test_zip_handle_is_not_shared_with_child_process(archive, monkeypatch):
+    sources = input_sources.expand_sources([archive])
+    sources[0].read_bytes()  # O pai já tem um ZipFile no cache
+    parent_handle = input_sources._get_zip(archive)
+
+    monkeypatch.setattr(input_sources.os, "getpid", lambda: -1)
+    assert input_sources._get_zip(archive) is not parent_handle
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="sem fork nesta plataforma")
+def test_forked_readers_do_not_corrupt_each_other(archive):
+    sources = input_sources.expand_sources([archive])
+    sources[0].read_bytes()
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    children = [context.Process(target=_read_all, args=(sources, queue)) for _ in range(3)]
+    for child in children:
+        child.start()
+    _read_all(sources, queue)
+    results = [queue.get(timeout=60) for _ in range(len(children) + 1)]
+    for child in children:
+        child.join()
+    expected = [(f"%PDF-1.4 nota {i} " * 2).encode()[:20] for i in range(20) for _ in range(3)]
+    assert results == [expected] * len(results)
+
+
+def test_close_zip_handles_closes_this_process_handles(archive):
+    handle = input_sources._get_zip(archive)
+    input_sources.close_zip_handles()
+    assert handle.fp is None
+    assert input_sources._get_zip(archive) is not handle
@@ -0,0 +1,114 @@
+import pytest
+
+from src import config, label_matcher, pdf_backends
+from src.label_matcher import LabelMatcher, fold, is_label_layout
+from src.word_index import WordIndex
+
+LAYOUT = {
+    "numero_nota": {"tipo": "numero", "rotulos": ["Número da Nota", "Nota Nº"]},
+    "data_emissao": {"tipo": "data", "rotulos": ["Data de Emissão"]},
+    "cnpj_prestador": {"tipo": "documento", "secao": "prestador", "rotulos": ["CPF/CNPJ", "CNPJ"]},
+    "cnpj_tomador": {"tipo": "documento", "secao": "tomador", "rotulos": ["CPF/CNPJ", "CNPJ"]},
+    "nome_tomador": {"tipo": "texto", "secao": "tomador", "rotulos": ["Razão Social"]},
+    "valor_servico": {"tipo": "valor", "rotulos": ["Valor do Serviço"]},
+}
+
+
+def page(*lines):
+    """Palavras de uma página: cada linha é uma lista de (x0, texto)."""
+    words = []
+    for number, line in enumerate(lines):
+        top = 50 + number * 20
+        for x0, text in line:
+            words.append({"text": text, "x0": x0, "x1": x0 + 6 * len(text),
+                          "top": top, "bottom": top + 8})
+    return WordIndex(words)
+
+
+def words(x0, text):
+    """Uma sequência de palavras a partir de x0 (como extract_words as separaria)."""
+    result = []
+    for word in text.split():
+        result.append((x0, word))
+        x0 += 6 * len(word) + 4
+    return result
+
+
+def match(*lines, layout=LAYOUT):
+    found = {}
+    LabelMatcher(layout).match_page(page(*lines), found)
+    return found
+
+
+def test_fold_and_label_layout_detection():
+    assert fold("Número da NFS-e Nº") == "numero da nfs-e no"
+    assert is_label_layout(LAYOUT)
+    assert not is_label_layout(config.load_layout("prefeitura_go"))
+    assert not is_label_layout({})
+
+
+def test_value_on_the_same_line():
+    found = match(words(40, "Número da Nota: 1234 Data de Emissão: 10/03/2024"),
+                  words(40, "Valor do Serviço R$ 1.500,00"))
+    assert found["numero_nota"] == ("1234", 1.0)
+    assert found["data_emissao"] == ("10/03/2024", 1.0)
+    assert found["valor_servico"] == ("1.500,00", 1.0)
+
+
+def test_value_below_the_label_in_its_column():
+    found = match(words(40, "Número da Nota") + words(300, "Data de Emissão"),
+                  [(40, "987"), (300, "05/01/2025")])
+    assert found["numero_nota"] == ("987", 0.8)
+    assert found["data_emissao"] == ("05/01/2025", 0.8)
+
+
+def test_sections_separate_provider_and_client_documents():
+    found = match(words(40, "Dados do Prestador"),
+                  words(40, "CPF/CNPJ: 11.222.333/0001-81"),
+                  words(40, "Dados do Tomador"),
+                  words(40, "CPF/CNPJ: 024.677.021-03"),
+                  words(40, "Razão Social: MARIA DA SILVA"))
+    assert found["cnpj_prestador"] == ("11.222.333/0001-81", 1.0)
+    assert found["cnpj_tomador"] == ("024.677.021-03", 1.0)
+    assert found["nome_tomador"] == ("MARIA DA SILVA", 0.8)
+
+
+def test_longer_ignored_labels_win_over_known_ones():
+    found = match(words(40, "Data de Emissão do RPS: 01/01/2020"),
+                  words(40, "Data de Emissão: 02/02/2024"))
+    assert found["data_emissao"] == ("02/02/2024", 1.0)
+
+
+def test_confidence_drops_for_later_labels_and_invalid_documents():
+    found = match(words(40, "Nota Nº 55"), words(40, "Dados do Prestador"),
+                  words(40, "CNPJ 11.222.333/0001-82"))
+    assert found["numero_nota"] == ("55", 0.95)
+    value, confidence = found["cnpj_prestador"]
+    assert value == "11.222.333/0001-82"
+    assert confidence == pytest.approx((1.0 - 0.05) * 0.5, abs=0.01)
+
+
+def test_more_confident_value_replaces_an_earlier_one():
+    matcher = LabelMatcher(LAYOUT)
+    found = {}
+    section = matcher.match_page(page(words(40, "Nota Nº 1"), words(40, "Dados do Tomador")), found)
+    assert section == "tomador"  # Continua na página seguinte
+    matcher.match_page(page(words(40, "Número da Nota: 2")), found, section)
+    assert found["numero_nota"] == ("2", 1.0)
+    assert not matcher.complete(found)
+
+
+def test_get_matcher_compiles_each_layout_once():
+    assert label_matcher.get_matcher(dict(LAYOUT)) is label_matcher.get_matcher(LAYOUT)
+
+
+@pytest.mark.parametrize("sample", ["nota_goiania.pdf", "nota_goiania - Copia.pdf"])
+def test_label_backend_on_a_sample(samples_dir, sample):
+    layout_map = config.load_layout("automatico")
+    values, pages = pdf_backends.backend_for(layout_map).extract(str(samples_dir / sample), layout_map)
+    assert pages == 1
+    assert values["numero_nota"] == "1"
+    assert values["cnpj_prestador"] == "53.016.961/0001-50"
+    assert values["cnpj_tomador"] == "024.677.021-03"
+    assert values["valor_servico"] == "15.311,55"
+    assert values[label_matcher.confidence_column("cnpj_prestador")] == 1.0
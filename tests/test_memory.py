@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+CHECK_MEMORY = Path(__file__).resolve().parent.parent / "tools" / "check_memory.py"
+
+pytest.importorskip("resource", reason="a medição de RSS requer um sistema Unix")
+
+
+def check_memory(*args, timeout):
+    result = subprocess.run([sys.executable, str(CHECK_MEMORY), *args],
+                            capture_output=True, text=True, timeout=timeout)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_batch_peak_rss_stays_bounded_while_recycling():
+    # Versão reduzida: poucos arquivos, mas com a reciclagem dos processos
+    # acontecendo várias vezes durante o lote. Não prova o limite num lote
+    # grande; para isso, ver o teste abaixo
+    output = check_memory("--files", "80", "--workers", "2", "--max-tasks", "20",
+                          "--limit-mb", "150", timeout=600)
+    assert "Arquivos: 80 (0 com erro)" in output
+
+
+@pytest.mark.slow
+def test_batch_peak_rss_stays_bounded_over_thousands_of_files():
+    # O lote completo de tools/check_memory.py, com a reciclagem padrão
+    output = check_memory("--files", "3000", "--workers", "2", timeout=3600)
+    assert "Arquivos: 3000 (0 com erro)" in output
@@ -0,0 +1,81 @@
+import csv
+import json
+import sqlite3
+
+from openpyxl import load_workbook
+
+from src import config, output_sinks
+
+COLUMNS = ["arquivo_origem", "numero_nota", "valor_servico", "duplicata_de"]
+RECORDS = [{"arquivo_origem": f"nota_{i:03d}.pdf", "numero_nota": i,
+            "valor_servico": i * 1.5, "duplicata_de": ""} for i in range(300)]
+SUMMARIES = {"Resumo": (["prestador", "notas"], [["53.016.961/0001-50", 300]])}
+
+
+def send(paths, queue_size=16):
+    fanout = output_sinks.FanOut([str(path) for path in paths], COLUMNS, queue_size=queue_size)
+    for record in RECORDS:
+        fanout.write(record)
+    return fanout.close(SUMMARIES)
+
+
+def sheet_rows(workbook, name):
+    return [list(row) for row in workbook[name].iter_rows(values_only=True)]
+
+
+def test_every_format_gets_every_record_in_order(tmp_path):
+    assert send([tmp_path / name for name in ("n.csv", "n.jsonl", "n.sqlite", "n.xlsx")]) == {}
+    names = [record["arquivo_origem"] for record in RECORDS]
+
+    with open(tmp_path / "n.csv", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=config.CSV_DELIMITER))
+    assert [row["arquivo_origem"] for row in rows] == names
+    assert rows[1]["valor_servico"] == "1,5"
+    with open(tmp_path / "n.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == RECORDS
+    connection = sqlite3.connect(tmp_path / "n.sqlite")
+    try:
+        assert [row[0] for row in connection.execute("SELECT arquivo_origem FROM notas")] == names
+    finally:
+        connection.close()
+
+
+def test_excel_sink_writes_records_and_summaries(tmp_path):
+    assert send([tmp_path / "n.xlsx"]) == {}
+    workbook = load_workbook(tmp_path / "n.xlsx", read_only=True)
+    try:
+        assert workbook.sheetnames == [output_sinks.EXCEL_SHEET_NAME, "Resumo"]
+        rows = sheet_rows(workbook, output_sinks.EXCEL_SHEET_NAME)
+        assert rows[0] == COLUMNS
+        assert rows[1:] == [[r["arquivo_origem"], r["numero_nota"], r["valor_servico"], None]
+                            for r in RECORDS]
+        assert sheet_rows(workbook, "Resumo") == [["prestador", "notas"], ["53.016.961/0001-50", 300]]
+    finally:
+        workbook.close()
+
+
+def test_a_failing_sink_is_reported_and_the_others_finish(tmp_path):
+    missing = tmp_path / "nao_existe" / "n.xlsx"
+    failed = send([missing, tmp_path / "n.jsonl"], queue_size=4)
+    assert list(failed) == [str(missing)]
+    assert failed[str(missing)].startswith("FileNotFoundError")
+    with open(tmp_path / "n.jsonl", encoding="utf-8") as f:
+        assert sum(1 for _ in f) == len(RECORDS)
+
+
+class FailingOnClose:
+    def __init__(self, path, columns):
+        pass
+
+    def write(self, record):
+        pass
+
+    def close(self, summaries=None):
+        raise OSError("disco cheio (simulado)")
+
+
+def test_a_sink_failing_on_close_does_not_hang_the_run(tmp_path, monkeypatch):
+    monkeypatch.setitem(output_sinks.SINK_TYPES, ".falha", FailingOnClose)
+    failed = send([tmp_path / "n.falha", tmp_path / "n.xlsx"], queue_size=4)
+    assert failed == {str(tmp_path / "n.falha"): "OSError: disco cheio (simulado)"}
+    assert (tmp_path / "n.xlsx").exists()
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from src import config, input_sources, label_matcher, pdf_backends
+
+from check_backends import anchored_variant
+from check_memory import synthetic_layout, synthetic_pdf
+
+SAMPLES = sorted(path for path in config.PDF_SAMPLES_DIR.iterdir()
+                 if input_sources.is_supported_file(path.name))
+LAYOUTS = [path.stem for path in sorted(config.LAYOUTS_DIR.glob("*.json"))
+           if not label_matcher.is_label_layout(config.load_layout(path.stem))]
+
+
+@pytest.fixture(autouse=True)
+def char_cache(tmp_path, monkeypatch):
+    """O motor "cache" grava numa pasta temporária, e não em data/cache."""
+    monkeypatch.setattr(config, "CHAR_CACHE_DIR", tmp_path / "chars")
+
+
+def extract_all(data, layout_map):
+    """Resultado (ou erro) de cada motor; o "cache" roda duas vezes: preenchendo e lendo."""
+    results = {}
+    runs = [(name, backend) for name, backend in pdf_backends.BACKENDS.items()]
+    runs.append(("cache (do disco)", pdf_backends.BACKENDS["cache"]))
+    for name, backend in runs:
+        try:
+            results[name] = backend.extract(io.BytesIO(data), layout_map)
+        except Exception as e:
+            results[name] = type(e).__name__
+    return results
+
+
+def assert_same_output(data, layout_map):
+    results = extract_all(data, layout_map)
+    reference = results.pop("pdfplumber")
+    for name, result in results.items():
+        assert result == reference, name
+
+
+@pytest.mark.parametrize("layout_name", LAYOUTS)
+@pytest.mark.parametrize("sample", SAMPLES, ids=[path.name for path in SAMPLES])
+def test_backends_agree_on_samples(sample, layout_name):
+    data = sample.read_bytes()
+    layout_map = config.load_layout(layout_name)
+    assert_same_output(data, layout_map)
+    anchored = anchored_variant(layout_map, data)
+    if anchored:
+        assert_same_output(data, anchored)
+
+
+@pytest.mark.parametrize("number", range(3))
+def test_backends_agree_on_synthetic_pdfs(number):
+    data = synthetic_pdf(number)
+    assert_same_output(data, synthetic_layout())
+    assert_same_output(data, anchored_variant(synthetic_layout(), data))
+
+
+def test_backends_agree_on_missing_pages():
+    data = synthetic_pdf(0, pages=1)
+    results = extract_all(data, synthetic_layout(pages=2))
+    assert set(results.values()) == {"IndexError"}
+
+
+def test_get_backend_rejects_unknown_names():
+    assert pdf_backends.get_backend() is pdf_backends.BACKENDS[config.EXTRACTION_BACKEND]
+    with pytest.raises(ValueError):
+        pdf_backends.get_backend("nao_existe")
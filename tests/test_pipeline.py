@@ -0,0 +1,128 @@
+import zipfile
+
+from openpyxl import load_workbook
+
+import pytest
+
+from src import config, deduplicator, input_sources, pipeline
+
+from check_memory import synthetic_layout, synthetic_pdf
+
+FILES = 20
+WINDOW = 4
+
+
+@pytest.fixture
+def batch(tmp_path):
+    """PDFs de tamanhos variados, com uma cópia idêntica e um arquivo inválido."""
+    paths = []
+    for i in range(FILES):
+        path = tmp_path / f"nota_{i:02d}.pdf"
+        path.write_bytes(synthetic_pdf(i, pages=1 + (i * 7) % 4))
+        paths.append(str(path))
+    (tmp_path / "nota_05 - Copia.pdf").write_bytes((tmp_path / "nota_05.pdf").read_bytes())
+    paths.insert(9, str(tmp_path / "nota_05 - Copia.pdf"))
+    (tmp_path / "quebrada.pdf").write_bytes(b"nao e um PDF")
+    paths.insert(3, str(tmp_path / "quebrada.pdf"))
+    return paths
+
+
+def report_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return [row for row in workbook.worksheets[0].iter_rows(min_row=2, values_only=True)]
+    finally:
+        workbook.close()
+
+
+def run(paths, output, monitor, schedule, **kwargs):
+    return pipeline.run_pipeline(paths, synthetic_layout(pages=1), str(output), max_workers=1,
+                                 monitor=monitor, schedule=schedule, **kwargs)
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_schedules_write_the_same_report_in_input_order(batch, tmp_path, dedup_index, monitor,
+                                                        monkeypatch, prefetch):
+    monkeypatch.setattr(config, "SCHEDULE_WINDOW", WINDOW)
+    reports = {}
+    for schedule in ("ordem", "maiores_primeiro"):
+        dedup_index.unlink(missing_ok=True)
+        output = tmp_path / f"{schedule}.xlsx"
+        summary = run(batch, output, monitor, schedule, prefetch_files=prefetch)
+        assert (summary["notas"], summary["falhas"], summary["duplicatas"]) == (FILES + 1, 1, 1)
+        reports[schedule] = report_rows(output)
+    assert reports["maiores_primeiro"] == reports["ordem"]
+    names = [row[0] for row in reports["ordem"]]
+    expected = [input_sources.expand_sources([path])[0].name for path in batch]
+    expected.remove("quebrada.pdf")
+    assert names == expected  # Cópias idênticas na posição delas
+    copy = reports["ordem"][names.index("nota_05 - Copia.pdf")]
+    assert copy[0] == "nota_05 - Copia.pdf" and copy[-1] == "nota_05.pdf"
+
+
+def test_reordered_notes_are_released_within_a_window(batch, tmp_path, dedup_index, monitor,
+                                                      monkeypatch):
+    monkeypatch.setattr(config, "SCHEDULE_WINDOW", WINDOW)
+    arrived, held = [0], []
+
+    class CountingIndex(deduplicator.DuplicateIndex):
+        def check_record(self, record, roles):
+            held.append(arrived[0] - len(held) - 1)  # Notas que chegaram e ainda esperam
+            return super().check_record(record, roles)
+
+    def on_status(message):
+        if message.startswith("Processando:"):
+            arrived[0] += 1
+
+    monkeypatch.setattr(deduplicator, "DuplicateIndex", CountingIndex)
+    run(batch, tmp_path / "relatorio.xlsx", monitor, "maiores_primeiro", on_status=on_status,
+        prefetch_files=0)
+    assert len(held) == FILES
+    # A falha (que não chega a check_record) conta como uma nota esperando
+    assert max(held) <= WINDOW
+
+
+def corrupt_archive(folder, good=3):
+    """ZIP com alguns PDFs sintéticos e um membro com os dados comprimidos corrompidos."""
+    archive = folder / "lote.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ruim.pdf", synthetic_pdf(99, pages=1))
+        for i in range(good):
+            zf.writestr(f"nota_{i}.pdf", synthetic_pdf(i, pages=1))
+    data = bytearray(archive.read_bytes())
+    start = data.index(b"ruim.pdf") + len(b"ruim.pdf")
+    data[start + 10:start + 60] = b"\xff" * 50
+    archive.write_bytes(bytes(data))
+    return archive
+
+
+def test_corrupt_zip_member_is_a_failure_with_prefetch_on(tmp_path, dedup_index, monitor):
+    archive = corrupt_archive(tmp_path)
+    summary = run([str(archive)], tmp_path / "relatorio.xlsx", monitor, "ordem", prefetch_files=4)
+    assert (summary["notas"], summary["falhas"]) == (3, 1)
+    assert [row[0] for row in report_rows(tmp_path / "relatorio.xlsx")] == [
+        f"lote.zip/nota_{i}.pdf" for i in range(3)]
+
+
+@pytest.mark.parametrize("schedule", ["ordem", "maiores_primeiro"])
+@pytest.mark.parametrize("mode", ["flag", "collapse"])
+def test_identical_copies_keep_their_input_position(tmp_path, dedup_index, monitor, monkeypatch,
+                                                    schedule, mode):
+    monkeypatch.setattr(config, "SCHEDULE_WINDOW", WINDOW)
+    monkeypatch.setattr(config, "DEDUP_MODE", mode)
+    names = ["a", "a - Copia", "a - Copia (2)", "b", "c", "d", "e", "b - Copia"]
+    for name in names:
+        number = "abcde".index(name[0])
+        (tmp_path / f"{name}.pdf").write_bytes(synthetic_pdf(number, pages=1 + number % 3))
+    paths = [str(tmp_path / f"{name}.pdf") for name in names]
+
+    output = tmp_path / "relatorio.xlsx"
+    summary = run(paths, output, monitor, schedule, prefetch_files=2)
+    assert summary["duplicatas"] == 3
+    # Uma célula vazia volta do Excel como None
+    rows = [(row[0], row[-1]) for row in report_rows(output)]
+    if mode == "collapse":
+        assert rows == [(f"{name}.pdf", None) for name in "abcde"]
+    else:
+        assert rows == [(f"{name}.pdf", f"{name[0]}.pdf" if "Copia" in name else None)
+                        for name in names]
@@ -0,0 +1,126 @@
+import gzip
+import sqlite3
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from src import config, pipeline, sharding
+
+from check_memory import synthetic_layout, synthetic_pdf
+
+SHARDS = 3
+
+
+def report_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return [row for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+@pytest.fixture
+def batch(tmp_path):
+    folder = tmp_path / "notas"
+    folder.mkdir()
+    paths = []
+    for i in range(12):
+        path = folder / f"nota_{i:02d}.pdf"
+        path.write_bytes(synthetic_pdf(i, pages=1))
+        paths.append(str(path))
+    (folder / "nota_03 - Copia.pdf").write_bytes((folder / "nota_03.pdf").read_bytes())
+    (folder / "quebrada.pdf").write_bytes(b"nao e um PDF")
+    paths[6:6] = [str(folder / "nota_03 - Copia.pdf"), str(folder / "quebrada.pdf")]
+    return paths
+
+
+@pytest.fixture
+def partials(batch, tmp_path):
+    manifest = tmp_path / "manifesto.json"
+    plan = sharding.plan_shards(batch, SHARDS, manifest)
+    assert plan["arquivos"] == len(batch)
+    layout = synthetic_layout(pages=1)
+    paths = [sharding.run_shard(manifest, shard, layout, tmp_path / "parciais", max_workers=1)
+             for shard in range(SHARDS)]
+    return manifest, paths
+
+
+def test_merge_matches_a_single_run(batch, partials, tmp_path, dedup_index, monitor):
+    manifest, paths = partials
+    merged = sharding.merge_partials(manifest, list(reversed(paths)), str(tmp_path / "partes.xlsx"))
+
+    dedup_index.unlink()
+    single = pipeline.run_pipeline(batch, synthetic_layout(pages=1), str(tmp_path / "unico.xlsx"),
+                                   max_workers=1, monitor=monitor)
+    assert {key: single[key] for key in merged} == merged == {"notas": 13, "falhas": 1, "duplicatas": 1}
+    assert report_rows(tmp_path / "partes.xlsx") == report_rows(tmp_path / "unico.xlsx")
+
+
+def test_partial_lines_are_read_in_manifest_order(partials):
+    _, paths = partials
+    for path in paths:
+        header = sharding.read_partial_header(path)
+        positions = [line["posicao"] for line in sharding.iter_partial(path, header)]
+        assert positions == sorted(positions) and len(positions) == header["arquivos"]
+
+
+def test_merge_rejects_missing_or_repeated_parts(partials, tmp_path, dedup_index):
+    manifest, paths = partials
+    with pytest.raises(ValueError, match="Faltam"):
+        sharding.merge_partials(manifest, paths[1:], str(tmp_path / "r.xlsx"))
+    with pytest.raises(ValueError, match="mais de uma vez"):
+        sharding.merge_partials(manifest, paths + paths[:1], str(tmp_path / "r.xlsx"))
+
+
+def test_incomplete_partial_is_rejected_without_touching_the_index(partials, tmp_path, dedup_index):
+    manifest, paths = partials
+    with gzip.open(paths[0], "rt", encoding="utf-8") as f:
+        lines = f.readlines()
+    with gzip.open(paths[0], "wt", encoding="utf-8") as f:
+        f.writelines(lines[:-2] + lines[-1:])  # Uma nota a menos que o rodapé diz
+    with pytest.raises(ValueError, match="incompleto"):
+        sharding.merge_partials(manifest, paths, str(tmp_path / "r.xlsx"))
+    assert not (tmp_path / "r.xlsx").exists()
+    connection = sqlite3.connect(config.DEDUP_INDEX_PATH)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM content_hashes").fetchone() == (0,)
+    finally:
+        connection.close()
+
+
+def test_unreadable_zip_member_is_recorded_as_a_failure(tmp_path, dedup_index):
+    archive = tmp_path / "lote.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ruim.pdf", synthetic_pdf(99, pages=1))
+        for i in range(3):
+            zf.writestr(f"nota_{i}.pdf", synthetic_pdf(i, pages=1))
+    data = bytearray(archive.read_bytes())
+    start = data.index(b"ruim.pdf") + len(b"ruim.pdf")
+    data[start + 10:start + 60] = b"\xff" * 50  # Corrompe os dados comprimidos
+    archive.write_bytes(bytes(data))
+
+    manifest = tmp_path / "manifesto.json"
+    sharding.plan_shards([str(archive)], 1, manifest)
+    path = sharding.run_shard(manifest, 0, synthetic_layout(pages=1), tmp_path, max_workers=1)
+    lines = list(sharding.iter_partial(path, sharding.read_partial_header(path)))
+    assert [(line["arquivo"], line["erro"] is not None, line["hash"] is None) for line in lines] == [
+        ("lote.zip/ruim.pdf", True, True)] + [(f"lote.zip/nota_{i}.pdf", False, False)
+                                              for i in range(3)]
+    summary = sharding.merge_partials(manifest, [path], str(tmp_path / "r.xlsx"))
+    assert (summary["notas"], summary["falhas"]) == (3, 1)
+
+
+def test_failed_shard_leaves_no_temporary_partial(batch, tmp_path, monkeypatch):
+    manifest = tmp_path / "manifesto.json"
+    sharding.plan_shards(batch, 1, manifest)
+
+    def broken_batch(*args, **kwargs):
+        yield from ()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(sharding.batch_processor, "run_batch", broken_batch)
+    with pytest.raises(KeyboardInterrupt):
+        sharding.run_shard(manifest, 0, synthetic_layout(pages=1), tmp_path / "parciais",
+                           max_workers=1)
+    assert list((tmp_path / "parciais").iterdir()) == []
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import input_sources, streaming
+
+from check_memory import synthetic_layout, synthetic_pdf
+
+COUNT = 24
+BROKEN = 7
+LAYOUT = synthetic_layout(pages=1)
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Pool de threads que conta as extrações enviadas, iniciadas e canceladas."""
+
+    def __init__(self, workers, delay=0.0):
+        super().__init__(max_workers=workers)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.submitted = []
+        self.started = 0
+
+    def submit(self, fn, *args, **kwargs):
+        def run():
+            with self.lock:
+                self.started += 1
+            time.sleep(self.delay)
+            return fn(*args, **kwargs)
+        future = super().submit(run)
+        self.submitted.append(future)
+        return future
+
+    def cancelled(self):
+        return sum(future.cancelled() for future in self.submitted)
+
+
+@pytest.fixture
+def sources():
+    items = [input_sources.from_bytes(f"nota_{i:03d}.pdf", synthetic_pdf(i, pages=1))
+             for i in range(COUNT)]
+    items[BROKEN] = input_sources.from_bytes(f"nota_{BROKEN:03d}.pdf", b"nao e um PDF")
+    return items
+
+
+def counted(items, reads):
+    for item in items:
+        reads.append(item.name)
+        yield item
+
+
+def test_results_follow_source_order_with_typed_errors(sources):
+    async def consume():
+        return [result async for result in streaming.extract_stream(sources, LAYOUT, concurrency=2)]
+
+    results = asyncio.run(consume())
+    assert [result.name for result in results] == [source.name for source in sources]
+    broken = results.pop(BROKEN)
+    assert not broken.ok and broken.record is None and broken.error is not None
+    assert all(result.ok and result.error is None for result in results)
+
+
+@pytest.mark.parametrize("queue_size", [1, 4])
+def test_slow_consumer_caps_the_work_in_flight(sources, queue_size):
+    reads = []
+    executor = CountingExecutor(2)
+    ahead = []
+
+    async def consume():
+        consumed = 0
+        async for _ in streaming.extract_stream(counted(sources, reads), LAYOUT,
+                                                queue_size=queue_size, executor=executor):
+            consumed += 1
+            # Enviadas aos processos e ainda não entregues a quem consome
+            ahead.append(len(executor.submitted) - consumed)
+            await asyncio.sleep(0.005)
+
+    try:
+        asyncio.run(consume())
+    finally:
+        executor.shutdown()
+    assert len(reads) == len(executor.submitted) == COUNT
+    # A fila, mais a fonte que espera uma vaga nela
+    assert max(ahead) <= queue_size + 1
+
+
+def test_aclose_stops_reading_and_cancels_pending_extractions(sources):
+    reads = []
+    executor = CountingExecutor(1, delay=0.02)
+
+    async def consume():
+        stream = streaming.extract_stream(counted(sources, reads), LAYOUT,
+                                          queue_size=4, executor=executor)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    try:
+        first = asyncio.run(consume())
+    finally:
+        executor.shutdown(wait=True)
+    assert first.name == sources[0].name
+    assert len(reads) < COUNT
+    assert executor.cancelled() > 0
+    # Nada começou depois do aclose além do que já estava em andamento
+    assert executor.started + executor.cancelled() == len(executor.submitted)
+
+
+def test_cancelling_the_consumer_task_cancels_the_stream(sources):
+    reads = []
+    executor = CountingExecutor(1, delay=0.02)
+    consumed = []
+
+    async def consume():
+        async for result in streaming.extract_stream(counted(sources, reads), LAYOUT,
+                                                     queue_size=4, executor=executor):
+            consumed.append(result.name)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while len(consumed) < 2:
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+    assert len(reads) < COUNT
+    assert executor.cancelled() > 0
+    assert executor.started + executor.cancelled() == len(executor.submitted)
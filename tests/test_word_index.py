@@ -0,0 +1,52 @@
+import random
+
+from src.word_index import LINE_TOLERANCE, WordIndex, resolve_box
+
+
+def word(text, x0, top):
+    return {"text": text, "x0": x0, "x1": x0 + 20, "top": top, "bottom": top + 8}
+
+
+def brute_force(index, anchor, near):
+    positions = [p for p, w in enumerate(index.words) if w["text"] == anchor]
+    best = min(positions, key=lambda p: ((index.words[p]["x0"] - near[0]) ** 2
+                                         + (index.words[p]["top"] - near[1]) ** 2, p))
+    return index.words[best]["x0"], index.words[best]["top"]
+
+
+def test_find_without_near_returns_first_in_reading_order():
+    index = WordIndex([word("Valor", 300, 50), word("Valor", 10, 51), word("Valor", 10, 10)])
+    assert index.find("valor:") == (10, 10)
+
+
+def test_find_multi_word_anchor_stays_on_one_line():
+    index = WordIndex([word("CPF/CNPJ", 10, 100), word("Tomador", 10, 120),
+                       word("CPF/CNPJ", 10, 200), word("Tomador", 60, 200)])
+    assert index.find("CPF/CNPJ Tomador") == (10, 200)
+
+
+def test_find_near_checks_every_candidate_on_the_line():
+    # Seis ocorrências na mesma linha: a mais próxima fica longe da busca binária
+    words = [word("Total", x0, 100 + (x0 % 3) * 0.5) for x0 in range(10, 600, 100)]
+    index = WordIndex(words)
+    assert index.find("Total", near=(505, 100)) == brute_force(index, "Total", (505, 100))
+    assert index.find("Total", near=(505, 100))[0] == 510
+
+
+def test_find_near_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        words = [word(rng.choice(["Data", "Valor"]), rng.uniform(0, 500),
+                      rng.choice([50, 80, 120]) + rng.uniform(0, LINE_TOLERANCE))
+                 for _ in range(rng.randint(2, 30))]
+        index = WordIndex(words)
+        near = (rng.uniform(0, 500), rng.uniform(0, 200))
+        if sum(w["text"] == "Data" for w in words) > 1:
+            assert index.find("Data", near=near) == brute_force(index, "Data", near)
+
+
+def test_resolve_box_follows_the_anchor():
+    index = WordIndex([word("Número", 110, 52)])
+    params = {"coords": [140, 50, 200, 58], "anchor": {"text": "Número", "offset": [40, 0, 100, 8]}}
+    assert resolve_box(params, index) == (150, 52, 210, 60)
+    assert resolve_box(params, WordIndex([])) == (140, 50, 200, 58)
@@ -0,0 +1,89 @@
+"""
+Benchmark de Memória dos Registros em Lote
+
+Compara quantos bytes por nota ocupam os resultados de um lote guardados
+como lista de dicionários (formato antigo do Worker) e como RecordTable.
+
+Os registros são sintéticos, no formato do layout informado, imitando um
+lote real: poucos prestadores e tomadores se repetindo, números e valores
+variando a cada nota.
+
+Uso: python tools/bench_records.py [numero_de_notas] [layout]
+"""
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import config, field_roles  # noqa: E402
+from src.record_store import RecordTable  # noqa: E402
+
+
+def _fresh(text: str) -> str:
+    """Cópia nova do texto, como acontece com cada valor lido de um PDF."""
+    return (text + " ")[:-1]
+
+
+def synthetic_records(count: int, layout_map: dict):
+    """Gera registros limpos no formato produzido pelo processamento em lote."""
+    rng = random.Random(42)
+    roles = {field: role for role, field in field_roles.resolve_roles(layout_map).items()}
+    prestadores = [(f"{rng.randrange(10**13, 10**14)}", f"Prestador {i} Ltda") for i in range(20)]
+    tomadores = [(f"{rng.randrange(10**10, 10**11)}", f"TOMADOR {i} DA SILVA") for i in range(500)]
+
+    for i in range(count):
+        cnpj_prestador, nome_prestador = rng.choice(prestadores)
+        cnpj_tomador, nome_tomador = rng.choice(tomadores)
+        generated = {
+            "cnpj_prestador": cnpj_prestador,
+            "nome_prestador": nome_prestador,
+            "cnpj_tomador": cnpj_tomador,
+            "nome_tomador": nome_tomador,
+            "numero_nota": str(i + 1),
+            "data_emissao": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "valor_servico": f"{rng.randint(100, 99999)},{rng.randint(0, 99):02d}",
+        }
+        record = {"arquivo_origem": f"nota_{i:06d}.pdf"}
+        for field in layout_map:
+            role = roles.get(field)
+            record[field] = _fresh(generated[role] if role else f"Serviço prestado conforme contrato {i % 50}")
+        yield record
+
+
+def measure(build, count: int) -> int:
+    """Retorna os bytes alocados (e mantidos) pela estrutura construída."""
+    tracemalloc.start()
+    structure = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(structure) == count
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    layout_name = sys.argv[2] if len(sys.argv) > 2 else "prefeitura_sp"
+    layout_map = config.load_layout(layout_name)
+
+    def build_dicts():
+        return list(synthetic_records(count, layout_map))
+
+    def build_table():
+        table = RecordTable.from_layout(layout_map)
+        for record in synthetic_records(count, layout_map):
+            table.append(record)
+        return table
+
+    dict_bytes = measure(build_dicts, count)
+    table_bytes = measure(build_table, count)
+
+    print(f"Notas: {count} | Layout: {layout_name} ({len(layout_map)} campos)")
+    print(f"Lista de dicionários: {dict_bytes / count:8.1f} bytes/nota")
+    print(f"RecordTable:          {table_bytes / count:8.1f} bytes/nota")
+    print(f"Redução:              {1 - table_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
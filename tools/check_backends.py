@@ -0,0 +1,130 @@
+"""
+Teste de Conformidade dos Motores de Extração
+
+Aplica cada layout a cada PDF de amostra com todos os motores de
+src/pdf_backends.py e verifica se o texto de todos os campos é idêntico ao
+do motor de referência (pdfplumber). Mostra também o tempo médio por PDF de
+cada motor.
+
+Além dos layouts como estão, testa uma variante de cada um com âncoras
+(cada campo ancorado na palavra mais próxima do seu canto superior
+esquerdo), para cobrir os dois caminhos de extração. Opcionalmente, inclui
+PDFs sintéticos gerados por tools/check_memory.py.
+
+Termina com código 1 se algum campo divergir.
+
+Uso: python tools/check_backends.py [pasta_de_amostras] [--layouts a b ...]
+                                    [--synthetic N]
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import pdfplumber
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import config, input_sources, label_matcher, pdf_backends  # noqa: E402
+from src.word_index import anchor_offset, normalize_token  # noqa: E402
+
+from check_memory import synthetic_layout, synthetic_pdf  # noqa: E402
+
+REFERENCE = "pdfplumber"
+
+
+def anchored_variant(layout_map: dict, pdf_bytes: bytes) -> dict:
+    """Cópia do layout com cada campo ancorado na palavra mais próxima do seu canto."""
+    variant = {}
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        words_by_page = {}
+        for field_name, params in layout_map.items():
+            page_num = params["page"]
+            if page_num >= len(pdf.pages):
+                return {}
+            if page_num not in words_by_page:
+                words_by_page[page_num] = [w for w in pdf.pages[page_num].extract_words()
+                                           if normalize_token(w["text"])]
+            words = words_by_page[page_num]
+            coords = params["coords"]
+            variant[field_name] = dict(params)
+            if not words:
+                continue
+            word = min(words, key=lambda w: (w["x0"] - coords[0]) ** 2 + (w["top"] - coords[1]) ** 2)
+            variant[field_name]["anchor"] = {"text": word["text"],
+                                             "offset": anchor_offset((word["x0"], word["top"]), coords)}
+    return variant
+
+
+def compare(label: str, pdf_bytes: bytes, layout_map: dict, timings: dict) -> int:
+    """Compara os motores num PDF. Retorna o número de campos divergentes."""
+    results = {}
+    for name, backend in pdf_backends.BACKENDS.items():
+        started = time.perf_counter()
+        try:
+            results[name] = backend.extract(io.BytesIO(pdf_bytes), layout_map)
+        except Exception as e:
+            results[name] = f"{type(e).__name__}: {e}"
+        timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    reference = results[REFERENCE]
+    mismatches = 0
+    for name, result in results.items():
+        if name == REFERENCE or result == reference:
+            continue
+        if isinstance(result, str) or isinstance(reference, str):
+            print(f"DIVERGE [{name}] {label}: {result!r} x referência {reference!r}")
+            mismatches += 1
+            continue
+        for field_name, text in result[0].items():
+            if text != reference[0].get(field_name):
+                print(f"DIVERGE [{name}] {label} / {field_name}: {text!r} x {reference[0].get(field_name)!r}")
+                mismatches += 1
+        if result[1] != reference[1]:
+            print(f"DIVERGE [{name}] {label}: {result[1]} página(s) x {reference[1]}")
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores de extração")
+    parser.add_argument("folder", nargs="?", default=str(config.PDF_SAMPLES_DIR))
+    parser.add_argument("--layouts", nargs="*",
+                        default=[path.stem for path in sorted(config.LAYOUTS_DIR.glob("*.json"))])
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="PDFs sintéticos a incluir (com um layout próprio)")
+    args = parser.parse_args()
+
+    paths = [str(path) for path in sorted(Path(args.folder).iterdir())]
+    sources = input_sources.expand_sources(p for p in paths if input_sources.is_supported_file(p))
+    samples = [(source.name, source.read_bytes()) for source in sources]
+
+    cases = []
+    for layout_name in args.layouts:
+        layout_map = config.load_layout(layout_name)
+        if label_matcher.is_label_layout(layout_map):
+            continue  # Layouts de rótulos não têm caixas a comparar
+        for name, data in samples:
+            cases.append((f"{layout_name} / {name}", data, layout_map))
+            anchored = anchored_variant(layout_map, data)
+            if anchored:
+                cases.append((f"{layout_name} (âncoras) / {name}", data, anchored))
+    for i in range(args.synthetic):
+        cases.append((f"sintética {i}", synthetic_pdf(i), synthetic_layout()))
+
+    timings = {}
+    mismatches = sum(compare(label, data, layout_map, timings) for label, data, layout_map in cases)
+
+    print(f"Casos: {len(cases)} ({len(samples)} PDF(s) de amostra, {args.synthetic} sintético(s))")
+    for name, values in timings.items():
+        print(f"  {name:<12} {sum(values) / len(values) * 1000:8.1f} ms/PDF")
+    if mismatches:
+        print(f"FALHOU: {mismatches} divergência(s).")
+        return 1
+    print("OK: todos os motores deram o mesmo texto em todos os campos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Teste de Regressão de Memória do Processamento em Lote
+
+Gera alguns milhares de PDFs sintéticos (em memória), processa todos com
+batch_processor.run_batch e verifica se o pico de memória residente (RSS)
+do processo principal e dos processos de trabalho ficou abaixo do limite.
+
+Termina com código 1 se algum pico passar do limite, para poder ser usado
+em scripts de verificação. Requer um sistema Unix (módulo 'resource').
+
+Uso: python tools/check_memory.py [--files 3000] [--workers 2]
+                                  [--limit-mb 300] [--max-tasks 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import batch_processor, input_sources  # noqa: E402
+
+LINES_PER_PAGE = 40
+LINE_HEIGHT = 18
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+
+def synthetic_pdf(number: int, pages: int = 2, lines: int = LINES_PER_PAGE) -> bytes:
+    """Monta um PDF simples com várias linhas de texto por página."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        commands = [f"BT /F1 10 Tf 40 {PAGE_HEIGHT - 40 - i * LINE_HEIGHT} Td "
+                    f"(Nota {number} pagina {page} linha {i}: servico {number * 7 + i},00) Tj ET"
+                    for i in range(lines)]
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_layout(pages: int = 2) -> dict:
+    """Um campo a cada quatro linhas, em todas as páginas."""
+    layout = {}
+    for page in range(pages):
+        for i in range(0, LINES_PER_PAGE, 4):
+            top = 40 + i * LINE_HEIGHT - 12
+            layout[f"campo_p{page}_l{i}"] = {"page": page,
+                                              "coords": [30, top, 400, top + LINE_HEIGHT]}
+    return layout
+
+
+def peak_rss_mb(who) -> float:
+    if who == resource.RUSAGE_SELF:
+        # No Linux, o ru_maxrss sobrevive ao exec e pode trazer o pico de quem
+        # iniciou este script (ex: o pytest); o VmHWM é só deste processo
+        try:
+            with open("/proc/self/status", encoding="ascii") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o pico de memória de um lote grande")
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--limit-mb", type=float, default=300,
+                        help="Pico de RSS permitido por processo, em MB")
+    parser.add_argument("--max-tasks", type=int, default=batch_processor.MAX_TASKS_PER_WORKER,
+                        help="Arquivos por processo antes da reciclagem (0 desliga)")
+    args = parser.parse_args()
+
+    if resource is None:
+        print("Este teste requer um sistema Unix (módulo 'resource').")
+        return 2
+
+    batch_processor.MAX_TASKS_PER_WORKER = args.max_tasks
+    layout = synthetic_layout()
+    sources = (input_sources.from_bytes(f"sintetica_{i:05d}.pdf", synthetic_pdf(i))
+               for i in range(args.files))
+
+    started = time.perf_counter()
+    processed = failed = 0
+    for _, record in batch_processor.run_batch(sources, layout, max_workers=args.workers):
+        processed += 1
+        failed += record is None
+    elapsed = time.perf_counter() - started
+
+    main_peak = peak_rss_mb(resource.RUSAGE_SELF)
+    # Depois de run_batch, todos os processos de trabalho já terminaram
+    worker_peak = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    print(f"Arquivos: {processed} ({failed} com erro) em {elapsed:.1f} s | "
+          f"processos: {args.workers} | reciclagem: {args.max_tasks or 'desligada'}")
+    print(f"Pico de RSS: principal {main_peak:.0f} MB | maior processo de trabalho "
+          f"{worker_peak:.0f} MB | limite {args.limit_mb:.0f} MB")
+
+    if failed or max(main_peak, worker_peak) > args.limit_mb:
+        print("FALHOU: extração com erro ou pico de memória acima do limite.")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Verificação da Execução em Partes
+
+Confere, na máquina local, que dividir um lote em partes dá o mesmo
+relatório que uma execução única: grava o manifesto, roda cada parte num
+processo separado (como rodaria em outra máquina, via 'python -m src.cli
+shard-run'), junta os parciais com shard-merge e compara todas as planilhas
+com as do relatório de pipeline.run_pipeline sobre os mesmos arquivos.
+
+Também confere que a junção recusa um conjunto de parciais incompleto.
+
+Uso: python tools/check_shards.py [pasta_ou_zip] [--layout prefeitura_go] [--shards 3]
+                                  [--workers 1]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from src import config, input_sources, monitoring, pipeline, sharding  # noqa: E402
+
+
+def read_workbook(path: Path) -> dict:
+    """Todas as planilhas do relatório, como {nome: [linhas]}."""
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)]
+                for sheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a execução em partes com a execução única")
+    parser.add_argument("folder", nargs="?", default=str(ROOT / "pdf_samples"),
+                        help="Pasta com PDFs/ZIPs, ou um único PDF/ZIP")
+    parser.add_argument("--layout", default="prefeitura_go")
+    parser.add_argument("--shards", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos de extração em cada parte")
+    args = parser.parse_args()
+
+    folder = Path(args.folder)
+    paths = [str(p) for p in sorted(folder.iterdir())] if folder.is_dir() else [str(folder)]
+    paths = [p for p in paths if input_sources.is_supported_file(p)]
+    if not paths:
+        print(f"Nenhum PDF encontrado em '{folder}'.")
+        return 1
+    layout_map = config.load_layout(args.layout)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        manifest = tmp / "manifesto.json"
+        plan = sharding.plan_shards(paths, args.shards, manifest)
+        print(f"{plan['arquivos']} PDF(s) em {args.shards} parte(s): {plan['por_parte']}")
+
+        # Cada parte num processo independente, todas ao mesmo tempo
+        started = time.perf_counter()
+        runs = [subprocess.Popen([sys.executable, "-m", "src.cli", "shard-run", str(manifest),
+                                  "--shard", str(shard + 1), "--layout", args.layout,
+                                  "--output-dir", str(tmp / "parciais"),
+                                  "--workers", str(args.workers)],
+                                 cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 text=True)
+                for shard in range(args.shards)]
+        failed = False
+        for shard, run in enumerate(runs):
+            output, _ = run.communicate()
+            if run.returncode != 0:
+                print(f"A parte {shard + 1} falhou:\n{output}")
+                failed = True
+        if failed:
+            return 1
+        partials = sorted((tmp / "parciais").glob(f"*{sharding.PARTIAL_SUFFIX}"))
+        print(f"Partes concluídas em {time.perf_counter() - started:.2f} s")
+
+        # Cada relatório com o seu próprio histórico de duplicatas
+        config.DEDUP_INDEX_PATH = tmp / "indice_partes.sqlite"
+        try:
+            sharding.merge_partials(manifest, partials[1:], str(tmp / "incompleto.xlsx"))
+            if args.shards > 1:
+                print("ERRO: a junção aceitou parciais faltando.")
+                return 1
+        except ValueError as e:
+            print(f"Parciais faltando recusados: {e}")
+        merged = sharding.merge_partials(manifest, partials, str(tmp / "partes.xlsx"))
+
+        config.DEDUP_INDEX_PATH = tmp / "indice_unico.sqlite"
+        monitor = monitoring.Monitor(events_path="", metrics_path="")
+        try:
+            single = pipeline.run_pipeline(paths, layout_map, str(tmp / "unico.xlsx"),
+                                           max_workers=args.workers, monitor=monitor)
+        finally:
+            monitor.close()
+
+        counters = ("notas", "falhas", "duplicatas")
+        print("Partes: " + ", ".join(f"{k}={merged[k]}" for k in counters))
+        print("Única:  " + ", ".join(f"{k}={single[k]}" for k in counters))
+        if any(merged[k] != single[k] for k in counters):
+            print("ERRO: os contadores diferem.")
+            return 1
+        if not merged["notas"]:
+            print("Nenhuma nota extraída; nada a comparar.")
+            return 0
+        if read_workbook(tmp / "partes.xlsx") != read_workbook(tmp / "unico.xlsx"):
+            print("ERRO: os relatórios diferem.")
+            return 1
+    print("OK: o relatório das partes é idêntico ao da execução única.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
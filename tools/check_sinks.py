@@ -0,0 +1,124 @@
+"""
+Verificação das Saídas Adicionais
+
+Confere o comportamento de output_sinks.FanOut com notas sintéticas:
+- todos os formatos (CSV, JSONL, SQLite, Excel) recebem todas as notas, na
+  ordem de envio;
+- um destino lento segura o envio (a fila dele não passa do limite), em vez
+  de acumular notas na memória;
+- um destino que falha no meio é informado, e os demais terminam normalmente.
+
+Uso: python tools/check_sinks.py [--records 2000] [--queue 64]
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import config, output_sinks  # noqa: E402
+
+COLUMNS = ["arquivo_origem", "numero_nota", "valor_servico", "duplicata_de"]
+
+
+class SlowSink:
+    """Destino que demora em cada nota."""
+    delay = 0.0005
+
+    def __init__(self, path, columns):
+        self.count = 0
+
+    def write(self, record):
+        time.sleep(self.delay)
+        self.count += 1
+
+    def close(self, summaries=None):
+        pass
+
+
+class FailingSink(SlowSink):
+    """Destino que falha depois de algumas notas."""
+
+    def write(self, record):
+        super().write(record)
+        if self.count == 10:
+            raise OSError("disco cheio (simulado)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica as saídas adicionais")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--queue", type=int, default=64)
+    args = parser.parse_args()
+
+    output_sinks.SINK_TYPES[".lento"] = SlowSink
+    output_sinks.SINK_TYPES[".falha"] = FailingSink
+    records = [{"arquivo_origem": f"nota_{i:05d}.pdf", "numero_nota": i,
+                "valor_servico": i * 1.5, "duplicata_de": ""} for i in range(args.records)]
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = [str(tmp / name) for name in ("notas.csv", "notas.jsonl", "notas.sqlite",
+                                               "notas.xlsx", "notas.lento", "notas.falha")]
+        fanout = output_sinks.FanOut(paths, COLUMNS, queue_size=args.queue)
+        slow = next(worker for worker in fanout.workers if worker.path.endswith(".lento"))
+        largest = 0
+        started = time.perf_counter()
+        for record in records:
+            fanout.write(record)
+            largest = max(largest, slow.queue.qsize())
+        sent = time.perf_counter() - started
+        failed = fanout.close()
+        print(f"Envio de {args.records} notas: {sent:.2f} s (destino lento: "
+              f"{SlowSink.delay * 1000:.1f} ms por nota)")
+        print(f"Maior fila do destino lento: {largest} (limite {args.queue})")
+        if largest > args.queue:
+            print("ERRO: a fila passou do limite.")
+            ok = False
+        if sent < args.records * SlowSink.delay * 0.5:
+            print("ERRO: o envio não esperou o destino lento.")
+            ok = False
+
+        if list(failed) != [str(tmp / "notas.falha")]:
+            print(f"ERRO: falhas inesperadas: {failed}")
+            ok = False
+        else:
+            print(f"Falha isolada: {failed[str(tmp / 'notas.falha')]}")
+
+        names = [record["arquivo_origem"] for record in records]
+        with open(tmp / "notas.csv", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f, delimiter=config.CSV_DELIMITER))
+        with open(tmp / "notas.jsonl", encoding="utf-8") as f:
+            jsonl = [json.loads(line) for line in f]
+        connection = sqlite3.connect(tmp / "notas.sqlite")
+        sqlite_names = [row[0] for row in connection.execute("SELECT arquivo_origem FROM notas")]
+        connection.close()
+        workbook = load_workbook(tmp / "notas.xlsx", read_only=True)
+        excel_names = [row[0] for row in workbook.worksheets[0].iter_rows(min_row=2, values_only=True)]
+        workbook.close()
+        for label, got in (("CSV", [row["arquivo_origem"] for row in rows]),
+                           ("JSONL", [row["arquivo_origem"] for row in jsonl]),
+                           ("SQLite", sqlite_names), ("Excel", excel_names)):
+            if got != names:
+                print(f"ERRO: {label} com {len(got)} nota(s) ou fora de ordem.")
+                ok = False
+        if rows and rows[1]["valor_servico"] != "1,5":
+            print(f"ERRO: valor no CSV sem vírgula decimal: {rows[1]['valor_servico']!r}")
+            ok = False
+
+    if not ok:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Verificação da Extração Assíncrona
+
+Confere o comportamento de streaming.extract_stream com PDFs sintéticos:
+- os resultados saem na ordem das fontes, com um PDF inválido virando um
+  StreamResult com erro (e não None);
+- com quem consome lento, o número de fontes lidas à frente fica limitado
+  pela fila (contrapressão);
+- interromper o 'async for' cancela o resto do lote.
+
+Uso: python tools/check_stream.py [--files 40] [--concurrency 2]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import input_sources, streaming  # noqa: E402
+
+from check_memory import synthetic_layout, synthetic_pdf  # noqa: E402
+
+
+def make_sources(count: int):
+    sources = [input_sources.from_bytes(f"nota_{i:04d}.pdf", synthetic_pdf(i)) for i in range(count)]
+    sources[count // 2] = input_sources.from_bytes(f"nota_{count // 2:04d}.pdf", b"nao e um PDF")
+    return sources
+
+
+async def check(count: int, concurrency: int) -> bool:
+    layout = synthetic_layout()
+    sources = make_sources(count)
+    ok = True
+
+    # Ordem, erros tipados e contrapressão
+    read = 0
+    ahead = 0
+
+    def counted():
+        nonlocal read
+        for source in sources:
+            read += 1
+            yield source
+
+    names = []
+    async for result in streaming.extract_stream(counted(), layout, concurrency=concurrency):
+        names.append(result.name)
+        ahead = max(ahead, read - len(names))
+        if result.name == sources[count // 2].name:
+            if result.ok or result.error is None or result.record is not None:
+                print(f"ERRO: o PDF inválido não veio com erro: {result!r}")
+                ok = False
+            else:
+                print(f"PDF inválido: {result.error}")
+        elif not result.ok:
+            print(f"ERRO: {result.name} falhou: {result.error}")
+            ok = False
+        await asyncio.sleep(0.01)  # Quem consome é mais lento que a extração
+    if names != [source.name for source in sources]:
+        print("ERRO: os resultados saíram fora da ordem das fontes.")
+        ok = False
+    limit = concurrency * 2 + 2  # A fila, mais a fonte esperando vaga e a em espera
+    print(f"Fontes lidas à frente de quem consome: no máximo {ahead} (limite {limit})")
+    if ahead > limit:
+        print("ERRO: a fila não limitou a leitura das fontes.")
+        ok = False
+
+    # Cancelamento: um 'break' encerra o fluxo sem ler o resto das fontes
+    read = 0
+    async for _ in streaming.extract_stream(counted(), layout, concurrency=concurrency):
+        break
+    print(f"Fontes lidas antes do break: {read} de {count}")
+    if read >= count:
+        print("ERRO: o fluxo continuou lendo depois do break.")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica a extração assíncrona")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args()
+    if not asyncio.run(check(args.files, args.concurrency)):
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
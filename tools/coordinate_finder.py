@@ -4,11 +4,13 @@ Ferramenta Auxiliar para Localização de Coordenadas (Versão 4.1 - Corrigida).
 Corrige um typo na constante de conversão de cores do OpenCV (COLOR_RGB2BGR).
 """
 import cv2
-import pdfplumber
-import numpy as np
 import sys
 from pathlib import Path
 
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import render_service  # noqa: E402
+
 # --- Variáveis de Configuração ---
 RESOLUTION = 200
 points = []
@@ -61,18 +63,15 @@ def main():
         return
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if not (0 <= page_number < len(pdf.pages)):
-                print(f"ERRO: Página inválida.")
-                return
-
-            page = pdf.pages[page_number]
-            pil_image = page.to_image(resolution=RESOLUTION).original
-
-            # --- LINHA CORRIGIDA ---
-            # Usando '2' no lugar de '_'
-            image_display = cv2.cvtColor(
-                np.array(pil_image), cv2.COLOR_RGB2BGR)
+        service = render_service.get_service()
+        if not (0 <= page_number < service.page_count(str(pdf_path))):
+            print(f"ERRO: Página inválida.")
+            return
+
+        # A página vem do cache compartilhado de renderização; o OpenCV lê o
+        # PNG direto em BGR, sem conversões via PIL
+        png_path = service.render(str(pdf_path), page_number, RESOLUTION)
+        image_display = cv2.imread(str(png_path))
 
         cv2.namedWindow("PDF Page")
         cv2.setMouseCallback("PDF Page", mouse_callback)
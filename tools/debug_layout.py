@@ -7,6 +7,14 @@ passando os atributos de estilo (cor, espessura) via dicionários.
 import pdfplumber
 import sys
 from pathlib import Path
+from PIL import Image
+from pdfplumber.display import PageImage
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import render_service  # noqa: E402
+
+RESOLUTION = 150
 
 
 def debug_pdf_layout(pdf_path: Path, page_number: int):
@@ -22,7 +30,11 @@ def debug_pdf_layout(pdf_path: Path, page_number: int):
                 return
 
             page = pdf.pages[page_number]
-            im = page.to_image(resolution=150)
+            # Usa a imagem do cache compartilhado de renderização
+            png_path = render_service.get_service().render(
+                str(pdf_path), page_number, RESOLUTION)
+            im = PageImage(page, original=Image.open(png_path).convert("RGB"),
+                           resolution=RESOLUTION)
 
             # --- SINTAXE DE DESENHO CORRIGIDA ---
             # Define o estilo do retângulo (contorno vermelho)
@@ -37,12 +49,13 @@ def debug_pdf_layout(pdf_path: Path, page_number: int):
             }
 
             # Desenha os retângulos e linhas usando a sintaxe compatível
-            im.draw_rects(page.extract_words(), **rect_style)
+            words = page.extract_words()
+            im.draw_rects(words, **rect_style)
             im.draw_lines(page.lines, **line_style)
 
             # Para depuração: imprime todas as palavras e suas coordenadas no terminal
             print("\n--- Coordenadas de Todas as Palavras Encontradas ---")
-            for word in page.extract_words():
+            for word in words:
                 # Arredonda os valores para facilitar a leitura
                 x0, top, x1, bottom = round(word["x0"], 2), round(
                     word["top"], 2), round(word["x1"], 2), round(word["bottom"], 2)
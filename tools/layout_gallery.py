@@ -0,0 +1,251 @@
+"""
+Galeria de Conferência de Layout
+
+Aplica um layout a todos os PDFs de uma pasta (ou ZIP) e gera uma galeria
+HTML para conferência visual: cada página usada pelo layout é renderizada
+uma única vez, em baixa resolução, com as caixas dos campos desenhadas por
+cima e o valor extraído escrito ao lado de cada caixa.
+
+As páginas com campos vazios aparecem primeiro (caixas em vermelho), então
+os problemas de um layout novo ficam no topo da galeria em vez de espalhados
+entre centenas de notas. O trabalho é dividido entre processos, como no
+processamento em lote.
+
+Com --contact-sheet, grava também uma folha de contato (um único PNG com as
+miniaturas na mesma ordem da galeria).
+
+Uso: python tools/layout_gallery.py <pasta_ou_zip> <layout> [--output pasta]
+                                    [--dpi 60] [--workers N] [--contact-sheet]
+"""
+import argparse
+import html
+import io
+import re
+import sys
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pdfplumber
+import pypdfium2
+from PIL import Image, ImageDraw
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import config, input_sources, label_matcher  # noqa: E402
+from src.batch_processor import default_workers, worker_pool  # noqa: E402
+from src.input_sources import PdfSource  # noqa: E402
+from src.word_index import WordIndex, resolve_box  # noqa: E402
+
+DEFAULT_DPI = 60
+THUMB_COLUMNS = 6
+LABEL_CHARS = 40
+OK_COLOR = (0, 150, 0)
+EMPTY_COLOR = (220, 0, 0)
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name)[:80]
+
+
+def _page_fields(page, fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Resolve as caixas dos campos de uma página e extrai o texto de cada uma."""
+    index = None
+    if any(params.get("anchor") for params in fields.values()):
+        index = WordIndex.from_page(page)
+    results = []
+    for field_name, params in fields.items():
+        x0, top, x1, bottom = resolve_box(params, index if params.get("anchor") else None)
+        box = (max(x0, page.bbox[0]), max(top, page.bbox[1]),
+               min(x1, page.bbox[2]), min(bottom, page.bbox[3]))
+        try:
+            value = (page.crop(box).extract_text() or "").strip()
+        except ValueError:  # Caixa fora da página
+            value = ""
+        results.append({"campo": field_name, "caixa": box, "valor": value})
+    return results
+
+
+def _draw(image: Image.Image, fields: List[Dict[str, Any]], scale: float, origin) -> None:
+    draw = ImageDraw.Draw(image)
+    for field in fields:
+        x0, top, x1, bottom = field["caixa"]
+        box = ((x0 - origin[0]) * scale, (top - origin[1]) * scale,
+               (x1 - origin[0]) * scale, (bottom - origin[1]) * scale)
+        color = OK_COLOR if field["valor"] else EMPTY_COLOR
+        draw.rectangle(box, outline=color, width=2)
+        label = field["valor"].replace("\n", " ") or f"{field['campo']}: (vazio)"
+        if len(label) > LABEL_CHARS:
+            label = label[:LABEL_CHARS - 1] + "…"
+        draw.text((box[0], box[3] + 1), label, fill=color)
+
+
+def render_source(source: PdfSource, layout_map: Dict[str, Any], output_dir: str,
+                  number: int, dpi: int) -> Dict[str, Any]:
+    """
+    Executado nos processos de trabalho: extrai os campos de um PDF e grava
+    uma imagem por página usada pelo layout, com as caixas desenhadas.
+
+    Returns:
+        Dict[str, Any]: {"nome", "paginas": [{"pagina", "imagem", "campos"}], "erro"}.
+    """
+    result = {"nome": source.name, "paginas": [], "erro": None}
+    fields_by_page = {}
+    for field_name, params in layout_map.items():
+        fields_by_page.setdefault(params["page"], {})[field_name] = params
+
+    try:
+        data = source.read_bytes()
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            document = pypdfium2.PdfDocument(data)
+            try:
+                for page_num in sorted(fields_by_page):
+                    if page_num >= len(pdf.pages):
+                        result["erro"] = (f"O PDF tem {len(pdf.pages)} página(s); "
+                                          f"o layout usa a página {page_num}.")
+                        break
+                    page = pdf.pages[page_num]
+                    fields = _page_fields(page, fields_by_page[page_num])
+                    origin = page.bbox[:2]
+                    page.close()
+
+                    # Cada página é renderizada uma única vez, direto na resolução da galeria
+                    bitmap = document[page_num].render(scale=dpi / 72)
+                    image = bitmap.to_pil().convert("RGB")
+                    _draw(image, fields, dpi / 72, origin)
+                    image_name = f"{number:05d}_{_safe_name(source.name)}_p{page_num + 1}.png"
+                    image.save(Path(output_dir) / image_name, format="PNG")
+                    result["paginas"].append({"pagina": page_num + 1, "imagem": image_name,
+                                              "campos": fields})
+            finally:
+                document.close()
+    except Exception as e:
+        result["erro"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _empty_count(page: Dict[str, Any]) -> int:
+    return sum(1 for field in page["campos"] if not field["valor"])
+
+
+def sorted_pages(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Uma entrada por página, com as de mais campos vazios primeiro (e os erros antes de tudo)."""
+    entries = []
+    for result in results:
+        if result["erro"] and not result["paginas"]:
+            entries.append({"nome": result["nome"], "erro": result["erro"], "pagina": None,
+                            "imagem": None, "campos": [], "vazios": 0})
+        for page in result["paginas"]:
+            entries.append({"nome": result["nome"], "erro": result["erro"], **page,
+                            "vazios": _empty_count(page)})
+    return sorted(entries, key=lambda e: (e["erro"] is None, -e["vazios"], e["nome"],
+                                          e["pagina"] or 0))
+
+
+def write_gallery(entries: List[Dict[str, Any]], layout_name: str, output_dir: Path) -> Path:
+    """Grava o index.html da galeria."""
+    cards = []
+    for entry in entries:
+        rows = "".join(
+            f"<tr class='{'ok' if f['valor'] else 'vazio'}'><td>{html.escape(f['campo'])}</td>"
+            f"<td>{html.escape(f['valor']) or '(vazio)'}</td></tr>"
+            for f in entry["campos"])
+        image = (f"<a href='{entry['imagem']}'><img src='{entry['imagem']}' loading='lazy'></a>"
+                 if entry["imagem"] else "")
+        error = f"<p class='erro'>{html.escape(entry['erro'])}</p>" if entry["erro"] else ""
+        page = f" — página {entry['pagina']}" if entry["pagina"] else ""
+        cards.append(f"<div class='nota'><h3>{html.escape(entry['nome'])}{page} "
+                     f"<small>({entry['vazios']} vazio(s))</small></h3>{error}{image}"
+                     f"<table>{rows}</table></div>")
+
+    with_empty = sum(1 for entry in entries if entry["vazios"] or entry["erro"])
+    page_html = f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8">
+<title>Conferência do layout {html.escape(layout_name)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em; }}
+.galeria {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+.nota {{ border: 1px solid #ccc; padding: .5em; width: 420px; }}
+.nota h3 {{ font-size: .9em; word-break: break-all; }}
+.nota img {{ max-width: 100%; }}
+table {{ font-size: .8em; border-collapse: collapse; width: 100%; }}
+td {{ border-top: 1px solid #eee; vertical-align: top; }}
+tr.vazio td, .erro {{ color: #c00; }}
+</style></head><body>
+<h1>Layout {html.escape(layout_name)}</h1>
+<p>{len(entries)} página(s); {with_empty} com campos vazios ou erro (listadas primeiro).</p>
+<div class="galeria">
+{chr(10).join(cards)}
+</div></body></html>
+"""
+    index_path = output_dir / "index.html"
+    index_path.write_text(page_html, encoding="utf-8")
+    return index_path
+
+
+def write_contact_sheet(entries: List[Dict[str, Any]], output_dir: Path,
+                        thumb_width: int = 240) -> Path:
+    """Junta as miniaturas num único PNG, na ordem da galeria."""
+    thumbs = []
+    for entry in entries:
+        if entry["imagem"]:
+            with Image.open(output_dir / entry["imagem"]) as image:
+                image.thumbnail((thumb_width, thumb_width * 2))
+                thumbs.append(image.copy())
+    sheet_path = output_dir / "folha_de_contato.png"
+    if not thumbs:
+        return sheet_path
+    cell_height = max(thumb.height for thumb in thumbs)
+    rows = (len(thumbs) + THUMB_COLUMNS - 1) // THUMB_COLUMNS
+    sheet = Image.new("RGB", (THUMB_COLUMNS * thumb_width, rows * cell_height), "white")
+    for i, thumb in enumerate(thumbs):
+        sheet.paste(thumb, ((i % THUMB_COLUMNS) * thumb_width, (i // THUMB_COLUMNS) * cell_height))
+    sheet.save(sheet_path, format="PNG")
+    return sheet_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma galeria para conferência de um layout")
+    parser.add_argument("folder", help="Pasta com PDFs/ZIPs, ou um único PDF/ZIP")
+    parser.add_argument("layout", help="Nome do layout ou caminho de um arquivo .json")
+    parser.add_argument("--output", help="Pasta da galeria (padrão: output/galeria_<layout>)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--contact-sheet", action="store_true",
+                        help="Grava também uma folha de contato em PNG")
+    args = parser.parse_args()
+
+    layout_map = config.load_layout(args.layout)
+    if not layout_map or label_matcher.is_label_layout(layout_map):
+        print("Informe um layout com caixas (layouts de rótulos não têm o que desenhar).")
+        return 1
+    layout_name = Path(args.layout).stem
+    output_dir = Path(args.output) if args.output else config.OUTPUT_DIR / f"galeria_{layout_name}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    folder = Path(args.folder)
+    paths = [str(p) for p in sorted(folder.iterdir())] if folder.is_dir() else [str(folder)]
+    sources = input_sources.expand_sources(p for p in paths if input_sources.is_supported_file(p))
+    if not sources:
+        print(f"Nenhum PDF encontrado em '{folder}'.")
+        return 1
+
+    results = []
+    with worker_pool(args.workers or default_workers()) as pool:
+        futures = [pool.submit(render_source, source, layout_map, str(output_dir), i, args.dpi)
+                   for i, source in enumerate(sources)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            results.append(future.result())
+            print(f"\r{done}/{len(futures)} PDF(s)", end="", flush=True)
+    print()
+
+    entries = sorted_pages(results)
+    index_path = write_gallery(entries, layout_name, output_dir)
+    print(f"Galeria: {index_path}")
+    if args.contact_sheet:
+        print(f"Folha de contato: {write_contact_sheet(entries, output_dir)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Validação de CNPJ/CPF de um Relatório
+
+Lê as colunas de CNPJ/CPF (prestador e tomador) de um relatório gerado pelo
+extrator e confere os dígitos verificadores de todas as linhas de uma vez
+(ver src/document_validator.py). Mostra, por coluna, quantos documentos são
+válidos, inválidos ou estão vazios, e os arquivos de origem dos inválidos.
+
+Com --benchmark N, valida N documentos sintéticos e mostra o tempo gasto.
+
+Uso: python tools/validate_documents.py <relatorio.xlsx> [--show 20]
+     python tools/validate_documents.py --benchmark 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Permite importar o pacote 'src' ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import document_validator, excel_writer, field_roles  # noqa: E402
+
+DOCUMENT_ROLES = ("cnpj_prestador", "cnpj_tomador")
+
+
+def _with_check_digits(base: str, weights) -> str:
+    for weight in weights:
+        remainder = sum(int(d) * w for d, w in zip(base, weight)) % 11
+        base += str(0 if remainder < 2 else 11 - remainder)
+    return base
+
+
+def synthetic_documents(count: int):
+    """Metade CNPJs, metade CPFs, formatados; cerca de 10% com o último dígito trocado."""
+    rng = random.Random(42)
+    documents = []
+    for i in range(count):
+        if i % 2:
+            digits = _with_check_digits(f"{rng.randrange(10**9):09d}",
+                                        document_validator.CPF_WEIGHTS)
+        else:
+            digits = _with_check_digits(f"{rng.randrange(10**12):012d}",
+                                        document_validator.CNPJ_WEIGHTS)
+        if rng.random() < 0.1:
+            digits = digits[:-1] + str((int(digits[-1]) + 1) % 10)
+        if len(digits) == 11:
+            documents.append(f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}")
+        else:
+            documents.append(f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}")
+    return documents
+
+
+def benchmark(count: int) -> int:
+    documents = synthetic_documents(count)
+    started = time.perf_counter()
+    normalized, valid = document_validator.validate_documents(documents)
+    elapsed = time.perf_counter() - started
+    print(f"{count} documento(s) em {elapsed:.2f} s "
+          f"({count / elapsed / 1e6:.2f} milhão/s) | válidos: {int(valid.sum())}")
+    return 0
+
+
+def check_report(report_path: str, show: int) -> int:
+    header = excel_writer.read_report_keys(report_path, [])["header"]
+    roles = field_roles.resolve_roles(header)
+    columns = [roles[role] for role in DOCUMENT_ROLES if role in roles]
+    if not columns:
+        print("O relatório não tem colunas de CNPJ/CPF reconhecidas.")
+        return 1
+
+    report = excel_writer.read_report_keys(report_path, ["arquivo_origem"] + columns)
+    files = report["keys"].get("arquivo_origem", [None] * report["rows"])
+    invalid_total = 0
+    for column in columns:
+        values = report["keys"][column]
+        normalized, valid = document_validator.validate_documents(values)
+        empty = sum(1 for value in values if value in (None, ""))
+        invalid = [i for i in range(len(values)) if not valid[i] and values[i] not in (None, "")]
+        invalid_total += len(invalid)
+        print(f"{column}: {int(valid.sum())} válido(s), {len(invalid)} inválido(s), "
+              f"{empty} vazio(s)")
+        for i in invalid[:show]:
+            print(f"  linha {i + 2}: {values[i]!r} ({files[i]})")
+        if len(invalid) > show:
+            print(f"  ... e mais {len(invalid) - show}")
+    return 1 if invalid_total else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere os CNPJs/CPFs de um relatório")
+    parser.add_argument("report", nargs="?", help="Relatório .xlsx gerado pelo extrator")
+    parser.add_argument("--show", type=int, default=20, help="Inválidos listados por coluna")
+    parser.add_argument("--benchmark", type=int, default=0,
+                        help="Valida N documentos sintéticos e mostra o tempo")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        return benchmark(args.benchmark)
+    if not args.report:
+        parser.error("informe o relatório ou --benchmark N")
+    return check_report(args.report, args.show)
+
+
+if __name__ == "__main__":
+    sys.exit(main())